@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Compares the compiled (bisect) ACL check in hb_acl.py with the original linear
+scan over a set of (start, end) tuples, for ACLs of 10, 1000 and 10000 ranges.
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+from random import randint, seed
+from struct import pack
+from timeit import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hb_const as const
+from hb_acl import acl_compile, acl_check
+
+# The acl_check() HBlink used before ACLs were compiled
+def acl_check_linear(_id, _acl):
+    id = int(_id.encode('hex'), 16)
+    for entry in _acl[1]:
+        if entry[0] <= id <= entry[1]:
+            return _acl[0]
+    return not _acl[0]
+
+def mk_ranges(_count):
+    ranges = set()
+    while len(ranges) < _count:
+        start = randint(const.ID_MIN, const.ID_MAX - 1000)
+        ranges.add((start, start + randint(0, 999)))
+    return ranges
+
+if __name__ == '__main__':
+    seed(0x49)
+    ids = [pack('>I', randint(const.ID_MIN, const.ID_MAX))[1:] for _ in range(1000)]
+
+    print('{:>8} {:>14} {:>14} {:>9}'.format('ranges', 'linear us/chk', 'bisect us/chk', 'speedup'))
+    for count in (10, 1000, 10000):
+        ranges = mk_ranges(count)
+        linear = (False, ranges)
+        compiled = acl_compile(False, ranges)
+
+        for _id in ids:
+            assert acl_check_linear(_id, linear) == acl_check(_id, compiled)
+
+        loops = max(1, 20000 // count)
+        t_linear = timeit(lambda: [acl_check_linear(_id, linear) for _id in ids], number=loops) / (loops * len(ids)) * 1e6
+        t_bisect = timeit(lambda: [acl_check(_id, compiled) for _id in ids], number=100) / (100 * len(ids)) * 1e6
+        print('{:>8} {:>14.3f} {:>14.3f} {:>8.1f}x'.format(count, t_linear, t_bisect, t_linear / t_bisect))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+What a call start or end costs the reactor when it is recorded: written as a
+line to a file there and then (formatted, written and flushed, as an INFO log
+line to a file is), against handing it to hb_cdr's writer thread. The time per
+event is the average and the worst of EVENTS, in microseconds; the worst is
+what a frame arriving at the same moment waits.
+
+    python benchmarks/bench_cdr.py [events]
+'''
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+from struct import pack
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hb_cdr
+
+EVENTS = 20000
+EVENT = ('END', 'RX', 'MASTER-1', '\xde\xad\xbe\xef', pack('>I', 3120000), '\x2f\x9b\xe5', 1, '\x00\x00\x09', 12.34)
+
+# Average and worst microseconds per call of _fn
+def per_event(_fn, _events):
+    worst = 0
+    start = time()
+    for i in xrange(_events):
+        before = time()
+        _fn()
+        worst = max(worst, time() - before)
+    return 1e6 * (time() - start) / _events, 1e6 * worst
+
+if __name__ == '__main__':
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    work = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(work, 'direct.cdr'), 'a') as direct:
+            def write():
+                direct.write(hb_cdr.cdr_line(time(), *EVENT))
+                direct.flush()
+            direct_avg, direct_worst = per_event(write, events)
+
+        writer = hb_cdr.cdrWriter(os.path.join(work, 'thread.cdr'), 1 << 30, 86400)
+        writer._thread.start()
+        thread_avg, thread_worst = per_event(lambda: writer.record(*EVENT), events)
+        writer.close()
+        assert sum(1 for line in open(os.path.join(work, 'thread.cdr'))) == events
+    finally:
+        shutil.rmtree(work)
+
+    print('{} events, microseconds on the reactor per event'.format(events))
+    print('{:>20} {:>8} {:>8}'.format('', 'average', 'worst'))
+    print('{:>20} {:>8.1f} {:>8.0f}'.format('written there', direct_avg, direct_worst))
+    print('{:>20} {:>8.1f} {:>8.0f}'.format('hb_cdr thread', thread_avg, thread_worst))
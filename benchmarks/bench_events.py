@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+How many bridge events a second the reporting server can take, for CLIENTS
+connected reporting clients (whose connections throw the data away):
+
+    text, each sent     each event formatted as text at the call and written
+                        to every client straight away, as before
+    text, batched       reportFactory.bridge_event(): formatted and written
+                        when the batch is sent (REPORT_FORMAT pickle)
+    wire, batched       reportFactory.bridge_event(): a batch encoded as one
+                        BRDG_EVENTS message (REPORT_FORMAT wire)
+
+    python benchmarks/bench_events.py [clients]
+'''
+
+from __future__ import print_function
+
+import logging
+import os
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hblink
+from dmr_utils.utils import int_id
+from reporting_const import REPORT_OPCODES
+
+logging.basicConfig(level=logging.ERROR)
+
+CLIENTS = 3
+EVENTS = 100000
+RUNS = 3
+
+STREAM_ID = '\x12\x34\x56\x78'
+PEER_ID = '\x00\x2f\x9b\x80'
+RF_SRC = '\x2f\xa9\x8f'
+TGID = '\x00\x00\x09'
+
+class nullTransport(object):
+    def write(self, _data):
+        pass
+
+    def writeSequence(self, _data):
+        pass
+
+def mk_factory(_clients, _format):
+    factory = hblink.reportFactory({'SYSTEMS': {}, 'REPORTS': {'REPORT_DELTAS': True, 'REPORT_FORMAT': _format}})
+    factory.clients = []
+    for i in range(_clients):
+        client = hblink.report(factory)
+        client.transport = nullTransport()
+        factory.clients.append(client)
+    return factory
+
+# A call through a bridge to two other systems: START and END for RX and each TX
+def each_sent(_factory, _calls):
+    for i in xrange(_calls):
+        _factory.send_clients(REPORT_OPCODES['BRDG_EVENT']+'GROUP VOICE,START,RX,{},{},{},{},{},{}'.format('MASTER-1', int_id(STREAM_ID), int_id(PEER_ID), int_id(RF_SRC), 1, int_id(TGID)))
+        for system in ('OBP-1', 'OBP-2'):
+            _factory.send_clients(REPORT_OPCODES['BRDG_EVENT']+'GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(system, int_id(STREAM_ID), int_id(PEER_ID), int_id(RF_SRC), 1, int_id(TGID)))
+        for system in ('OBP-1', 'OBP-2'):
+            _factory.send_clients(REPORT_OPCODES['BRDG_EVENT']+'GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(system, int_id(STREAM_ID), int_id(PEER_ID), int_id(RF_SRC), 1, int_id(TGID), 4.5))
+        _factory.send_clients(REPORT_OPCODES['BRDG_EVENT']+'GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format('MASTER-1', int_id(STREAM_ID), int_id(PEER_ID), int_id(RF_SRC), 1, int_id(TGID), 4.5))
+
+def batched(_factory, _calls):
+    for i in xrange(_calls):
+        _factory.bridge_event('START', 'RX', 'MASTER-1', STREAM_ID, PEER_ID, RF_SRC, 1, TGID)
+        for system in ('OBP-1', 'OBP-2'):
+            _factory.bridge_event('START', 'TX', system, STREAM_ID, PEER_ID, RF_SRC, 1, TGID)
+        for system in ('OBP-1', 'OBP-2'):
+            _factory.bridge_event('END', 'TX', system, STREAM_ID, PEER_ID, RF_SRC, 1, TGID, 4.5)
+        _factory.bridge_event('END', 'RX', 'MASTER-1', STREAM_ID, PEER_ID, RF_SRC, 1, TGID, 4.5)
+    _factory.flush_events()
+
+def per_second(_fn, _factory):
+    calls = EVENTS // 6
+    best = None
+    for i in range(RUNS):
+        start = time()
+        _fn(_factory, calls)
+        elapsed = time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return calls * 6 / best
+
+if __name__ == '__main__':
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS
+    print('{} clients'.format(clients))
+    print('{:>18} {:>12}'.format('events', 'per second'))
+    for name, fn, format in (('text, each sent', each_sent, 'pickle'), ('text, batched', batched, 'pickle'), ('wire, batched', batched, 'wire')):
+        print('{:>18} {:>12.0f}'.format(name, per_second(fn, mk_factory(clients, format))))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Peer timeouts for a MASTER with 10000 simulated peers that all ping every
+PING_TIME, of which a handful stop pinging each maintenance period. Compares the
+original maintenance loop (check LAST_PING of every peer) with hb_wheel's timing
+wheel, and shows what the wheel adds to the ping path (every ping moves the peer
+to a new bucket).
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+from random import random, sample, seed
+from struct import pack
+from time import time as clock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hb_wheel import timingWheel
+
+PEERS = 10000
+PING_TIME = 5
+MAX_MISSED = 3
+PERIODS = 60
+QUIET = 10          # peers that stop pinging each period
+
+def simulate(_use_wheel):
+    timeout = PING_TIME * MAX_MISSED
+    config = {'GLOBAL': {'PING_TIME': PING_TIME, 'MAX_MISSED': MAX_MISSED}}
+    now = 0.0
+    # The original loop reads the clock for every peer it checks
+    time = lambda: now
+    peers = {}
+    wheel = timingWheel(PING_TIME, timeout, now)
+    for i in range(PEERS):
+        peers[pack('>I', i)] = {'LAST_PING': now + random() * PING_TIME}
+        if _use_wheel:
+            wheel.schedule(pack('>I', i), peers[pack('>I', i)]['LAST_PING'] + timeout)
+    silent = set()
+    t_loop = t_ping = 0.0
+    removed = 0
+    for period in range(PERIODS):
+        silent.update(sample(list(set(peers) - silent), QUIET))
+        # Everybody else pings once during the period
+        start = clock()
+        for peer in peers:
+            if peer not in silent:
+                when = now + random() * PING_TIME
+                peers[peer]['LAST_PING'] = when
+                if _use_wheel:
+                    wheel.schedule(peer, when + timeout)
+        t_ping += clock() - start
+        now += PING_TIME
+
+        start = clock()
+        if _use_wheel:
+            for peer in wheel.expire(now):
+                del peers[peer]
+                removed += 1
+        else:
+            # As master_maintenance_loop() did it
+            remove_list = []
+            for peer in peers:
+                _this_peer = peers[peer]
+                if _this_peer['LAST_PING']+(config['GLOBAL']['PING_TIME']*config['GLOBAL']['MAX_MISSED']) < time():
+                    remove_list.append(peer)
+            for peer in remove_list:
+                del peers[peer]
+                removed += 1
+        t_loop += clock() - start
+    return t_loop / PERIODS * 1e6, t_ping / PERIODS / PEERS * 1e9, removed
+
+if __name__ == '__main__':
+    seed(0x49)
+    scan_loop, scan_ping, scan_removed = simulate(False)
+    seed(0x49)
+    wheel_loop, wheel_ping, wheel_removed = simulate(True)
+
+    print('{} peers, PING_TIME {}s, MAX_MISSED {}, {} go quiet every period'.format(PEERS, PING_TIME, MAX_MISSED, QUIET))
+    print('{:>8} {:>20} {:>18} {:>10}'.format('', 'maint. loop us/run', 'ping path ns/ping', 'removed'))
+    print('{:>8} {:>20.1f} {:>18.1f} {:>10}'.format('scan', scan_loop, scan_ping, scan_removed))
+    print('{:>8} {:>20.1f} {:>18.1f} {:>10}'.format('wheel', wheel_loop, wheel_ping, wheel_removed))
+    print('maintenance loop speedup: {:.0f}x'.format(scan_loop / wheel_loop))
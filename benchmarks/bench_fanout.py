@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Compares the MASTER REPEAT fan-out done one sendto() per peer (what HBlink does
+without sendmmsg) with the batched hb_mmsg.fanOut, for 10, 50 and 200 peers on
+the loopback interface. The peers' sockets are never read, the kernel drops what
+doesn't fit; only the sending side is being measured.
+'''
+
+from __future__ import print_function
+
+import os
+import socket
+import sys
+from struct import pack
+from timeit import repeat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hb_mmsg
+from hb_peer import Peer
+
+FRAMES = 200
+
+def mk_peers(_count):
+    peers = {}
+    socks = []
+    for i in range(_count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        socks.append(sock)
+        peers[pack('>I', 3120000 + i)] = Peer(pack('>I', 3120000 + i), sock.getsockname(), 0)
+    return peers, socks
+
+if __name__ == '__main__':
+    if not hb_mmsg.AVAILABLE:
+        print('sendmmsg() is not available on this platform')
+        sys.exit(1)
+
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx.bind(('127.0.0.1', 0))
+    data = 'DMRD' + '\x00' * 7 + pack('>I', 3120000) + '\x00' * 40
+
+    print('{:>6} {:>16} {:>16} {:>9} {:>14}'.format('peers', 'sendto us/frame', 'mmsg us/frame', 'speedup', 'syscalls/frame'))
+    for count in (10, 50, 200):
+        peers, socks = mk_peers(count)
+        source = pack('>I', 3120000)
+
+        def one_by_one():
+            pkt = [data[:11], '', data[15:]]
+            for _peer in peers:
+                if _peer != source:
+                    pkt[1] = _peer
+                    tx.sendto(''.join(pkt), peers[_peer].sockaddr)
+
+        fanout = hb_mmsg.fanOut(tx.fileno(), tx.sendto)
+        def batched():
+            fanout.send(peers, data, source)
+
+        t_old = min(repeat(one_by_one, number=FRAMES, repeat=5)) / FRAMES * 1e6
+        t_new = min(repeat(batched, number=FRAMES, repeat=5)) / FRAMES * 1e6
+        print('{:>6} {:>16.1f} {:>16.1f} {:>8.1f}x {:>7} -> {:<5}'.format(count, t_old, t_new, t_old / t_new, count - 1, float(fanout.calls) / fanout.frames))
+        for sock in socks:
+            sock.close()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Per-frame cost of parsing a DMRD header: the slice-and-int_id parse that used to
+be copied into each receive path, against hb_frame.DMRD. "Before" also includes
+the second int_id() of the flags byte that every dmrd_received() did, since the
+decoded record now carries it.
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+from binascii import b2a_hex as ahex
+from timeit import repeat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hb_frame import DMRD
+
+def int_id(_hex_string):
+    return int(ahex(_hex_string), 16)
+
+# The parse each receive path used to do inline
+def parse_sliced(_data):
+    _peer_id = _data[11:15]
+    _seq = _data[4]
+    _rf_src = _data[5:8]
+    _dst_id = _data[8:11]
+    _bits = int_id(_data[15])
+    _slot = 2 if (_bits & 0x80) else 1
+    if _bits & 0x40:
+        _call_type = 'unit'
+    elif (_bits & 0x23) == 0x23:
+        _call_type = 'vcsbk'
+    else:
+        _call_type = 'group'
+    _frame_type = (_bits & 0x30) >> 4
+    _dtype_vseq = (_bits & 0xF)
+    _stream_id = _data[16:20]
+    return _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data
+
+# ...and what dmrd_received then did with it before it could start routing
+def parse_before(_data):
+    _fields = parse_sliced(_data)
+    _bits = int_id(_fields[9][15])
+    return _fields
+
+if __name__ == '__main__':
+    frames = ['DMRD' + chr(seq) + '\x2f\x9b\xe5' + '\x00\x0c\x30' + '\x00\x2f\x9b\x80' + chr(bits) + '\xde\xad\xbe\xef' + '\x00' * 35
+              for seq, bits in enumerate((0x21, 0x10, 0x01, 0x02, 0x03, 0x84, 0x95, 0xa2))]
+
+    for _data in frames:
+        _frame = DMRD(_data)
+        assert parse_sliced(_data) == (_frame.peer_id, _frame.rf_src, _frame.dst_id, _frame.seq, _frame.slot, _frame.call_type,
+                                       _frame.frame_type, _frame.dtype_vseq, _frame.stream_id, _frame.data)
+
+    loops = 50000
+    def per_frame(_fn):
+        return min(repeat(lambda: [_fn(_data) for _data in frames], number=loops, repeat=5)) / (loops * len(frames)) * 1e9
+
+    t_sliced = per_frame(parse_sliced)
+    t_before = per_frame(parse_before)
+    t_struct = per_frame(DMRD)
+    print('sliced header parse only:           {:6.0f} ns/frame'.format(t_sliced))
+    print('before (parse + dmrd_received bits): {:6.0f} ns/frame'.format(t_before))
+    print('after  (hb_frame.DMRD):              {:6.0f} ns/frame'.format(t_struct))
+    print('speedup:                             {:6.2f}x'.format(t_before / t_struct))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+What REPORT_LATENCY costs. The same MASTER as bench_metrics.py (REPEAT on, a
+few peers, a transport that does nothing) is given DMRD frames without and
+with hb_latency's instrumentation, and the difference per frame is printed,
+followed by the histogram the instrumented run recorded.
+
+    python benchmarks/bench_latency.py [peers]
+'''
+
+from __future__ import print_function
+
+import sys
+
+from bench_metrics import FRAME, FRAMES, PEERS, mk_master, per_call
+import hb_latency
+
+ROUNDS = 5
+
+if __name__ == '__main__':
+    peers = int(sys.argv[1]) if len(sys.argv) > 1 else PEERS
+    sockaddr = ('10.0.0.0', 62031)
+    plain = mk_master(peers)
+    timed = mk_master(peers)
+    timed.datagramReceived = hb_latency.instrument('TIMED', timed.datagramReceived)
+
+    # Taking turns, so both see the same noise from the rest of the machine
+    plain_ns = timed_ns = None
+    for i in range(ROUNDS):
+        _plain = per_call(lambda: plain.datagramReceived(FRAME, sockaddr), FRAMES // ROUNDS)
+        _timed = per_call(lambda: timed.datagramReceived(FRAME, sockaddr), FRAMES // ROUNDS)
+        plain_ns = _plain if plain_ns is None else min(plain_ns, _plain)
+        timed_ns = _timed if timed_ns is None else min(timed_ns, _timed)
+    print('MASTER with {} peers, REPEAT on'.format(peers))
+    print('per frame, without: {:.0f} ns'.format(plain_ns))
+    print('per frame, with:    {:.0f} ns (+{:.0f} ns)'.format(timed_ns, timed_ns - plain_ns))
+
+    print('recorded (microseconds: frames):')
+    for _type, _counts in sorted(hb_latency.histograms()['TIMED'].items()):
+        print('  {}: {}'.format(_type, ', '.join('<{}: {}'.format(2 ** i, _count) for i, _count in enumerate(_counts) if _count)))
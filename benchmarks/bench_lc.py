@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+The LC encoding done when a call starts on a bridge with many targets, all on
+the bridge's talkgroup: encoded for each target (as hb_confbridge did) against
+hb_lc's cache, the first time the subscriber keys up (cache cold) and again
+(cache warm). Then KEYUPS key-ups by SUBSCRIBERS subscribers picked at random,
+each on the one of TALKGROUPS talkgroups they use, with the time per key-up and
+the hit rate the default cache size gets.
+
+    python benchmarks/bench_lc.py [targets]
+'''
+
+from __future__ import print_function
+
+import os
+import random
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dmr_utils import bptc
+from dmr_utils.utils import hex_str_3
+
+import hb_lc
+
+TARGETS = 50
+CALLS = 20
+SUBSCRIBERS = 2000
+TALKGROUPS = 50
+KEYUPS = 5000
+
+def lc(_tgid, _rf_src):
+    return '\x00\x00\x00' + hex_str_3(_tgid) + hex_str_3(_rf_src)
+
+def encode(_lc):
+    return (bptc.encode_header_lc(_lc), bptc.encode_terminator_lc(_lc), bptc.encode_emblc(_lc))
+
+# Milliseconds to encode the LC for each of _targets, for each of _calls call starts
+def per_call_start(_encode, _targets, _calls):
+    start = time()
+    for i in range(_calls):
+        for j in range(_targets):
+            _encode(lc(9, 3120000 + i))
+    return 1e3 * (time() - start) / _calls
+
+if __name__ == '__main__':
+    targets = int(sys.argv[1]) if len(sys.argv) > 1 else TARGETS
+    cache = hb_lc.lcCache()
+    print('call start with {} targets, ms of LC encoding'.format(targets))
+    print('  each target:  {:.2f}'.format(per_call_start(encode, targets, CALLS)))
+    print('  cache, cold:  {:.2f}'.format(per_call_start(cache.encode, targets, CALLS)))
+    print('  cache, warm:  {:.2f}'.format(per_call_start(cache.encode, targets, CALLS)))
+
+    cache = hb_lc.lcCache()
+    keyups = random.Random(0)
+    start = time()
+    for i in range(KEYUPS):
+        subscriber = keyups.randrange(SUBSCRIBERS)
+        cache.encode(lc(subscriber % TALKGROUPS, 3120000 + subscriber))
+    print('{} key-ups by {} subscribers on {} talkgroups, cache of {}: {:.0f} us each, {:.0%} hits'.format(
+        KEYUPS, SUBSCRIBERS, TALKGROUPS, len(cache), 1e6 * (time() - start) / KEYUPS, float(cache.hits) / KEYUPS))
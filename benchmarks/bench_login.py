@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+A login storm: PEERS peers, each on its own loopback address, all log in to a
+MASTER at once (as after a restart) while one peer that is already connected
+keeps sending DMRD frames. The master sends each frame straight back, so the
+round trip shows how long voice waits behind the logins. Run with login
+admission (hb_login, the default rates) and without it (rates set so high
+nothing is ever queued).
+
+Peers act like MMDVMHost: RPTL, then RPTK with the salt, then RPTC, and start
+again from RPTL if they get no answer within RETRY seconds.
+
+    python benchmarks/bench_login.py [peers]
+'''
+
+from __future__ import print_function
+
+import ConfigParser
+import hashlib
+import logging
+import os
+import select
+import socket
+import sys
+import tempfile
+from binascii import a2b_hex as bhex
+from struct import pack
+from time import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+PEERS = 5000
+RETRY = 5.0
+PROBE_INTERVAL = 0.01
+PROBE_LOST = 1.0
+LIMIT = 60.0
+
+def mk_config(_peers, _admission):
+    import hb_config
+    sample = ConfigParser.ConfigParser()
+    sample.read(os.path.join(HERE, '..', 'hblink-SAMPLE.cfg'))
+    for section in sample.sections():
+        if sample.has_option(section, 'MODE') and section != 'MASTER-1':
+            sample.remove_section(section)
+    with tempfile.NamedTemporaryFile(suffix='.cfg') as cfg:
+        sample.write(cfg)
+        cfg.flush()
+        config = hb_config.build_config(cfg.name)
+    config['SYSTEMS']['MASTER-1'].update({'IP': '127.0.0.1', 'PORT': 0, 'MAX_PEERS': _peers + 1, 'REPEAT': False})
+    if not _admission:
+        config['SYSTEMS']['MASTER-1'].update({'LOGIN_RATE': 1e9, 'LOGIN_IP_RATE': 1e9})
+    return config
+
+# The master, in its own process. Sends its port down _pipe once it's listening.
+def master(_peers, _admission, _pipe):
+    import hblink
+    from twisted.internet import reactor
+    logging.getLogger('hblink').addHandler(logging.NullHandler())
+
+    class echo(hblink.HBSYSTEM):
+        def dmrd_received(self, _frame):
+            self.send_peer(_frame.peer_id, _frame.data)
+
+    config = mk_config(_peers, _admission)
+    system = echo('MASTER-1', config, None)
+    port = reactor.listenUDP(0, system, interface='127.0.0.1')
+    os.write(_pipe, pack('>H', port.getHost().port))
+    # The reactor's own SIGTERM handler stops it
+    reactor.addSystemEventTrigger('before', 'shutdown', lambda: os.write(_pipe, repr(
+        (system._logins.queued, system._logins.admitted, system._logins.rejected))))
+    reactor.run()
+    os._exit(0)
+
+def storm(_port, _peers, _passphrase):
+    dst = ('127.0.0.1', _port)
+    passphrase = _passphrase
+    config_pkt = lambda _id: 'RPTC' + _id + 'N0CALL  ' + '0' * 18 + '0101' + '0' * 17 + '000' + ' ' * 39 + 'F' + ' ' * 124 + ' ' * 80
+
+    poller = select.epoll()
+
+    # The probe logs in first, before the storm
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind(('127.0.0.1', 0))
+    probe.settimeout(2)
+    probe_id = pack('>I', 3119999)
+    probe.sendto('RPTL' + probe_id, dst)
+    salt = probe.recv(100)[6:10]
+    probe.sendto('RPTK' + probe_id + bhex(hashlib.sha256(salt + passphrase).hexdigest()), dst)
+    assert probe.recv(100)[:6] == 'RPTACK'
+    probe.sendto(config_pkt(probe_id), dst)
+    assert probe.recv(100)[:6] == 'RPTACK'
+    probe.setblocking(False)
+    frame = 'DMRD\x00\x2f\x9b\xe5\x00\x00\x09' + probe_id + '\x10\x00\x00\x00\x01' + '\x00' * 35
+    poller.register(probe.fileno(), select.EPOLLIN)
+
+    socks = {}
+    state = {}
+    for i in range(_peers):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.{}.{}.{}'.format(1 + i // 62500, (i // 250) % 250, 1 + i % 250), 0))
+        sock.setblocking(False)
+        socks[sock.fileno()] = (sock, pack('>I', 3120000 + i))
+        poller.register(sock.fileno(), select.EPOLLIN)
+
+    start = time()
+    for fd, (sock, peer_id) in socks.items():
+        sock.sendto('RPTL' + peer_id, dst)
+        state[fd] = ('RPTL', start)
+    connected = 0
+    rtts = []
+    lost = 0
+    sent_at = None
+    next_probe = start
+    while connected < _peers and time() - start < LIMIT:
+        now = time()
+        if sent_at is not None and now - sent_at > PROBE_LOST:
+            lost += 1
+            sent_at = None
+        if sent_at is None and now >= next_probe:
+            probe.sendto(frame, dst)
+            sent_at = now
+        for fd, events in poller.poll(0.005):
+            if fd == probe.fileno():
+                try:
+                    while True:
+                        probe.recv(100)
+                        if sent_at is not None:
+                            rtts.append(time() - sent_at)
+                        sent_at = None
+                        next_probe = time() + PROBE_INTERVAL
+                except socket.error:
+                    pass
+                continue
+            sock, peer_id = socks[fd]
+            try:
+                data = sock.recv(100)
+            except socket.error:
+                continue
+            step = state[fd][0]
+            if data[:6] == 'RPTACK':
+                if step == 'RPTL':
+                    sock.sendto('RPTK' + peer_id + bhex(hashlib.sha256(data[6:10] + passphrase).hexdigest()), dst)
+                    state[fd] = ('RPTK', time())
+                elif step == 'RPTK':
+                    sock.sendto(config_pkt(peer_id), dst)
+                    state[fd] = ('RPTC', time())
+                elif step == 'RPTC':
+                    state[fd] = ('DONE', time())
+                    connected += 1
+            elif data[:6] == 'MSTNAK':
+                sock.sendto('RPTL' + peer_id, dst)
+                state[fd] = ('RPTL', time())
+        # Peers that have heard nothing for a while start again
+        now = time()
+        if int(now * 2) != int((now - 0.005) * 2):
+            for fd, (step, when) in state.items():
+                if step != 'DONE' and now - when > RETRY:
+                    socks[fd][0].sendto('RPTL' + socks[fd][1], dst)
+                    state[fd] = ('RPTL', now)
+    elapsed = time() - start
+    for sock, peer_id in socks.values():
+        sock.close()
+    rtts.sort()
+    pick = lambda _q: rtts[min(len(rtts) - 1, int(_q * len(rtts)))] * 1e3 if rtts else float('nan')
+    return connected, elapsed, len(rtts), lost, pick(0.5), pick(0.99), (rtts[-1] * 1e3 if rtts else float('nan'))
+
+def run(_peers, _admission):
+    rd, wr = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(rd)
+        master(_peers, _admission, wr)
+    os.close(wr)
+    port = 0
+    while not port:
+        port = int(os.read(rd, 2).encode('hex'), 16)
+    result = storm(port, _peers, mk_config(_peers, _admission)['SYSTEMS']['MASTER-1']['PASSPHRASE'])
+    os.kill(pid, 15)
+    counters = os.read(rd, 200)
+    os.waitpid(pid, 0)
+    return result + (eval(counters) if counters else (0, 0, 0),)
+
+if __name__ == '__main__':
+    peers = int(sys.argv[1]) if len(sys.argv) > 1 else PEERS
+
+    print('{} peers logging in at once, DMRD round trip every {}ms meanwhile'.format(peers, int(PROBE_INTERVAL * 1e3)))
+    print('{:>10} {:>10} {:>10} {:>8} {:>6} {:>10} {:>10} {:>10} {:>24}'.format(
+        'admission', 'connected', 'seconds', 'probes', 'lost', 'rtt p50', 'rtt p99', 'rtt max', 'queued/admitted/rejected'))
+    for admission in (False, True):
+        connected, elapsed, probes, lost, p50, p99, worst, counters = run(peers, admission)
+        print('{:>10} {:>10} {:>10.1f} {:>8} {:>6} {:>8.1f}ms {:>8.1f}ms {:>8.1f}ms {:>24}'.format(
+            'on' if admission else 'off', connected, elapsed, probes, lost, p50, p99, worst, '/'.join(str(c) for c in counters)))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+What the hb_metrics counters cost. A MASTER with REPEAT on and a few peers is
+given DMRD frames from one of them (the transport's write() does nothing), and
+the time per frame is compared with the counting it does for each: received
+frames and bytes, the talkgroup, and the frames and bytes repeated (less the
+cost of calling a function to do it).
+
+Then the time to render the page for many systems, each with the most
+talkgroups counted (hb_const.METRICS_MAX_TALKGROUPS), which is paid only when
+the page is asked for.
+
+    python benchmarks/bench_metrics.py [peers]
+'''
+
+from __future__ import print_function
+
+import ConfigParser
+import os
+import sys
+import tempfile
+from struct import pack
+from time import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import hb_config
+import hb_const as const
+import hb_metrics
+import hblink
+from hb_peer import Peer
+
+PEERS = 10
+FRAMES = 100000
+SYSTEMS = 50
+
+FRAME = 'DMRD\x01\x2f\x9b\xe5\x00\x00\x09' + pack('>I', 3120000) + '\x10\xde\xad\xbe\xef' + '\x00' * 33 + '\x00\x00'
+
+class nullTransport(object):
+    def write(self, _datagram, _addr=None):
+        pass
+
+def mk_master(_peers):
+    sample = ConfigParser.ConfigParser()
+    sample.read(os.path.join(HERE, '..', 'hblink-SAMPLE.cfg'))
+    for section in sample.sections():
+        if sample.has_option(section, 'MODE') and section != 'MASTER-1':
+            sample.remove_section(section)
+    with tempfile.NamedTemporaryFile(suffix='.cfg') as cfg:
+        sample.write(cfg)
+        cfg.flush()
+        config = hb_config.build_config(cfg.name)
+    config['SYSTEMS']['MASTER-1'].update({'REPEAT': True, 'USE_ACL': False})
+    config['GLOBAL']['USE_ACL'] = False
+    master = hblink.HBSYSTEM('MASTER-1', config, None)
+    master.transport = nullTransport()
+    master.dmrd_received = lambda _frame: None
+    for i in range(_peers):
+        peer = Peer(pack('>I', 3120000 + i), ('10.0.0.{}'.format(i), 62031), time())
+        peer.connection = const.PEER_CONNECTED
+        master.peer_add(peer)
+    return master
+
+# Best of five, in ns per call
+def per_call(_fn, _calls):
+    best = None
+    for i in range(5):
+        start = time()
+        for j in xrange(_calls):
+            _fn()
+        best = time() - start if best is None else min(best, time() - start)
+    return 1e9 * best / _calls
+
+if __name__ == '__main__':
+    peers = int(sys.argv[1]) if len(sys.argv) > 1 else PEERS
+    master = mk_master(peers)
+    sockaddr = ('10.0.0.0', 62031)
+    received = lambda: master.datagramReceived(FRAME, sockaddr)
+    received()
+    assert master._metrics.rx_frames == 1 and master._metrics.tx_frames == peers - 1
+
+    # The same counting the master does for each frame it repeats
+    counts = hb_metrics.systemMetrics()
+    def count():
+        _metrics = counts
+        _metrics.received(1, FRAME[8:11], len(FRAME))
+        _metrics.tx_frames += peers - 1
+        _metrics.tx_bytes += (peers - 1) * len(FRAME)
+
+    frame_ns = per_call(received, FRAMES)
+    count_ns = per_call(count, FRAMES) - per_call(lambda: None, FRAMES)
+    print('MASTER with {} peers, REPEAT on'.format(peers))
+    print('frame received and repeated: {:.0f} ns'.format(frame_ns))
+    print('of which counting:           {:.0f} ns ({:.1f}%)'.format(count_ns, 100 * count_ns / frame_ns))
+
+    for i in range(SYSTEMS):
+        metrics = hb_metrics.system('SYSTEM-{}'.format(i))
+        for tg in range(const.METRICS_MAX_TALKGROUPS):
+            metrics.received(1 + tg % 2, pack('>I', tg)[1:], len(FRAME))
+    start = time()
+    page = hb_metrics.render()
+    print('render, {} systems x {} talkgroups: {:.0f} ms, {} kB'.format(SYSTEMS, const.METRICS_MAX_TALKGROUPS, 1e3 * (time() - start), len(page) // 1024))
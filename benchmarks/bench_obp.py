@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+OpenBridge packets per second on one core, for the part of the send and receive
+paths that differs: signing a DMRD frame on the way out, and checking the
+signature on the way in. hmac.new() per packet (as HBlink used to) against
+hb_hmac.hmacSHA1, keyed once per system.
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+from hashlib import sha1
+from hmac import new as hmac_new, compare_digest
+from timeit import repeat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hb_hmac import hmacSHA1
+
+PACKETS = 100000
+
+if __name__ == '__main__':
+    passphrase = 'password'
+    network_id = '\x00\x00\x00\x01'
+    frame = 'DMRD' + '\x00' * 49
+    keyed = hmacSHA1(passphrase)
+    assert keyed.digest(frame) == hmac_new(passphrase, frame, sha1).digest()
+    packet = frame + keyed.digest(frame)
+
+    def send_old():
+        _packet = frame[:11] + network_id + frame[15:]
+        _packet += hmac_new(passphrase, _packet, sha1).digest()
+
+    def send_new():
+        _packet = frame[:11] + network_id + frame[15:]
+        _packet += keyed.digest(_packet)
+
+    def recv_old():
+        _data = packet[:53]
+        _hash = packet[53:]
+        _ckhs = hmac_new(passphrase, _data, sha1).digest()
+        compare_digest(_hash, _ckhs)
+
+    def recv_new():
+        _data = packet[:53]
+        _hash = packet[53:]
+        _ckhs = keyed.digest(_data)
+        compare_digest(_hash, _ckhs)
+
+    print('{:>8} {:>14} {:>14} {:>9}'.format('', 'hmac.new pps', 'keyed pps', 'speedup'))
+    for name, old, new in (('send', send_old, send_new), ('receive', recv_old, recv_new)):
+        t_old = min(repeat(old, number=PACKETS, repeat=5)) / PACKETS
+        t_new = min(repeat(new, number=PACKETS, repeat=5)) / PACKETS
+        print('{:>8} {:>14,.0f} {:>14,.0f} {:>8.1f}x'.format(name, 1 / t_old, 1 / t_new, t_old / t_new))
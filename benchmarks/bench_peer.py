@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+The MASTER peer table with 5000 peers: the original 22 key dictionaries against
+hb_peer.Peer records with a sockaddr index. Shows the memory taken by each peer's
+record (the values in it are the same either way and aren't counted) and the
+cost of the "is this a logged in peer, sending from the right address" check
+made for every packet.
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+from struct import pack
+from timeit import repeat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hb_const as const
+from hb_peer import Peer
+
+PEERS = 5000
+CHECKS = 100000
+
+if __name__ == '__main__':
+    now = 1500000000.0
+    records = []
+    dicts = {}
+    peers = {}
+    sockaddrs = {}
+    for i in range(PEERS):
+        peer_id = pack('>I', 3120000 + i)
+        sockaddr = ('10.{}.{}.{}'.format(i >> 16, (i >> 8) & 0xff, i & 0xff), 62031)
+        peer = Peer(peer_id, sockaddr, now)
+        peer.connection = const.PEER_CONNECTED
+        peers[peer_id] = peer
+        sockaddrs[sockaddr] = peer
+        _dict = peer.export()
+        dicts[peer_id] = _dict
+        records.append((peer_id, sockaddr))
+
+    dict_size = sum(sys.getsizeof(_dict) for _dict in dicts.values()) / float(PEERS)
+    slot_size = sum(sys.getsizeof(_peer) for _peer in peers.values()) / float(PEERS)
+    index_size = sys.getsizeof(sockaddrs) / float(PEERS)
+
+    # Cycle through every peer so the lookups aren't all for the same key
+    packets = (records * (CHECKS // PEERS + 1))[:CHECKS]
+
+    def dict_check():
+        for _peer_id, _sockaddr in packets:
+            if _peer_id in dicts \
+                        and dicts[_peer_id]['CONNECTION'] == 'YES' \
+                        and dicts[_peer_id]['SOCKADDR'] == _sockaddr:
+                pass
+
+    def index_check():
+        for _peer_id, _sockaddr in packets:
+            _peer = sockaddrs.get(_sockaddr)
+            if _peer is not None and _peer.peer_id == _peer_id and _peer.connection == const.PEER_CONNECTED:
+                pass
+
+    t_dict = min(repeat(dict_check, number=1, repeat=5)) / CHECKS * 1e9
+    t_index = min(repeat(index_check, number=1, repeat=5)) / CHECKS * 1e9
+
+    print('{} peers'.format(PEERS))
+    print('{:>24} {:>14} {:>16}'.format('', 'bytes/peer', 'ns/check'))
+    print('{:>24} {:>14.0f} {:>16.1f}'.format('dict', dict_size, t_dict))
+    print('{:>24} {:>14.0f} {:>16.1f}'.format('Peer + sockaddr index', slot_size + index_size, t_index))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Receives DMRD sized packets at 50,000 packets per second on the loopback
+interface, with Twisted's own UDP port and with hb_mmsg.batchPort, and reports
+the CPU time the receiving process spent per packet. The packets are sent by a
+separate process, so its CPU time isn't counted. The protocol only counts the
+packets, so the difference is all in the receive path.
+
+    python benchmarks/bench_recv.py [seconds] [batch]
+'''
+
+from __future__ import print_function
+
+import os
+import socket
+import sys
+from time import time, sleep
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from twisted.internet.protocol import DatagramProtocol
+from twisted.internet import reactor
+
+import hb_mmsg
+
+RATE = 50000
+BURST = 250
+
+class counter(DatagramProtocol):
+    def __init__(self):
+        self.packets = 0
+
+    def datagramReceived(self, _data, _sockaddr):
+        self.packets += 1
+
+# Send RATE packets per second to _port for _seconds, in bursts of BURST
+def sender(_port, _seconds):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    data = 'DMRD' + '\x00' * 51
+    start = time()
+    sent = 0
+    while sent < RATE * _seconds:
+        for i in range(BURST):
+            sock.sendto(data, ('127.0.0.1', _port))
+        sent += BURST
+        delay = start + float(sent) / RATE - time()
+        if delay > 0:
+            sleep(delay)
+    os._exit(0)
+
+def run(_batch, _seconds):
+    proto = counter()
+    listener = hb_mmsg.listen_udp(reactor, 0, proto, '127.0.0.1', _batch)
+    listener.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    port = listener.getHost().port
+    pid = os.fork()
+    if pid == 0:
+        sender(port, _seconds)
+    cpu = os.times()
+    start = time()
+    reactor.callLater(_seconds + 0.5, reactor.stop)
+    reactor.run()
+    cpu_used = sum(os.times()[:2]) - sum(cpu[:2])
+    os.waitpid(pid, 0)
+    calls = getattr(listener, 'calls', proto.packets)
+    return proto.packets, cpu_used, time() - start, calls
+
+if __name__ == '__main__':
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    if not hb_mmsg.RECV_AVAILABLE:
+        print('recvmmsg() is not available on this platform')
+        sys.exit(1)
+
+    # The reactor can only be run once per process, so each port gets its own
+    results = []
+    for _batch in (0, batch):
+        rd, wr = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(rd)
+            os.write(wr, repr(run(_batch, seconds)))
+            os._exit(0)
+        os.close(wr)
+        result = ''
+        while True:
+            chunk = os.read(rd, 4096)
+            if not chunk:
+                break
+            result += chunk
+        os.waitpid(pid, 0)
+        results.append((_batch, eval(result)))
+
+    print('{} packets/s for {}s'.format(RATE, seconds))
+    print('{:>10} {:>10} {:>10} {:>12} {:>16}'.format('port', 'received', 'cpu %', 'us/packet', 'packets/syscall'))
+    for _batch, (packets, cpu_used, elapsed, calls) in results:
+        print('{:>10} {:>10} {:>10.1f} {:>12.2f} {:>16.1f}'.format(
+            'twisted' if _batch < 2 else 'batch {}'.format(_batch), packets, 100 * cpu_used / elapsed,
+            1e6 * cpu_used / max(packets, 1), float(packets) / max(calls, 1)))
+    saved = 1e6 * (results[0][1][1] / max(results[0][1][0], 1) - results[1][1][1] / max(results[1][1][0], 1))
+    print('CPU saved per packet: {:.2f} us'.format(saved))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+The periodic report for a MASTER with PEERS connected peers: the time to build
+it and its size, sent in full (CONFIG_SND) and as the changes since the last one
+(CONFIG_UPD, REPORT_DELTAS). For the changes, three cases: nothing changed,
+every peer pinged (as they all will have, in the default 60 second interval),
+and on top of that a hundredth of the peers re-connected.
+
+    python benchmarks/bench_report.py [peers]
+'''
+
+from __future__ import print_function
+
+import cPickle as pickle
+import os
+import sys
+from struct import pack
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hb_const as const
+from hb_peer import Peer, export_systems, exportTracker
+
+PEERS = 10000
+RUNS = 5
+
+def mk_systems(_peers, _now):
+    peers = {}
+    for i in range(_peers):
+        peer = Peer(pack('>I', 3120000 + i), ('10.{}.{}.{}'.format(i // 62500, (i // 250) % 250, i % 250), 62031), _now)
+        peer.configure('RPTC' + peer.peer_id + 'N0CALL  ' + '449000000444000000' + '0101' + '38.00000' + '-095.0000' + '000' +
+                       'Somewhere'.ljust(20) + 'A repeater'.ljust(19) + '4' + 'http://example.com'.ljust(124) +
+                       '20180101'.ljust(40) + 'MMDVM'.ljust(40))
+        peer.connection = const.PEER_CONNECTED
+        peers[peer.peer_id] = peer
+    return {'MASTER-1': {'MODE': 'MASTER', 'ENABLED': True, 'IP': '', 'PORT': 62031, 'PASSPHRASE': 'passw0rd',
+                         'GROUP_HANGTIME': 5, 'USE_ACL': False, 'PEERS': peers}}
+
+def full(_systems):
+    return pickle.dumps(export_systems(_systems), protocol=pickle.HIGHEST_PROTOCOL)
+
+def delta(_tracker, _systems):
+    _delta = _tracker.delta(_systems)
+    return pickle.dumps(_delta, protocol=pickle.HIGHEST_PROTOCOL) if _delta else ''
+
+# Each peer pings, and every _every'th peer also logs in again
+def churn(_systems, _now, _every=None):
+    for i, peer in enumerate(_systems['MASTER-1']['PEERS'].itervalues()):
+        peer.pings_received += 1
+        peer.last_ping = _now
+        if _every and i % _every == 0:
+            peer.salt += 1
+            peer.connected = _now
+
+# Best of RUNS for _fn, with _prepare run (untimed) before each
+def best(_fn, _prepare=lambda: None):
+    times = []
+    for i in range(RUNS):
+        _prepare()
+        start = time()
+        message = _fn()
+        times.append(time() - start)
+    return min(times), len(message)
+
+if __name__ == '__main__':
+    peers = int(sys.argv[1]) if len(sys.argv) > 1 else PEERS
+    now = time()
+    systems = mk_systems(peers, now)
+    tracker = exportTracker()
+    delta(tracker, systems)
+
+    rows = [
+        ('full', best(lambda: full(systems))),
+        ('no change', best(lambda: delta(tracker, systems))),
+        ('all pinged', best(lambda: delta(tracker, systems), lambda: churn(systems, time()))),
+        ('+1% logins', best(lambda: delta(tracker, systems), lambda: churn(systems, time(), 100))),
+    ]
+
+    print('{} peers'.format(peers))
+    print('{:>12} {:>10} {:>10}'.format('report', 'ms', 'KiB'))
+    for name, (seconds, size) in rows:
+        print('{:>12} {:>10.1f} {:>10.1f}'.format(name, seconds * 1e3, size / 1024.0))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+A reporting client that connects and then never reads, while EVENTS bridge
+events are sent (a batch each reactor turn, as a busy bridge would). Reports
+the most memory held for that client (in Twisted's write buffer and in its
+event queue), the events dropped, whether it was disconnected, and the time
+taken per event sent -- with the bounded queues, and with every event written
+straight to the connection, as before.
+
+    python benchmarks/bench_report_clients.py [events]
+'''
+
+from __future__ import print_function
+
+import logging
+import os
+import socket
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from twisted.internet import reactor
+
+import hblink
+from reporting_const import REPORT_OPCODES
+
+logging.basicConfig(level=logging.ERROR)
+
+EVENTS = 200000
+BATCH = 500
+EVENT = REPORT_OPCODES['BRDG_EVENT'] + 'GROUP VOICE,START,RX,MASTER-1,1234567890,3120000,3129999,1,9'
+
+CONFIG = {'SYSTEMS': {}, 'REPORTS': {'REPORT_CLIENTS': ['*'], 'REPORT_DELTAS': True, 'REPORT_FORMAT': 'pickle'}}
+
+# Bytes Twisted is holding to write to _transport
+def buffered(_transport):
+    return len(_transport.dataBuffer) + _transport._tempDataLen
+
+def run(_events, _bounded):
+    factory = hblink.reportFactory(CONFIG)
+    factory.clients = []
+    if not _bounded:
+        hblink.report.send = lambda self, _message, _report=False: self.sendString(_message)
+        hblink.report.connectionMade = lambda self: self._factory.clients.append(self)
+    port = reactor.listenTCP(0, factory, interface='127.0.0.1')
+    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    client.connect(('127.0.0.1', port.getHost().port))
+    result = {'sent': 0, 'held': 0, 'time': 0.0}
+
+    def batch():
+        if not factory.clients and result['sent']:
+            return finish(True)
+        if factory.clients:
+            start = time()
+            for i in xrange(BATCH):
+                factory.send_clients(EVENT)
+            result['time'] += time() - start
+            result['sent'] += BATCH
+            peer = factory.clients[0]
+            held = buffered(peer.transport) + sum(len(_message) for _message in getattr(peer, '_queue', ()))
+            result['held'] = max(result['held'], held)
+        if result['sent'] >= _events:
+            return finish(False)
+        reactor.callLater(0, batch)
+
+    def finish(_disconnected):
+        result['disconnected'] = _disconnected
+        result['dropped'] = factory.dropped
+        for peer in factory.clients:
+            peer.transport.abortConnection()
+        port.stopListening()
+        client.close()
+        reactor.callLater(0.1, reactor.stop)
+
+    reactor.callLater(0.1, batch)
+    reactor.run()
+    return result
+
+if __name__ == '__main__':
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    # The reactor can only be run once, so each way is run in its own process
+    if len(sys.argv) > 2:
+        result = run(events, sys.argv[2] == 'bounded')
+        print('{:>10} {:>10} {:>10} {:>12} {:>10.2f}'.format(sys.argv[2], result['held'] // 1024, result['dropped'],
+              'yes' if result['disconnected'] else 'no', 1e6 * result['time'] / max(result['sent'], 1)))
+        sys.exit()
+    print('{} events to a client that never reads'.format(events))
+    print('{:>10} {:>10} {:>10} {:>12} {:>10}'.format('queues', 'max KiB', 'dropped', 'disconnected', 'us/event'))
+    sys.stdout.flush()
+    for way in ('unbounded', 'bounded'):
+        os.spawnv(os.P_WAIT, sys.executable, [sys.executable, os.path.abspath(__file__), str(events), way])
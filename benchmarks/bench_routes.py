@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Finding where a group voice frame goes in hb_confbridge, for bridge tables of
+different sizes: searching every entry of every bridge (as the routers did for
+each frame) against a lookup in hb_confbridge's routing index. Each bridge has
+one talkgroup on five of SYSTEMS systems, all but one of them ACTIVE; the frame is
+from the first system, on a talkgroup in one bridge. Also the time to build the
+index, and to re-index one bridge when an entry's ACTIVE flips.
+
+    python benchmarks/bench_routes.py [bridges ...]
+'''
+
+from __future__ import print_function
+
+import os
+import random
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dmr_utils.utils import hex_str_3
+import hb_confbridge
+
+SIZES = (10, 100, 500, 2000)
+SYSTEMS = 20
+FRAMES = 10000
+
+def mk_bridges(_bridges):
+    _random = random.Random(_bridges)
+    _table = {}
+    for i in range(_bridges):
+        _table['TG{}'.format(i)] = [{
+            'SYSTEM': 'SYSTEM-{}'.format(_system), 'TS': 1 + (_system % 2), 'TGID': hex_str_3(i),
+            'ACTIVE': _n != 1,
+            'TIMEOUT': 120, 'TO_TYPE': 'NONE', 'ON': [], 'OFF': [], 'RESET': [], 'TIMER': 0,
+        } for _n, _system in enumerate([0] + _random.sample(range(1, SYSTEMS), 4))]
+    return _table
+
+# The search the routers did, collecting the targets instead of sending to them
+def search(_bridges, _system_name, _dst_id, _slot):
+    _found = []
+    for _bridge in _bridges:
+        for _system in _bridges[_bridge]:
+            if (_system['SYSTEM'] == _system_name and _system['TGID'] == _dst_id and _system['TS'] == _slot and _system['ACTIVE'] == True):
+                for _target in _bridges[_bridge]:
+                    if (_target['SYSTEM'] != _system_name) and (_target['ACTIVE']):
+                        _found.append(_target)
+    return _found
+
+def lookup(_system_name, _dst_id, _slot):
+    _found = []
+    for _bridge, _system, _targets in hb_confbridge.ROUTES.get((_system_name, _dst_id, _slot), ()):
+        for _target in _targets:
+            _found.append(_target)
+    return _found
+
+# Best of three, in microseconds per call
+def per_call(_fn, _calls):
+    best = None
+    for i in range(3):
+        start = time()
+        for j in xrange(_calls):
+            _fn()
+        best = time() - start if best is None else min(best, time() - start)
+    return 1e6 * best / _calls
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print('{:>8} {:>12} {:>12} {:>12} {:>12}'.format('bridges', 'search us', 'index us', 'build ms', 'flip us'))
+    for size in sizes:
+        bridges = hb_confbridge.BRIDGES = mk_bridges(size)
+        start = time()
+        hb_confbridge.build_routes()
+        build_ms = 1e3 * (time() - start)
+
+        frame = ('SYSTEM-0', hex_str_3(size // 2), 1)
+        assert search(bridges, *frame) == lookup(*frame) != []
+        frames = max(FRAMES // size, 100)
+        search_us = per_call(lambda: search(bridges, *frame), frames)
+        index_us = per_call(lambda: lookup(*frame), FRAMES)
+
+        entry = bridges['TG{}'.format(size // 2)][1]
+        def flip():
+            entry['ACTIVE'] = not entry['ACTIVE']
+            hb_confbridge.route_bridge('TG{}'.format(size // 2))
+        flip_us = per_call(flip, 1000)
+        print('{:>8} {:>12.1f} {:>12.2f} {:>12.1f} {:>12.1f}'.format(size, search_us, index_us, build_ms, flip_us))
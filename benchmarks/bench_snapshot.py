@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Writes and reads back a MASTER peer table of PEERS configured peers, with
+hb_snapshot (marshal'ed tuples) and, for comparison, with cPickle of the
+exported peer dictionaries. Reports the time for each and the file size.
+
+    python benchmarks/bench_snapshot.py [peers]
+'''
+
+from __future__ import print_function
+
+import cPickle as pickle
+import os
+import shutil
+import sys
+import tempfile
+from struct import pack
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hb_const as const
+import hb_snapshot
+from hb_peer import Peer
+
+PEERS = 10000
+RUNS = 5
+
+def mk_peers(_peers, _now):
+    peers = []
+    for i in range(_peers):
+        peer = Peer(pack('>I', 3120000 + i), ('10.{}.{}.{}'.format(i // 62500, (i // 250) % 250, i % 250), 62031), _now)
+        peer.configure('RPTC' + peer.peer_id + 'N0CALL  ' + '449000000444000000' + '0101' + '38.0000-095.0000' + '000' +
+                       'Somewhere'.ljust(20) + 'A repeater'.ljust(19) + '4' + 'http://example.com'.ljust(124) +
+                       '20180101'.ljust(40) + 'MMDVM'.ljust(40))
+        peer.connection = const.PEER_CONNECTED
+        peers.append(peer)
+    return peers
+
+def best(_fn):
+    times = []
+    for i in range(RUNS):
+        start = time()
+        _fn()
+        times.append(time() - start)
+    return min(times)
+
+def pickle_save(_path, _peers):
+    with open(_path, 'wb') as _file:
+        pickle.dump(dict((_peer.peer_id, _peer.export()) for _peer in _peers), _file, pickle.HIGHEST_PROTOCOL)
+
+def pickle_load(_path):
+    with open(_path, 'rb') as _file:
+        return pickle.load(_file)
+
+if __name__ == '__main__':
+    peers = int(sys.argv[1]) if len(sys.argv) > 1 else PEERS
+    now = time()
+    table = mk_peers(peers, now)
+    work = tempfile.mkdtemp()
+    try:
+        results = []
+
+        # hb_snapshot.load() removes the file, so each read gets a fresh copy
+        save = best(lambda: hb_snapshot.save(work, 'MASTER-1', table))
+        size = os.path.getsize(hb_snapshot.snapshot_path(work, 'MASTER-1'))
+        def load():
+            hb_snapshot.save(work, 'MASTER-1', table)
+            start = time()
+            restored = hb_snapshot.load(work, 'MASTER-1', now, 60)
+            assert len(restored) == peers
+            return time() - start
+        results.append(('hb_snapshot', save, min(load() for i in range(RUNS)), size))
+
+        path = os.path.join(work, 'MASTER-1.pickle')
+        save = best(lambda: pickle_save(path, table))
+        results.append(('cPickle', save, best(lambda: pickle_load(path)), os.path.getsize(path)))
+    finally:
+        shutil.rmtree(work)
+
+    print('{} peers'.format(peers))
+    print('{:>12} {:>10} {:>10} {:>10}'.format('format', 'save ms', 'load ms', 'KiB'))
+    for name, save, load, size in results:
+        print('{:>12} {:>10.1f} {:>10.1f} {:>10.0f}'.format(name, save * 1e3, load * 1e3, size / 1024.0))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Cold start time: starts hblink.py with MASTER-1 from hblink-SAMPLE.cfg and a
+subscriber alias file of USERS records (about the size of the RadioID dump),
+and reports how long it takes until the master answers a login, until the
+aliases have been loaded, and the longest the master took to answer a packet
+in between. Nothing is downloaded.
+
+To compare with another version, give the hblink.py to run (e.g. from a git
+worktree of an older commit):
+
+    python benchmarks/bench_startup.py [users] [path/to/hblink.py]
+'''
+
+from __future__ import print_function
+
+import ConfigParser
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from struct import pack
+from time import time, sleep
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+USERS = 250000
+RUNS = 3
+LIMIT = 120.0
+
+def free_port(_type):
+    sock = socket.socket(socket.AF_INET, _type)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def mk_aliases(_dir, _users):
+    with open(os.path.join(_dir, 'subscriber_ids.json'), 'w') as _file:
+        json.dump({'users': [{'id': 3100000 + i, 'callsign': 'N{}ABC'.format(i % 10), 'name': 'Name', 'surname': 'Surname',
+                              'city': 'City', 'state': 'State', 'country': 'United States', 'remarks': ''} for i in range(_users)]}, _file)
+    with open(os.path.join(_dir, 'peer_ids.json'), 'w') as _file:
+        json.dump({'rptrs': [{'id': 312000 + i, 'callsign': 'N{}RPT'.format(i % 10)} for i in range(5000)]}, _file)
+    with open(os.path.join(_dir, 'talkgroup_ids.json'), 'w') as _file:
+        json.dump({'talkgroups': [{'id': i, 'callsign': 'TG {}'.format(i)} for i in range(1, 1000)]}, _file)
+
+def mk_config(_dir, _port):
+    config = ConfigParser.ConfigParser()
+    config.read(os.path.join(HERE, '..', 'hblink-SAMPLE.cfg'))
+    for section in config.sections():
+        if config.has_option(section, 'MODE') and section != 'MASTER-1':
+            config.remove_section(section)
+    config.set('MASTER-1', 'IP', '127.0.0.1')
+    config.set('MASTER-1', 'PORT', str(_port))
+    config.set('REPORTS', 'REPORT_PORT', str(free_port(socket.SOCK_STREAM)))
+    config.set('LOGGER', 'LOG_HANDLERS', 'console')
+    config.set('ALIASES', 'TRY_DOWNLOAD', 'False')
+    config.set('ALIASES', 'PATH', _dir + '/')
+    path = os.path.join(_dir, 'hblink.cfg')
+    with open(path, 'w') as _file:
+        config.write(_file)
+    return path
+
+# One start: seconds until the master answers RPTL, and until the log says the
+# aliases are loaded
+def run(_hblink, _config, _port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(0.005)
+    loaded = []
+    start = time()
+    proc = subprocess.Popen([sys.executable, _hblink, '-c', _config], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    def watch():
+        for line in iter(proc.stdout.readline, ''):
+            if 'talkgroup_ids dictionary is available' in line or 'aliases loaded' in line:
+                loaded.append(time() - start)
+    watcher = threading.Thread(target=watch)
+    watcher.daemon = True
+    watcher.start()
+
+    answered = None
+    while answered is None and time() - start < LIMIT:
+        sock.sendto('RPTL' + pack('>I', 3120000), ('127.0.0.1', _port))
+        try:
+            if sock.recv(100)[:6] in ('RPTACK', 'MSTNAK'):
+                answered = time() - start
+        except socket.error:
+            pass
+    # Until they're loaded, how long the master takes to answer (pings from a peer
+    # that isn't logged in, which are answered straight away)
+    worst = 0
+    while answered is not None and not loaded and time() - start < LIMIT:
+        sent = time()
+        sock.sendto('RPTPING' + pack('>I', 3120000), ('127.0.0.1', _port))
+        while time() - sent < LIMIT:
+            try:
+                if sock.recv(100)[:6] == 'MSTNAK':
+                    break
+            except socket.error:
+                pass
+        worst = max(worst, time() - sent)
+        sleep(0.005)
+    proc.terminate()
+    proc.wait()
+    sock.close()
+    return answered, loaded[0] if loaded else None, worst
+
+if __name__ == '__main__':
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+    hblink = os.path.abspath(sys.argv[2]) if len(sys.argv) > 2 else os.path.join(HERE, '..', 'hblink.py')
+    work = tempfile.mkdtemp()
+    try:
+        mk_aliases(work, users)
+        port = free_port(socket.SOCK_DGRAM)
+        config = mk_config(work, port)
+        results = [run(hblink, config, port) for i in range(RUNS)]
+    finally:
+        shutil.rmtree(work)
+
+    print('{} with {} subscriber aliases, best of {}'.format(hblink, users, RUNS))
+    answered = min(result[0] for result in results)
+    loaded = min(result[1] for result in results)
+    print('first login answered: {:.2f}s'.format(answered))
+    print('aliases loaded:       {:.2f}s'.format(loaded))
+    print('longest wait for an answer while loading: {:.0f}ms'.format(1e3 * min(result[2] for result in results)))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+The cost of giving each forwarded DMRD frame its destination's ID. For a MASTER
+sending a frame to all its peers (send_peers), the frame used to be sliced and
+joined back together for every peer; now it is copied into an hb_frame.txBuffer
+once and only the ID is written over it for each peer. The transport's write()
+does nothing, so only building the datagrams is measured.
+
+For comparison, the same buffer used for a single destination, as a PEER's
+send_master() or OpenBridge's send_system() would: with nothing to share
+between destinations, the copy costs more than the slicing it replaces, so
+those are left as they are.
+
+Python 2 has no allocation counter, so the new objects made per datagram are
+counted from the code: the old way makes two slices, a list (or an intermediate
+string) and the result; each write through the memoryview makes a slice object.
+
+    python benchmarks/bench_tx.py [peers]
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+from struct import pack
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hb_frame import txBuffer
+from hb_peer import Peer
+
+PEERS = 100
+SENDS = 200000
+
+FRAME = 'DMRD\x01\x2f\x9b\xe5\x00\x00\x09' + pack('>I', 3120000) + '\x10\xde\xad\xbe\xef' + '\x00' * 33 + '\x00\x00'
+RADIO_ID = pack('>I', 3129998)
+TARGET = ('127.0.0.1', 62035)
+
+class nullTransport(object):
+    def write(self, _datagram, _addr=None):
+        pass
+
+# Just enough of HBSYSTEM to run send_peers() as it was before txBuffer and as it
+# is now, and a single destination send each way
+class system(object):
+    def __init__(self, _peers):
+        self.transport = nullTransport()
+        self._peers = _peers
+        self._tx = txBuffer()
+
+    def send_peers_old(self, _packet):
+        for _peer in self._peers:
+            self.transport.write(''.join([_packet[:11], _peer, _packet[15:]]), self._peers[_peer].sockaddr)
+
+    def send_peers_new(self, _packet):
+        if _packet[:4] != 'DMRD':
+            return
+        _buf = self._tx.load(_packet)
+        _view = self._tx.view
+        for _peer, _this_peer in self._peers.iteritems():
+            _view[11:15] = _peer
+            self.transport.write(_buf, _this_peer.sockaddr)
+
+    def send_one_old(self, _packet):
+        if _packet[:4] == 'DMRD':
+            _packet = _packet[:11] + RADIO_ID + _packet[15:]
+        self.transport.write(_packet, TARGET)
+
+    def send_one_new(self, _packet):
+        if _packet[:4] == 'DMRD':
+            _packet = self._tx.load(_packet)
+            self._tx.view[11:15] = RADIO_ID
+        self.transport.write(_packet, TARGET)
+
+# Best of five, in ns per datagram sent
+def per_send(_send, _packet, _calls, _per_call):
+    best = None
+    for i in range(5):
+        start = time()
+        for j in xrange(_calls):
+            _send(_packet)
+        elapsed = time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return 1e9 * best / (_calls * _per_call)
+
+if __name__ == '__main__':
+    peers = int(sys.argv[1]) if len(sys.argv) > 1 else PEERS
+    table = {}
+    for i in range(peers):
+        peer = Peer(pack('>I', 3120000 + i), ('10.0.{}.{}'.format(i // 250, i % 250), 62031), time())
+        table[peer.peer_id] = peer
+    test = system(table)
+
+    # Same bytes either way
+    sent = []
+    test.transport.write = lambda _datagram, _addr=None: sent.append(str(_datagram))
+    test.send_peers_old(FRAME)
+    test.send_peers_new(FRAME)
+    assert sorted(sent[:peers]) == sorted(sent[peers:])
+    test.transport = nullTransport()
+
+    rows = (
+        ('send_peers', test.send_peers_old, test.send_peers_new, SENDS // peers, peers, 4, 1),
+        ('single', test.send_one_old, test.send_one_new, SENDS, 1, 4, 2),
+    )
+    print('{} peers'.format(peers))
+    print('{:>12} {:>12} {:>12} {:>12} {:>12}'.format('path', 'sliced ns', 'txBuffer ns', 'sliced obj', 'txBuffer obj'))
+    for name, old, new, calls, per_call, old_objects, new_objects in rows:
+        print('{:>12} {:>12.0f} {:>12.0f} {:>12} {:>12}'.format(
+            name, per_send(old, FRAME, calls, per_call), per_send(new, FRAME, calls, per_call), old_objects, new_objects))
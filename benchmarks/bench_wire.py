@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Encoding the full report (CONFIG_SND) of a MASTER with 1k and 10k peers: time
+and size with pickle (as before) and with the hb_wire format, and with the
+hb_wire format again when the peer records of the last one are kept: nothing
+changed since, and a tenth of the peers having pinged since.
+
+    python benchmarks/bench_wire.py [peers ...]
+'''
+
+from __future__ import print_function
+
+import cPickle as pickle
+import os
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hb_wire
+from hb_peer import export_systems
+from bench_report import mk_systems
+
+PEERS = (1000, 10000)
+RUNS = 5
+
+# Every _every'th peer pings, then the report is encoded with the records kept
+def pinged(_systems, _cache, _every):
+    for i, peer in enumerate(_systems['MASTER-1']['PEERS'].itervalues()):
+        if i % _every == 0:
+            peer.pings_received += 1
+    return hb_wire.encode_config(_systems, _cache)
+
+def best(_fn):
+    times = []
+    for i in range(RUNS):
+        start = time()
+        result = _fn()
+        times.append(time() - start)
+    return min(times), result
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or PEERS
+    print('{:>7} {:>10} {:>10} {:>10}'.format('peers', 'report', 'ms', 'KiB'))
+    for peers in sizes:
+        systems = mk_systems(peers, time())
+        rows = (
+            ('pickle', best(lambda: pickle.dumps(export_systems(systems), protocol=pickle.HIGHEST_PROTOCOL))),
+            ('wire', best(lambda: hb_wire.encode_config(systems))),
+        )
+        cache = {}
+        hb_wire.encode_config(systems, cache)
+        rows += (
+            ('unchanged', best(lambda: hb_wire.encode_config(systems, cache))),
+            ('10% pinged', best(lambda: pinged(systems, cache, 10))),
+        )
+        for name, (seconds, message) in rows:
+            print('{:>7} {:>10} {:>10.1f} {:>10.1f}'.format(peers, name, seconds * 1e3, len(message) / 1024.0))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Access control list matching for HBlink. ACLs are compiled once, when the
+configuration is loaded, into a sorted list of non-overlapping ranges so that
+checking an ID on the packet path is a binary search instead of a walk over
+every entry in the list.
+'''
+
+from __future__ import print_function
+
+from bisect import bisect_right
+from binascii import b2a_hex as ahex
+from collections import OrderedDict
+
+import hb_const as const
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# Compile an action and a collection of (start, end) tuples into a usable ACL:
+# ORIGINAL:  (False, set([(1, 5), (3, 9), (10, 10), (3120101, 3120101)]))
+# COMPILED:  (False, (1, 3120101), (10, 3120101))
+# Overlapping and adjacent ranges are merged, the start and end of each range
+# are kept in two parallel tuples sorted by start.
+def acl_compile(_action, _ranges):
+    starts = []
+    ends = []
+    for start, end in sorted(_ranges):
+        if ends and start <= ends[-1] + 1:
+            if end > ends[-1]:
+                ends[-1] = end
+        else:
+            starts.append(start)
+            ends.append(end)
+    return (_action, tuple(starts), tuple(ends))
+
+# Check an integer ID against a compiled ACL. Returns action (True|False) based
+# on matching and the action specified.
+def acl_check_int(_id, _acl):
+    i = bisect_right(_acl[1], _id) - 1
+    if i >= 0 and _id <= _acl[2][i]:
+        return _acl[0]
+    return not _acl[0]
+
+# Same as above, but for an ID as it appears in a packet (big-endian string)
+def acl_check(_id, _acl):
+    return acl_check_int(int(ahex(_id), 16), _acl)
+
+
+# Remembers the ACL verdict for each call stream, so only the first frame of a
+# stream is run through the ACLs. Keyed by (stream_id, slot). An entry goes away
+# on the voice terminator (expire), or when the stream has been quiet longer than
+# the timeout. When full, the oldest stream is forgotten -- worst case it just
+# gets checked against the ACLs again.
+class verdictCache(object):
+    def __init__(self, _timeout=const.STREAM_TO, _size=const.ACL_CACHE_SIZE):
+        self._timeout = _timeout
+        self._size = _size
+        self._streams = OrderedDict()
+
+    def __len__(self):
+        return len(self._streams)
+
+    # Returns True|False for a known stream, None if it needs to be checked
+    def get(self, _key, _now):
+        entry = self._streams.get(_key)
+        if entry is None:
+            return None
+        if _now - entry[1] > self._timeout:
+            del self._streams[_key]
+            return None
+        entry[1] = _now
+        return entry[0]
+
+    def put(self, _key, _verdict, _now):
+        if _key not in self._streams and len(self._streams) >= self._size:
+            self._streams.popitem(last=False)
+        self._streams[_key] = [_verdict, _now]
+
+    def expire(self, _key):
+        self._streams.pop(_key, None)
+
+
+# The last _size stream IDs seen, for logging ACL drops once per stream rather
+# than once per frame. Membership is a set lookup, the ring decides which stream
+# is forgotten when a new one comes in and it is full.
+class streamSet(object):
+    def __init__(self, _size=const.ACL_DROP_LOG_SIZE):
+        self._members = set()
+        self._ring = [None] * max(_size, 1)
+        self._next = 0
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, _stream_id):
+        return _stream_id in self._members
+
+    # Returns True if _stream_id wasn't already in the set
+    def add(self, _stream_id):
+        if _stream_id in self._members:
+            return False
+        _old = self._ring[self._next]
+        if _old is not None:
+            self._members.discard(_old)
+        self._ring[self._next] = _stream_id
+        self._members.add(_stream_id)
+        self._next = (self._next + 1) % len(self._ring)
+        return True
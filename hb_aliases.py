@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Loads the ID alias dictionaries in a separate process, so that HBlink can be
+answering its peers while they're read. Parsing the RadioID subscriber file
+takes a couple of seconds and, being done by the json module in one go, would
+hold the interpreter lock (and so the reactor) for all of it if done in a
+thread. The child process does the downloading and parsing and hands the
+dictionaries back marshal'ed, which takes a few tens of milliseconds to read.
+
+With --workers, only worker 0 downloads; the others only read the files. A
+download goes to a file of its own and takes the place of the old one once it
+is complete, so a file being read is never one being written.
+
+Run as a script, it takes the [ALIASES] configuration (marshal'ed and hex
+encoded) and whether to download (1 or 0) as its arguments and writes its
+result to stdout.
+'''
+
+from __future__ import print_function
+
+import marshal
+import os
+import sys
+from os.path import isfile, getmtime
+from time import time
+from urllib import URLopener
+
+from twisted.internet.utils import getProcessOutputAndValue
+
+from dmr_utils.utils import mk_id_dict
+
+# The module needs logging, but handlers, etc. are controlled by the parent
+import logging
+logger = logging.getLogger(__name__)
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# dmr_utils' try_download(), except that _file is only replaced once the new
+# one has all been downloaded (and not at all if the download fails)
+def download(_path, _file, _url, _stale):
+    _target = _path + _file
+    if isfile(_target) and getmtime(_target) + _stale >= time():
+        return 'ID ALIAS MAPPER: \'{}\' is current, not downloaded'.format(_file)
+    _part = '{}.{}.part'.format(_target, os.getpid())
+    _opener = URLopener()
+    try:
+        _opener.retrieve(_url, _part)
+        os.rename(_part, _target)
+        return 'ID ALIAS MAPPER: \'{}\' successfully downloaded'.format(_file)
+    except (IOError, OSError):
+        if isfile(_part):
+            os.remove(_part)
+        return 'ID ALIAS MAPPER: \'{}\' could not be downloaded'.format(_file)
+    finally:
+        _opener.close()
+
+# Download (if _download and TRY_DOWNLOAD are set) and read the alias files of
+# _aliases, the [ALIASES] configuration. Returns the log messages and the three
+# dictionaries (peer, subscriber, talkgroup).
+def load(_aliases, _download=True):
+    _messages = []
+    if _download and _aliases['TRY_DOWNLOAD'] == True:
+        _messages.append(download(_aliases['PATH'], _aliases['PEER_FILE'], _aliases['PEER_URL'], _aliases['STALE_TIME']))
+        _messages.append(download(_aliases['PATH'], _aliases['SUBSCRIBER_FILE'], _aliases['SUBSCRIBER_URL'], _aliases['STALE_TIME']))
+
+    _dicts = []
+    for _name, _file in (('peer_ids', 'PEER_FILE'), ('subscriber_ids', 'SUBSCRIBER_FILE'), ('talkgroup_ids', 'TGID_FILE')):
+        _dicts.append(mk_id_dict(_aliases['PATH'], _aliases[_file]))
+        if _dicts[-1]:
+            _messages.append('ID ALIAS MAPPER: {} dictionary is available'.format(_name))
+    return _messages, _dicts
+
+# Load the aliases for _config in a child process, downloading them first only
+# if _download (so that, with --workers, only one of them does). Returns the
+# three alias dictionaries (peer, subscriber, talkgroup) empty; they're filled
+# in, in place, once the child is done, so anything holding them has the
+# aliases from then on.
+def mk_aliases_later(_config, _download=True):
+    _aliases = ({}, {}, {})
+
+    def loaded(_result):
+        _output, _errors, _code = _result
+        # Warnings the child printed don't stop the aliases loading, only its exit code does
+        for _line in _errors.splitlines():
+            logger.warning('ID ALIAS MAPPER: %s', _line)
+        if _code != 0:
+            logger.error('ID ALIAS MAPPER: aliases could not be loaded: loader exited with status %s', _code)
+            return
+        _messages, _dicts = marshal.loads(_output)
+        for _message in _messages:
+            logger.info(_message)
+        for _dict, _new in zip(_aliases, _dicts):
+            _dict.update(_new)
+        logger.info('ID ALIAS MAPPER: aliases loaded')
+
+    # The child couldn't be started, or was killed: (stdout, stderr, signal)
+    def failed(_failure):
+        if isinstance(_failure.value, tuple):
+            logger.error('ID ALIAS MAPPER: aliases could not be loaded: loader killed by signal %s', _failure.value[2])
+        else:
+            logger.error('ID ALIAS MAPPER: aliases could not be loaded: %s', _failure.getErrorMessage())
+
+    _args = [os.path.abspath(__file__.replace('.pyc', '.py')), marshal.dumps(_config['ALIASES']).encode('hex'), str(int(_download))]
+    _deferred = getProcessOutputAndValue(sys.executable, _args, env=os.environ)
+    _deferred.addCallbacks(loaded, failed)
+    return _aliases
+
+if __name__ == '__main__':
+    sys.stdout.write(marshal.dumps(load(marshal.loads(sys.argv[1].decode('hex')), sys.argv[2] == '1')))
@@ -35,7 +35,8 @@ from __future__ import print_function
 # Python modules we need
 import sys
 from bitarray import bitarray
-from time import time
+from hb_clock import now
+import hb_clock
 from importlib import import_module
 from types import ModuleType
 
@@ -45,7 +46,7 @@ from twisted.protocols.basic import NetstringReceiver
 from twisted.internet import reactor, task
 
 # Things we import from the main hblink module
-from hblink import HBSYSTEM, OPENBRIDGE, systems, hblink_handler, reportFactory, REPORT_OPCODES, config_reports, mk_aliases
+from hblink import HBSYSTEM, OPENBRIDGE, systems, hblink_handler, reportFactory, REPORT_OPCODES, config_reports, config_metrics, mk_aliases_later
 from dmr_utils.utils import hex_str_3, int_id, get_alias
 from dmr_utils import decode, bptc, const
 import hb_config
@@ -79,7 +80,7 @@ class bridgeallSYSTEM(HBSYSTEM):
         # In TX_EMB_LC, 2-5 are burst B-E
         self.STATUS = {
             1: {
-                'RX_START':     time(),
+                'RX_START':     now(),
                 'RX_SEQ':       '\x00',
                 'RX_RFS':       '\x00',
                 'TX_RFS':       '\x00',
@@ -87,8 +88,8 @@ class bridgeallSYSTEM(HBSYSTEM):
                 'TX_STREAM_ID': '\x00',
                 'RX_TGID':      '\x00\x00\x00',
                 'TX_TGID':      '\x00\x00\x00',
-                'RX_TIME':      time(),
-                'TX_TIME':      time(),
+                'RX_TIME':      now(),
+                'TX_TIME':      now(),
                 'RX_TYPE':      hb_const.HBPF_SLT_VTERM,
                 'RX_LC':        '\x00',
                 'TX_H_LC':      '\x00',
@@ -101,7 +102,7 @@ class bridgeallSYSTEM(HBSYSTEM):
                     }
                 },
             2: {
-                'RX_START':     time(),
+                'RX_START':     now(),
                 'RX_SEQ':       '\x00',
                 'RX_RFS':       '\x00',
                 'TX_RFS':       '\x00',
@@ -109,8 +110,8 @@ class bridgeallSYSTEM(HBSYSTEM):
                 'TX_STREAM_ID': '\x00',
                 'RX_TGID':      '\x00\x00\x00',
                 'TX_TGID':      '\x00\x00\x00',
-                'RX_TIME':      time(),
-                'TX_TIME':      time(),
+                'RX_TIME':      now(),
+                'TX_TIME':      now(),
                 'RX_TYPE':      hb_const.HBPF_SLT_VTERM,
                 'RX_LC':        '\x00',
                 'TX_H_LC':      '\x00',
@@ -124,10 +125,20 @@ class bridgeallSYSTEM(HBSYSTEM):
                 }
             }
 
-    def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data):
-        pkt_time = time()
+    def dmrd_received(self, _frame):
+        _peer_id    = _frame.peer_id
+        _rf_src     = _frame.rf_src
+        _dst_id     = _frame.dst_id
+        _seq        = _frame.seq
+        _slot       = _frame.slot
+        _call_type  = _frame.call_type
+        _frame_type = _frame.frame_type
+        _dtype_vseq = _frame.dtype_vseq
+        _stream_id  = _frame.stream_id
+        _data       = _frame.data
+        _bits       = _frame.bits
+        pkt_time = now()
         dmrpkt = _data[20:53]
-        _bits = int_id(_data[15])
 
         if _call_type == 'group':
             
@@ -158,40 +169,9 @@ class bridgeallSYSTEM(HBSYSTEM):
                         _target_system = self._CONFIG['SYSTEMS'][_target]
                         _target_status[_slot]['TX_STREAM_ID'] = _stream_id
                             
-                        # ACL Processing
-                        if self._CONFIG['GLOBAL']['USE_ACL']:
-                            if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                                if self._laststrid != _stream_id:
-                                    logger.debug('(%s) CALL DROPPED ON EGRESS WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL ACL', _target_system, int_id(_stream_id), int_id(_rf_src))
-                                    self._laststrid = _stream_id
-                                return
-                            if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                                if self._laststrid != _stream_id:
-                                    logger.debug('(%s) CALL DROPPED ON EGRESS WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', _target_system, int_id(_stream_id), int_id(_dst_id))
-                                    self._laststrid = _stream_id
-                                return
-                            if _slot == 2 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG2_ACL']):
-                                if self._laststrid != _stream_id:
-                                    logger.debug('(%s) CALL DROPPED ON EGRESS WITH STREAM ID %s ON TGID %s BY GLOBAL TS2 ACL', _target_system, int_id(_stream_id), int_id(_dst_id))
-                                    self._laststrid = _stream_id
-                                return
-                        if self._target_system['USE_ACL']:
-                            if not acl_check(_rf_src, _target_system['SUB_ACL']):
-                                if self._laststrid != _stream_id:
-                                    logger.debug('(%s) CALL DROPPED ON EGRESS WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', _target_system, int_id(_stream_id), int_id(_rf_src))
-                                    self._laststrid = _stream_id
-                                return
-                            if _slot == 1 and not acl_check(_dst_id, _target_system['TG1_ACL']):
-                                if self._laststrid != _stream_id:
-                                    logger.debug('(%s) CALL DROPPED ON EGRESS WITH STREAM ID %s ON TGID %s BY SYSTEM TS1 ACL', _target_system, int_id(_stream_id), int_id(_dst_id))
-                                    self._laststrid = _stream_id
-                                return
-                            if _slot == 2 and not acl_check(_dst_id, _target_system['TG2_ACL']):
-                                if self._laststrid != _stream_id:
-                                    logger.debug('(%s) CALL DROPPED ON EGRESS WITH STREAM ID %s ON TGID %s BY SYSTEM TS2 ACL', _target_system, int_id(_stream_id), int_id(_dst_id))
-                                    self._laststrid = _stream_id
-                                return
-                        self._laststrid = _stream_id
+                        # ACL Processing -- this is egress, so the target system's ACLs apply
+                        if systems[_target]._use_acl and not systems[_target].acl_stream(logger.debug, _frame):
+                            continue
                         
                         systems[_target].send_system(_data)
                         #logger.debug('(%s) Packet routed to system: %s', self._system, _target)
@@ -206,7 +186,6 @@ if __name__ == '__main__':
     import sys
     import os
     import signal
-    from dmr_utils.utils import try_download, mk_id_dict
     
     # Change the current directory to the location of the application
     os.chdir(os.path.dirname(os.path.realpath(sys.argv[0])))
@@ -242,9 +221,6 @@ if __name__ == '__main__':
     for sig in [signal.SIGTERM, signal.SIGINT]:
         signal.signal(sig, sig_handler)
 
-    # Create the name-number mapping dictionaries
-    peer_ids, subscriber_ids, talkgroup_ids = mk_aliases(CONFIG)
-
     # INITIALIZE THE REPORTING LOOP
     report_server = config_reports(CONFIG, reportFactory)
 
@@ -259,5 +235,10 @@ if __name__ == '__main__':
                 systems[system] = bridgeallSYSTEM(system, CONFIG, report_server)
             reactor.listenUDP(CONFIG['SYSTEMS'][system]['PORT'], systems[system], interface=CONFIG['SYSTEMS'][system]['IP'])
             logger.debug('%s instance created: %s, %s', CONFIG['SYSTEMS'][system]['MODE'], system, systems[system])
+    config_metrics(CONFIG, systems, report_server, None)
+
+    # Create the name-number mapping dictionaries, now that the systems are listening
+    peer_ids, subscriber_ids, talkgroup_ids = mk_aliases_later(CONFIG)
 
+    hb_clock.install(reactor)
     reactor.run()
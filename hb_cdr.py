@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Call detail records (CDR_FILE in [REPORTS]): every call start and end the
+bridge events report, one JSON object per line, appended to a file:
+
+    {"time": 1514764800.123, "event": "END", "direction": "RX", "system": "MASTER-1",
+     "stream_id": "deadbeef", "peer_id": 3120000, "rf_src": 3120101, "slot": 1,
+     "tgid": 9, "duration": 12.34}
+
+"time" is when the start or end was seen, "duration" (seconds) is only in END
+records.
+
+The reactor only appends the event to a queue; a thread of its own formats and
+writes the records every CDR_FLUSH seconds, so a slow disk never holds up a
+call. The file is rotated -- renamed with the time it was rotated at added
+(hblink.cdr.20180101-000000) -- when it reaches CDR_MAX_BYTES or has been
+open for CDR_ROTATE seconds, whichever comes first.
+'''
+
+from __future__ import print_function
+
+import json
+import os
+import threading
+from binascii import b2a_hex as ahex
+from collections import deque
+from time import time, strftime, localtime
+
+from twisted.internet import reactor
+
+from hb_clock import now
+import hb_const as const
+
+# The module needs logging, but handlers, etc. are controlled by the parent
+import logging
+logger = logging.getLogger(__name__)
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# One bridge event (as reportFactory.bridge_event() gets it) seen at _time, as a line
+def cdr_line(_time, _action, _direction, _system, _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration=None):
+    _record = {
+        'time': round(_time, 3),
+        'event': _action,
+        'direction': _direction,
+        'system': _system,
+        'stream_id': ahex(_stream_id),
+        'peer_id': int(ahex(_peer_id), 16),
+        'rf_src': int(ahex(_rf_src), 16),
+        'slot': _slot,
+        'tgid': int(ahex(_tgid), 16),
+    }
+    if _duration is not None:
+        _record['duration'] = round(_duration, 3)
+    return json.dumps(_record, sort_keys=True) + '\n'
+
+class cdrWriter(object):
+    def __init__(self, _path, _max_bytes, _rotate, _flush=const.CDR_FLUSH):
+        self._path = _path
+        self._max_bytes = _max_bytes
+        self._rotate = _rotate
+        self._flush = _flush
+        # deque.append() and popleft() are atomic, the reactor and the writer
+        # thread need no lock between them
+        self._queue = deque()
+        self._stop = threading.Event()
+        self._file = None
+        self._opened = None
+        self._size = 0
+        # Records that couldn't be written
+        self.lost = 0
+        self._thread = threading.Thread(target=self._run, name='cdr')
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        reactor.addSystemEventTrigger('before', 'shutdown', self.close)
+        logger.info('CDR: writing call detail records to %s', self._path)
+
+    # Called by the reactor for each bridge event
+    def record(self, *_event):
+        self._queue.append((now(),) + _event)
+
+    # Write what is left, and stop the thread
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self._flush):
+            self._write()
+        self._write()
+        if self._file:
+            self._file.close()
+
+    def _write(self):
+        _lines = []
+        while self._queue:
+            _lines.append(cdr_line(*self._queue.popleft()))
+        if not _lines:
+            return
+        try:
+            if self._file and (self._size >= self._max_bytes or time() - self._opened >= self._rotate):
+                self._rotate_file()
+            if not self._file:
+                self._open()
+            _data = ''.join(_lines)
+            self._file.write(_data)
+            self._file.flush()
+            self._size += len(_data)
+        except (IOError, OSError) as err:
+            self.lost += len(_lines)
+            logger.error('CDR: %s records could not be written to %s: %s', len(_lines), self._path, err)
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        self._file = open(self._path, 'a')
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._opened = time()
+
+    def _rotate_file(self):
+        self._file.close()
+        self._file = None
+        _rotated = _base = '{}.{}'.format(self._path, strftime('%Y%m%d-%H%M%S', localtime()))
+        _n = 1
+        while os.path.exists(_rotated):
+            _rotated = '{}-{}'.format(_base, _n)
+            _n += 1
+        os.rename(self._path, _rotated)
+        logger.info('CDR: %s rotated to %s', self._path, _rotated)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+A clock for the packet paths that is read once per pass of the reactor loop
+instead of once (or several times) per packet. Every packet handled in the same
+pass sees the same time, which is also what the contention checks want: frames
+that arrived together are treated as arriving together.
+
+install() hooks the reactor so the cached times are thrown away before and after
+each I/O iteration; the first now() or monotonic() after that reads the real
+clock and the rest of the iteration re-uses it. Until install() is called (and
+again after real_clock()) both functions just read the real clock every time,
+which is what tests that drive datagramReceived() by hand want.
+
+now() is wall clock time, as time.time(), for anything that is reported or
+compared with times from elsewhere. monotonic() doesn't jump when the system
+clock is set and is what timeouts should be measured with.
+'''
+
+from __future__ import print_function
+
+from time import time
+from ctypes import CDLL, Structure, POINTER, byref, c_int, c_long
+from ctypes.util import find_library
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# Python 2 has no time.monotonic(), so go to clock_gettime() for it. Where that
+# isn't available, fall back to the wall clock.
+CLOCK_MONOTONIC = 1
+
+class timespec(Structure):
+    _fields_ = [('tv_sec', c_long), ('tv_nsec', c_long)]
+
+try:
+    _clock_gettime = CDLL(find_library('c') or find_library('rt'), use_errno=True).clock_gettime
+    _clock_gettime.argtypes = [c_int, POINTER(timespec)]
+    _clock_gettime.restype = c_int
+    _ts = timespec()
+    if _clock_gettime(CLOCK_MONOTONIC, byref(_ts)) != 0:
+        raise OSError('clock_gettime(CLOCK_MONOTONIC) failed')
+
+    def monotonic_raw():
+        _clock_gettime(CLOCK_MONOTONIC, byref(_ts))
+        return _ts.tv_sec + _ts.tv_nsec * 1e-9
+except (OSError, AttributeError, TypeError):
+    monotonic_raw = time
+
+
+_ticking = False
+_wall = None
+_mono = None
+
+# Wall clock time, cached for the current reactor iteration
+def now():
+    global _wall
+    if _wall is None:
+        if not _ticking:
+            return time()
+        _wall = time()
+    return _wall
+
+# Monotonic time, cached for the current reactor iteration
+def monotonic():
+    global _mono
+    if _mono is None:
+        if not _ticking:
+            return monotonic_raw()
+        _mono = monotonic_raw()
+    return _mono
+
+def _reset():
+    global _wall, _mono
+    _wall = _mono = None
+
+# Start caching: wrap the reactor's doIteration(), where it waits for and then
+# handles I/O, so the cached times are dropped on both sides of it. Timed calls
+# (LoopingCall, callLater) run between iterations and get a fresh reading too.
+def install(_reactor):
+    global _ticking
+    _doIteration = _reactor.doIteration
+    def doIteration(_delay):
+        _reset()
+        try:
+            _doIteration(_delay)
+        finally:
+            _reset()
+    _reactor.doIteration = doIteration
+    _ticking = True
+
+# Go back to reading the real clock on every call
+def real_clock():
+    global _ticking
+    _ticking = False
+    _reset()
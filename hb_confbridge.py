@@ -36,7 +36,8 @@ from __future__ import print_function
 # Python modules we need
 import sys
 from bitarray import bitarray
-from time import time
+from hb_clock import now
+import hb_clock
 from importlib import import_module
 
 # Twisted is pretty important, so I keep it separate
@@ -45,12 +46,18 @@ from twisted.protocols.basic import NetstringReceiver
 from twisted.internet import reactor, task
 
 # Things we import from the main hblink module
-from hblink import HBSYSTEM, OPENBRIDGE, systems, hblink_handler, reportFactory, REPORT_OPCODES, mk_aliases
+from hblink import HBSYSTEM, OPENBRIDGE, systems, hblink_handler, reportFactory, REPORT_OPCODES, config_metrics, mk_aliases_later
 from dmr_utils.utils import hex_str_3, int_id, get_alias
-from dmr_utils import decode, bptc, const
+from dmr_utils import decode, const
 import hb_config
 import hb_log
 import hb_const
+import hb_shard
+import hb_wire
+import hb_metrics
+from hb_lc import lcCache
+from hb_frame import DMRD
+from hb_mmsg import listen_udp
 
 # Stuff for socket reporting
 import cPickle as pickle
@@ -70,6 +77,12 @@ __email__      = 'n0mjs@me.com'
 
 # Module gobal varaibles
 
+# Encoded LCs for the streams bridged to targets, shared by all the routers
+LC_CACHE = lcCache()
+
+# The worker this is, when the systems are spread over more than one (see hb_shard)
+shard = None
+
 # Timed loop used for reporting HBP status
 #
 # REPORT BASED ON THE TYPE SELECTED IN THE MAIN CONFIG FILE
@@ -79,6 +92,8 @@ def config_reports(_config, _factory):
             logger.debug('Periodic reporting loop started')
             _server.send_config()
             _server.send_bridge()
+            _server.send_latency()
+            _server.log_clients()
 
         logger.info('HBlink TCP reporting server configured')
 
@@ -117,16 +132,140 @@ def make_bridges(_hb_confbridge_bridges):
                 _system['OFF'][i] = hex_str_3(_system['OFF'][i])
             _system['TIMEOUT']    = _system['TIMEOUT']*60
             if _system['ACTIVE'] == True:
-                _system['TIMER']  = time() + _system['TIMEOUT']
+                _system['TIMER']  = now() + _system['TIMEOUT']
             else:
-                _system['TIMER']  = time()
+                _system['TIMER']  = now()
     return bridge_file.BRIDGES
 
 
+# The routing index: for each (SYSTEM, TGID, TS) a call can come in on, the
+# bridges that route it -- (bridge, the entry that matched, the entries to send
+# it to) -- so routers find their targets with one lookup instead of searching
+# BRIDGES for every frame. Only ACTIVE entries are in it, as sources or as
+# targets: whatever changes an entry's ACTIVE or TGID must call route_bridge()
+# for the bridge it is in.
+ROUTES = {}
+# The order of the bridges in BRIDGES (routes are kept in it), and the keys each has routes under
+_ROUTE_ORDER = {}
+_ROUTE_KEYS = {}
+
+# The routes of one bridge, as (key, route)
+def bridge_routes(_bridge):
+    _entries = BRIDGES[_bridge]
+    _routes = []
+    for _system in _entries:
+        if _system['ACTIVE'] == True:
+            _targets = [_target for _target in _entries if _target['SYSTEM'] != _system['SYSTEM'] and _target['ACTIVE']]
+            _routes.append(((_system['SYSTEM'], _system['TGID'], _system['TS']), (_bridge, _system, _targets)))
+    return _routes
+
+# Index every bridge, after BRIDGES is made
+def build_routes():
+    ROUTES.clear()
+    _ROUTE_ORDER.clear()
+    _ROUTE_KEYS.clear()
+    for _bridge in BRIDGES:
+        _ROUTE_ORDER[_bridge] = len(_ROUTE_ORDER)
+        _ROUTE_KEYS[_bridge] = set()
+        for _key, _route in bridge_routes(_bridge):
+            ROUTES.setdefault(_key, []).append(_route)
+            _ROUTE_KEYS[_bridge].add(_key)
+
+# Re-index one bridge after its entries changed. The lists in ROUTES are
+# replaced, not changed, so a router part way through one isn't disturbed.
+def route_bridge(_bridge):
+    _ROUTE_ORDER.setdefault(_bridge, len(_ROUTE_ORDER))
+    for _key in _ROUTE_KEYS.pop(_bridge, ()):
+        _routes = [_route for _route in ROUTES[_key] if _route[0] != _bridge]
+        if _routes:
+            ROUTES[_key] = _routes
+        else:
+            del ROUTES[_key]
+    _ROUTE_KEYS[_bridge] = set()
+    for _key, _route in bridge_routes(_bridge):
+        # Back where the full search over BRIDGES would have found it
+        ROUTES[_key] = sorted(ROUTES.get(_key, []) + [_route], key=lambda _route: _ROUTE_ORDER[_route[0]])
+        _ROUTE_KEYS[_bridge].add(_key)
+
+
+# In-band signalling: a call to _dst_id on _slot of _system_name just ended. Only
+# worker 0 runs this when there are several (see hb_shard).
+def bridge_signal(_system_name, _slot, _dst_id, pkt_time):
+    _changed = set()
+    for _bridge in BRIDGES:
+        for _system in BRIDGES[_bridge]:
+            if _system['SYSTEM'] == _system_name:
+
+                # TGID matches a rule source, reset its timer
+                if _slot == _system['TS'] and _dst_id == _system['TGID'] and ((_system['TO_TYPE'] == 'ON' and (_system['ACTIVE'] == True)) or (_system['TO_TYPE'] == 'OFF' and _system['ACTIVE'] == False)):
+                    _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                    logger.info('(%s) Transmission match for Bridge: %s. Reset timeout to %s', _system_name, _bridge, _system['TIMER'])
+
+                # TGID matches an ACTIVATION trigger
+                if (_dst_id in _system['ON'] or _dst_id in _system['RESET']) and _slot == _system['TS']:
+                    # Set the matching rule as ACTIVE
+                    if _dst_id in _system['ON']:
+                        if _system['ACTIVE'] == False:
+                            _system['ACTIVE'] = True
+                            route_bridge(_bridge)
+                            _changed.add(_bridge)
+                            _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                            logger.info('(%s) Bridge: %s, connection changed to state: %s', _system_name, _bridge, _system['ACTIVE'])
+                            # Cancel the timer if we've enabled an "OFF" type timeout
+                            if _system['TO_TYPE'] == 'OFF':
+                                _system['TIMER'] = pkt_time
+                                logger.info('(%s) Bridge: %s set to "OFF" with an on timer rule: timeout timer cancelled', _system_name, _bridge)
+                    # Reset the timer for the rule
+                    if _system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON':
+                        _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                        logger.info('(%s) Bridge: %s, timeout timer reset to: %s', _system_name, _bridge, _system['TIMER'] - pkt_time)
+
+                # TGID matches an DE-ACTIVATION trigger
+                if (_dst_id in _system['OFF']  or _dst_id in _system['RESET']) and _slot == _system['TS']:
+                    # Set the matching rule as ACTIVE
+                    if _dst_id in _system['OFF']:
+                        if _system['ACTIVE'] == True:
+                            _system['ACTIVE'] = False
+                            route_bridge(_bridge)
+                            _changed.add(_bridge)
+                            logger.info('(%s) Bridge: %s, connection changed to state: %s', _system_name, _bridge, _system['ACTIVE'])
+                            # Cancel the timer if we've enabled an "ON" type timeout
+                            if _system['TO_TYPE'] == 'ON':
+                                _system['TIMER'] = pkt_time
+                                logger.info('(%s) Bridge: %s set to ON with and "OFF" timer rule: timeout timer cancelled', _system_name, _bridge)
+                    # Reset the timer for the rule
+                    if _system['ACTIVE'] == False and _system['TO_TYPE'] == 'OFF':
+                        _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                        logger.info('(%s) Bridge: %s, timeout timer reset to: %s', _system_name, _bridge, _system['TIMER'] - pkt_time)
+                    # Cancel the timer if we've enabled an "ON" type timeout
+                    if _system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON' and _dst_id in _system['OFF']:
+                        _system['TIMER'] = pkt_time
+                        logger.info('(%s) Bridge: %s set to ON with and "OFF" timer rule: timeout timer cancelled', _system_name, _bridge)
+
+    rules_changed(_changed)
+
+# With more than one worker, worker 0 keeps the bridge rules and tells the others
+# which of _bridges it turned on or off
+def rules_changed(_bridges):
+    if shard and _bridges:
+        shard.send_rules(dict((_bridge, [_system['ACTIVE'] for _system in BRIDGES[_bridge]]) for _bridge in _bridges))
+
+# ...which, on the other workers, is where they hear of it
+def rules_received(_rules):
+    for _bridge, _active in _rules.items():
+        if _bridge not in BRIDGES:
+            continue
+        for _system, _state in zip(BRIDGES[_bridge], _active):
+            _system['ACTIVE'] = _state
+        route_bridge(_bridge)
+        logger.info('(SHARD) Bridge: %s, connection states changed to: %s', _bridge, _active)
+
+
 # Run this every minute for rule timer updates
 def rule_timer_loop():
     logger.debug('(ALL HBSYSTEMS) Rule timer loop started')
-    _now = time()
+    _now = now()
+    _changed = set()
 
     for _bridge in BRIDGES:
         for _system in BRIDGES[_bridge]:
@@ -134,6 +273,8 @@ def rule_timer_loop():
                 if _system['ACTIVE'] == True:
                     if _system['TIMER'] < _now:
                         _system['ACTIVE'] = False
+                        route_bridge(_bridge)
+                        _changed.add(_bridge)
                         logger.info('Conference Bridge TIMEOUT: DEACTIVATE System: %s, Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
                     else:
                         timeout_in = _system['TIMER'] - _now
@@ -144,6 +285,8 @@ def rule_timer_loop():
                 if _system['ACTIVE'] == False:
                     if _system['TIMER'] < _now:
                         _system['ACTIVE'] = True
+                        route_bridge(_bridge)
+                        _changed.add(_bridge)
                         logger.info('Conference Bridge TIMEOUT: ACTIVATE System: %s, Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
                     else:
                         timeout_in = _system['TIMER'] - _now
@@ -153,6 +296,8 @@ def rule_timer_loop():
             else:
                 logger.debug('Conference Bridge NO ACTION: System: %s, Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
 
+    rules_changed(_changed)
+
     if CONFIG['REPORTS']['REPORT']:
         report_server.send_clients('bridge updated')
 
@@ -160,7 +305,7 @@ def rule_timer_loop():
 # run this every 10 seconds to trim orphaned stream ids
 def stream_trimmer_loop():
     logger.debug('(ALL OPENBRIDGE SYSTEMS) Trimming inactive stream IDs from system lists')
-    _now = time()
+    _now = now()
 
     for system in systems:
         # HBP systems, master and peer
@@ -171,8 +316,7 @@ def stream_trimmer_loop():
                     _slot['RX_TYPE'] = hb_const.HBPF_SLT_VTERM
                     logger.info('(%s) *TIME OUT*  RX STREAM ID: %s SUB: %s TGID %s, TS %s, Duration: %s', \
                         system, int_id(_slot['RX_STREAM_ID']), int_id(_slot['RX_RFS']), int_id(_slot['RX_TGID']), slot, _slot['RX_TIME'] - _slot['RX_START'])
-                    if CONFIG['REPORTS']['REPORT']:
-                        systems[system]._report.send_bridgeEvent('GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format(system, int_id(_slot['RX_STREAM_ID']), int_id(_slot['RX_PEER']), int_id(_slot['RX_RFS']), slot, int_id(_slot['RX_TGID']), _slot['RX_TIME'] - _slot['RX_START']))
+                    systems[system]._report.bridge_event('END', 'RX', system, _slot['RX_STREAM_ID'], _slot['RX_PEER'], _slot['RX_RFS'], slot, _slot['RX_TGID'], _slot['RX_TIME'] - _slot['RX_START'])
 
             for slot in range(1,3):
                 _slot  = systems[system].STATUS[slot]
@@ -180,8 +324,7 @@ def stream_trimmer_loop():
                     _slot['TX_TYPE'] = hb_const.HBPF_SLT_VTERM
                     logger.info('(%s) *TIME OUT*  TX STREAM ID: %s SUB: %s TGID %s, TS %s, Duration: %s', \
                         system, int_id(_slot['TX_STREAM_ID']), int_id(_slot['TX_RFS']), int_id(_slot['TX_TGID']), slot, _slot['TX_TIME'] - _slot['TX_START'])
-                    if CONFIG['REPORTS']['REPORT']:
-                        systems[system]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(system, int_id(_slot['TX_STREAM_ID']), int_id(_slot['TX_PEER']), int_id(_slot['TX_RFS']), slot, int_id(_slot['TX_TGID']), _slot['TX_TIME'] - _slot['TX_START']))
+                    systems[system]._report.bridge_event('END', 'TX', system, _slot['TX_STREAM_ID'], _slot['TX_PEER'], _slot['TX_RFS'], slot, _slot['TX_TGID'], _slot['TX_TIME'] - _slot['TX_START'])
 
         # OBP systems
         # We can't delete items from a dicationry that's being iterated, so we have to make a temporarly list of entrys to remove later
@@ -196,8 +339,7 @@ def stream_trimmer_loop():
                     _config = CONFIG['SYSTEMS'][system]
                     logger.info('(%s) *TIME OUT*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 Duration: %s', \
                         system, int_id(stream_id), get_alias(int_id(_system['RFS']), subscriber_ids), get_alias(int_id(_config['NETWORK_ID']), peer_ids), get_alias(int_id(_system['TGID']), talkgroup_ids), _system['LAST'] - _system['START'])
-                    if CONFIG['REPORTS']['REPORT']:
-                            systems[system]._report.send_bridgeEvent('GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format(system, int_id(stream_id), int_id(_config['NETWORK_ID']), int_id(_system['RFS']), 1, int_id(_system['TGID']), _system['LAST'] - _system['START']))
+                    systems[system]._report.bridge_event('END', 'RX', system, stream_id, _config['NETWORK_ID'], _system['RFS'], 1, _system['TGID'], _system['LAST'] - _system['START'])
                     removed = systems[system].STATUS.pop(stream_id)
                 else:
                     logger.error('(%s) Attemped to remove OpenBridge Stream ID %s not in the Stream ID list: %s', system, int_id(stream_id), [id for id in systems[system].STATUS])
@@ -209,10 +351,20 @@ class routerOBP(OPENBRIDGE):
         self.STATUS = {}
 
 
-    def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data):
-        pkt_time = time()
+    def dmrd_received(self, _frame):
+        _peer_id    = _frame.peer_id
+        _rf_src     = _frame.rf_src
+        _dst_id     = _frame.dst_id
+        _seq        = _frame.seq
+        _slot       = _frame.slot
+        _call_type  = _frame.call_type
+        _frame_type = _frame.frame_type
+        _dtype_vseq = _frame.dtype_vseq
+        _stream_id  = _frame.stream_id
+        _data       = _frame.data
+        _bits       = _frame.bits
+        pkt_time = now()
         dmrpkt = _data[20:53]
-        _bits = int_id(_data[15])
 
         if _call_type == 'group':
             # Is this a new call stream?
@@ -238,158 +390,157 @@ class routerOBP(OPENBRIDGE):
 
                 logger.info('(%s) *CALL START* STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                         self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
-                if CONFIG['REPORTS']['REPORT']:
-                    self._report.send_bridgeEvent('GROUP VOICE,START,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)))
+                self._report.bridge_event('START', 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
 
             self.STATUS[_stream_id]['LAST'] = pkt_time
 
 
-            for _bridge in BRIDGES:
-                for _system in BRIDGES[_bridge]:
-
-                    if (_system['SYSTEM'] == self._system and _system['TGID'] == _dst_id and _system['TS'] == _slot and _system['ACTIVE'] == True):
-
-                        for _target in BRIDGES[_bridge]:
-                            if (_target['SYSTEM'] != self._system) and (_target['ACTIVE']):
-                                _target_status = systems[_target['SYSTEM']].STATUS
-                                _target_system = self._CONFIG['SYSTEMS'][_target['SYSTEM']]
-                                if _target_system['MODE'] == 'OPENBRIDGE':
-                                    # Is this a new call stream on the target?
-                                    if (_stream_id not in _target_status):
-                                        # This is a new call stream on the target
-                                        _target_status[_stream_id] = {
-                                            'START':     pkt_time,
-                                            'CONTENTION':False,
-                                            'RFS':       _rf_src,
-                                            'TGID':      _dst_id,
-                                        }
-                                        # Generate LCs (full and EMB) for the TX stream
-                                        dst_lc = ''.join([self.STATUS[_stream_id]['LC'][0:3], _target['TGID'], _rf_src])
-                                        _target_status[_stream_id]['H_LC'] = bptc.encode_header_lc(dst_lc)
-                                        _target_status[_stream_id]['T_LC'] = bptc.encode_terminator_lc(dst_lc)
-                                        _target_status[_stream_id]['EMB_LC'] = bptc.encode_emblc(dst_lc)
-
-                                        logger.info('(%s) Conference Bridge: %s, Call Bridged to OBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
-                                        if CONFIG['REPORTS']['REPORT']:
-                                            systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID'])))
-
-                                    # Record the time of this packet so we can later identify a stale stream
-                                    _target_status[_stream_id]['LAST'] = pkt_time
-                                    # Clear the TS bit -- all OpenBridge streams are effectively on TS1
-                                    _tmp_bits = _bits & ~(1 << 7)
-
-                                    # Assemble transmit HBP packet header
-                                    _tmp_data = _data[:8] + _target['TGID'] + _data[11:15] + chr(_tmp_bits) + _data[16:20]
-
-                                    # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
-                                    # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
-                                    # if _dst_id != rule['DST_GROUP']:
-                                    dmrbits = bitarray(endian='big')
-                                    dmrbits.frombytes(dmrpkt)
-                                    # Create a voice header packet (FULL LC)
-                                    if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
-                                        dmrbits = _target_status[_stream_id]['H_LC'][0:98] + dmrbits[98:166] + _target_status[_stream_id]['H_LC'][98:197]
-                                    # Create a voice terminator packet (FULL LC)
-                                    elif _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VTERM:
-                                        dmrbits = _target_status[_stream_id]['T_LC'][0:98] + dmrbits[98:166] + _target_status[_stream_id]['T_LC'][98:197]
-                                        if CONFIG['REPORTS']['REPORT']:
-                                            call_duration = pkt_time - _target_status[_stream_id]['START']
-                                            systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID']), call_duration))
-                                    # Create a Burst B-E packet (Embedded LC)
-                                    elif _dtype_vseq in [1,2,3,4]:
-                                        dmrbits = dmrbits[0:116] + _target_status[_stream_id]['EMB_LC'][_dtype_vseq] + dmrbits[148:264]
-                                    dmrpkt = dmrbits.tobytes()
-                                    _tmp_data = _tmp_data + dmrpkt #+ _data[53:55]
-
-                                else:
-                                    # BEGIN CONTENTION HANDLING
-                                    #
-                                    # The rules for each of the 4 "ifs" below are listed here for readability. The Frame To Send is:
-                                    #   From a different group than last RX from this HBSystem, but it has been less than Group Hangtime
-                                    #   From a different group than last TX to this HBSystem, but it has been less than Group Hangtime
-                                    #   From the same group as the last RX from this HBSystem, but from a different subscriber, and it has been less than stream timeout
-                                    #   From the same group as the last TX to this HBSystem, but from a different subscriber, and it has been less than stream timeout
-                                    # The "continue" at the end of each means the next iteration of the for loop that tests for matching rules
-                                    #
-                                    if ((_target['TGID'] != _target_status[_target['TS']]['RX_TGID']) and ((pkt_time - _target_status[_target['TS']]['RX_TIME']) < _target_system['GROUP_HANGTIME'])):
-                                        if self.STATUS[_stream_id]['CONTENTION'] == False:
-                                            self.STATUS[_stream_id]['CONTENTION'] = True
-                                            logger.info('(%s) Call not routed to TGID %s, target active or in group hangtime: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['RX_TGID']))
-                                        continue
-                                    if ((_target['TGID'] != _target_status[_target['TS']]['TX_TGID']) and ((pkt_time - _target_status[_target['TS']]['TX_TIME']) < _target_system['GROUP_HANGTIME'])):
-                                        if self.STATUS[_stream_id]['CONTENTION'] == False:
-                                            self.STATUS[_stream_id]['CONTENTION'] = True
-                                            logger.info('(%s) Call not routed to TGID%s, target in group hangtime: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['TX_TGID']))
-                                        continue
-                                    if (_target['TGID'] == _target_status[_target['TS']]['RX_TGID']) and ((pkt_time - _target_status[_target['TS']]['RX_TIME']) < hb_const.STREAM_TO):
-                                        if self.STATUS[_stream_id]['CONTENTION'] == False:
-                                            self.STATUS[_stream_id]['CONTENTION'] = True
-                                            logger.info('(%s) Call not routed to TGID%s, matching call already active on target: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['RX_TGID']))
-                                        continue
-                                    if (_target['TGID'] == _target_status[_target['TS']]['TX_TGID']) and (_rf_src != _target_status[_target['TS']]['TX_RFS']) and ((pkt_time - _target_status[_target['TS']]['TX_TIME']) < hb_const.STREAM_TO):
-                                        if self.STATUS[_stream_id]['CONTENTION'] == False:
-                                            self.STATUS[_stream_id]['CONTENTION'] = True
-                                            logger.info('(%s) Call not routed for subscriber %s, call route in progress on target: HBSystem: %s, TS: %s, TGID: %s, SUB: %s', self._system, int_id(_rf_src), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['TX_TGID']), int_id(_target_status[_target['TS']]['TX_RFS']))
-                                        continue
-
-                                    # Is this a new call stream?
-                                    if (_target_status[_target['TS']]['TX_STREAM_ID'] != _stream_id): #(_target_status[_target['TS']]['TX_RFS'] != _rf_src) or (_target_status[_target['TS']]['TX_TGID'] != _target['TGID']):
-                                    #if (_stream_id != self.STATUS[_slot]['RX_STREAM_ID']) or (_target_status[_target['TS']]['TX_RFS'] != _rf_src) or (_target_status[_target['TS']]['TX_TGID'] != _target['TGID']):
-                                        # Record the DST TGID and Stream ID
-                                        _target_status[_target['TS']]['TX_START'] = pkt_time
-                                        if CONFIG['SYSTEMS'][_target['SYSTEM']]['MODE'] == 'XLXPEER':
-                                             # Munge the destination TGID for XLXs
-                                             _target['TGID'] = hex_str_3(int(CONFIG['SYSTEMS'][_target['SYSTEM']]['XLXMODULE']))
-                                        _target_status[_target['TS']]['TX_TGID'] = _target['TGID']
-                                        _target_status[_target['TS']]['TX_STREAM_ID'] = _stream_id
-                                        _target_status[_target['TS']]['TX_RFS'] = _rf_src
-                                        _target_status[_target['TS']]['TX_PEER'] = _peer_id
-                                        # Generate LCs (full and EMB) for the TX stream
-                                        dst_lc = self.STATUS[_stream_id]['LC'][0:3] + _target['TGID'] + _rf_src
-                                        _target_status[_target['TS']]['TX_H_LC'] = bptc.encode_header_lc(dst_lc)
-                                        _target_status[_target['TS']]['TX_T_LC'] = bptc.encode_terminator_lc(dst_lc)
-                                        _target_status[_target['TS']]['TX_EMB_LC'] = bptc.encode_emblc(dst_lc)
-                                        logger.debug('(%s) Generating TX FULL and EMB LCs for HomeBrew destination: System: %s, TS: %s, TGID: %s', self._system, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
-                                        logger.info('(%s) Conference Bridge: %s, Call Bridged to HBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
-                                        if CONFIG['REPORTS']['REPORT']:
-                                           systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID'])))
-
-                                    # Set other values for the contention handler to test next time there is a frame to forward
-                                    _target_status[_target['TS']]['TX_TIME'] = pkt_time
-                                    _target_status[_target['TS']]['TX_TYPE'] = _dtype_vseq
-
-                                    # Handle any necessary re-writes for the destination
-                                    if _system['TS'] != _target['TS']:
-                                        _tmp_bits = _bits ^ 1 << 7
-                                    else:
-                                        _tmp_bits = _bits
-
-                                    # Assemble transmit HBP packet header
-                                    _tmp_data = _data[:8] + _target['TGID'] + _data[11:15] + chr(_tmp_bits) + _data[16:20]
-
-                                    # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
-                                    # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
-                                    # if _dst_id != rule['DST_GROUP']:
-                                    dmrbits = bitarray(endian='big')
-                                    dmrbits.frombytes(dmrpkt)
-                                    # Create a voice header packet (FULL LC)
-                                    if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
-                                        dmrbits = _target_status[_target['TS']]['TX_H_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_H_LC'][98:197]
-                                    # Create a voice terminator packet (FULL LC)
-                                    elif _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VTERM:
-                                        dmrbits = _target_status[_target['TS']]['TX_T_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_T_LC'][98:197]
-                                        if CONFIG['REPORTS']['REPORT']:
-                                            call_duration = pkt_time - _target_status[_target['TS']]['TX_START']
-                                            systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID']), call_duration))
-                                    # Create a Burst B-E packet (Embedded LC)
-                                    elif _dtype_vseq in [1,2,3,4]:
-                                        dmrbits = dmrbits[0:116] + _target_status[_target['TS']]['TX_EMB_LC'][_dtype_vseq] + dmrbits[148:264]
-                                    dmrpkt = dmrbits.tobytes()
-                                    _tmp_data = _tmp_data + dmrpkt + '\x00\x00' # Add two bytes of nothing since OBP doesn't include BER & RSSI bytes #_data[53:55]
-
-                                # Transmit the packet to the destination system
-                                systems[_target['SYSTEM']].send_system(_tmp_data)
-                                #logger.debug('(%s) Packet routed by bridge: %s to system: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
+            for _bridge, _system, _targets in ROUTES.get((self._system, _dst_id, _slot), ()):
+                for _target in _targets:
+                    _target_status = systems[_target['SYSTEM']].STATUS
+                    _target_system = self._CONFIG['SYSTEMS'][_target['SYSTEM']]
+                    if _target_system['MODE'] == 'OPENBRIDGE':
+                        # Is this a new call stream on the target?
+                        if (_stream_id not in _target_status):
+                            # This is a new call stream on the target
+                            _target_status[_stream_id] = {
+                                'START':     pkt_time,
+                                'CONTENTION':False,
+                                'RFS':       _rf_src,
+                                'TGID':      _dst_id,
+                            }
+                            # Generate LCs (full and EMB) for the TX stream
+                            dst_lc = ''.join([self.STATUS[_stream_id]['LC'][0:3], _target['TGID'], _rf_src])
+                            _h_lc, _t_lc, _emb_lc = LC_CACHE.encode(dst_lc)
+                            _target_status[_stream_id]['H_LC'] = _h_lc
+                            _target_status[_stream_id]['T_LC'] = _t_lc
+                            _target_status[_stream_id]['EMB_LC'] = _emb_lc
+
+                            logger.info('(%s) Conference Bridge: %s, Call Bridged to OBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
+                            systems[_target['SYSTEM']]._report.bridge_event('START', 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'])
+
+                        # Record the time of this packet so we can later identify a stale stream
+                        _target_status[_stream_id]['LAST'] = pkt_time
+                        # Clear the TS bit -- all OpenBridge streams are effectively on TS1
+                        _tmp_bits = _bits & ~(1 << 7)
+
+                        # Assemble transmit HBP packet header
+                        _tmp_data = _data[:8] + _target['TGID'] + _data[11:15] + chr(_tmp_bits) + _data[16:20]
+
+                        # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
+                        # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
+                        # if _dst_id != rule['DST_GROUP']:
+                        dmrbits = bitarray(endian='big')
+                        dmrbits.frombytes(dmrpkt)
+                        # Create a voice header packet (FULL LC)
+                        if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
+                            dmrbits = _target_status[_stream_id]['H_LC'][0:98] + dmrbits[98:166] + _target_status[_stream_id]['H_LC'][98:197]
+                        # Create a voice terminator packet (FULL LC)
+                        elif _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VTERM:
+                            dmrbits = _target_status[_stream_id]['T_LC'][0:98] + dmrbits[98:166] + _target_status[_stream_id]['T_LC'][98:197]
+                            call_duration = pkt_time - _target_status[_stream_id]['START']
+                            systems[_target['SYSTEM']]._report.bridge_event('END', 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'], call_duration)
+                        # Create a Burst B-E packet (Embedded LC)
+                        elif _dtype_vseq in [1,2,3,4]:
+                            dmrbits = dmrbits[0:116] + _target_status[_stream_id]['EMB_LC'][_dtype_vseq] + dmrbits[148:264]
+                        dmrpkt = dmrbits.tobytes()
+                        _tmp_data = _tmp_data + dmrpkt #+ _data[53:55]
+
+                    else:
+                        # BEGIN CONTENTION HANDLING
+                        #
+                        # The rules for each of the 4 "ifs" below are listed here for readability. The Frame To Send is:
+                        #   From a different group than last RX from this HBSystem, but it has been less than Group Hangtime
+                        #   From a different group than last TX to this HBSystem, but it has been less than Group Hangtime
+                        #   From the same group as the last RX from this HBSystem, but from a different subscriber, and it has been less than stream timeout
+                        #   From the same group as the last TX to this HBSystem, but from a different subscriber, and it has been less than stream timeout
+                        # The "continue" at the end of each means the next iteration of the for loop that tests for matching rules
+                        #
+                        if ((_target['TGID'] != _target_status[_target['TS']]['RX_TGID']) and ((pkt_time - _target_status[_target['TS']]['RX_TIME']) < _target_system['GROUP_HANGTIME'])):
+                            if self.STATUS[_stream_id]['CONTENTION'] == False:
+                                self.STATUS[_stream_id]['CONTENTION'] = True
+                                logger.info('(%s) Call not routed to TGID %s, target active or in group hangtime: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['RX_TGID']))
+                            self._metrics.contention_drops += 1
+                            continue
+                        if ((_target['TGID'] != _target_status[_target['TS']]['TX_TGID']) and ((pkt_time - _target_status[_target['TS']]['TX_TIME']) < _target_system['GROUP_HANGTIME'])):
+                            if self.STATUS[_stream_id]['CONTENTION'] == False:
+                                self.STATUS[_stream_id]['CONTENTION'] = True
+                                logger.info('(%s) Call not routed to TGID%s, target in group hangtime: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['TX_TGID']))
+                            self._metrics.contention_drops += 1
+                            continue
+                        if (_target['TGID'] == _target_status[_target['TS']]['RX_TGID']) and ((pkt_time - _target_status[_target['TS']]['RX_TIME']) < hb_const.STREAM_TO):
+                            if self.STATUS[_stream_id]['CONTENTION'] == False:
+                                self.STATUS[_stream_id]['CONTENTION'] = True
+                                logger.info('(%s) Call not routed to TGID%s, matching call already active on target: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['RX_TGID']))
+                            self._metrics.contention_drops += 1
+                            continue
+                        if (_target['TGID'] == _target_status[_target['TS']]['TX_TGID']) and (_rf_src != _target_status[_target['TS']]['TX_RFS']) and ((pkt_time - _target_status[_target['TS']]['TX_TIME']) < hb_const.STREAM_TO):
+                            if self.STATUS[_stream_id]['CONTENTION'] == False:
+                                self.STATUS[_stream_id]['CONTENTION'] = True
+                                logger.info('(%s) Call not routed for subscriber %s, call route in progress on target: HBSystem: %s, TS: %s, TGID: %s, SUB: %s', self._system, int_id(_rf_src), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['TX_TGID']), int_id(_target_status[_target['TS']]['TX_RFS']))
+                            self._metrics.contention_drops += 1
+                            continue
+
+                        # Is this a new call stream?
+                        if (_target_status[_target['TS']]['TX_STREAM_ID'] != _stream_id): #(_target_status[_target['TS']]['TX_RFS'] != _rf_src) or (_target_status[_target['TS']]['TX_TGID'] != _target['TGID']):
+                        #if (_stream_id != self.STATUS[_slot]['RX_STREAM_ID']) or (_target_status[_target['TS']]['TX_RFS'] != _rf_src) or (_target_status[_target['TS']]['TX_TGID'] != _target['TGID']):
+                            # Record the DST TGID and Stream ID
+                            _target_status[_target['TS']]['TX_START'] = pkt_time
+                            if CONFIG['SYSTEMS'][_target['SYSTEM']]['MODE'] == 'XLXPEER':
+                                 # Munge the destination TGID for XLXs (and re-index the bridge, the entry has a new TGID)
+                                 _xlx_tgid = hex_str_3(int(CONFIG['SYSTEMS'][_target['SYSTEM']]['XLXMODULE']))
+                                 if _target['TGID'] != _xlx_tgid:
+                                     _target['TGID'] = _xlx_tgid
+                                     route_bridge(_bridge)
+                            _target_status[_target['TS']]['TX_TGID'] = _target['TGID']
+                            _target_status[_target['TS']]['TX_STREAM_ID'] = _stream_id
+                            _target_status[_target['TS']]['TX_RFS'] = _rf_src
+                            _target_status[_target['TS']]['TX_PEER'] = _peer_id
+                            # Generate LCs (full and EMB) for the TX stream
+                            dst_lc = self.STATUS[_stream_id]['LC'][0:3] + _target['TGID'] + _rf_src
+                            _h_lc, _t_lc, _emb_lc = LC_CACHE.encode(dst_lc)
+                            _target_status[_target['TS']]['TX_H_LC'] = _h_lc
+                            _target_status[_target['TS']]['TX_T_LC'] = _t_lc
+                            _target_status[_target['TS']]['TX_EMB_LC'] = _emb_lc
+                            logger.debug('(%s) Generating TX FULL and EMB LCs for HomeBrew destination: System: %s, TS: %s, TGID: %s', self._system, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
+                            logger.info('(%s) Conference Bridge: %s, Call Bridged to HBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
+                            systems[_target['SYSTEM']]._report.bridge_event('START', 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'])
+
+                        # Set other values for the contention handler to test next time there is a frame to forward
+                        _target_status[_target['TS']]['TX_TIME'] = pkt_time
+                        _target_status[_target['TS']]['TX_TYPE'] = _dtype_vseq
+
+                        # Handle any necessary re-writes for the destination
+                        if _system['TS'] != _target['TS']:
+                            _tmp_bits = _bits ^ 1 << 7
+                        else:
+                            _tmp_bits = _bits
+
+                        # Assemble transmit HBP packet header
+                        _tmp_data = _data[:8] + _target['TGID'] + _data[11:15] + chr(_tmp_bits) + _data[16:20]
+
+                        # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
+                        # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
+                        # if _dst_id != rule['DST_GROUP']:
+                        dmrbits = bitarray(endian='big')
+                        dmrbits.frombytes(dmrpkt)
+                        # Create a voice header packet (FULL LC)
+                        if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
+                            dmrbits = _target_status[_target['TS']]['TX_H_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_H_LC'][98:197]
+                        # Create a voice terminator packet (FULL LC)
+                        elif _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VTERM:
+                            dmrbits = _target_status[_target['TS']]['TX_T_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_T_LC'][98:197]
+                            call_duration = pkt_time - _target_status[_target['TS']]['TX_START']
+                            systems[_target['SYSTEM']]._report.bridge_event('END', 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'], call_duration)
+                        # Create a Burst B-E packet (Embedded LC)
+                        elif _dtype_vseq in [1,2,3,4]:
+                            dmrbits = dmrbits[0:116] + _target_status[_target['TS']]['TX_EMB_LC'][_dtype_vseq] + dmrbits[148:264]
+                        dmrpkt = dmrbits.tobytes()
+                        _tmp_data = _tmp_data + dmrpkt + '\x00\x00' # Add two bytes of nothing since OBP doesn't include BER & RSSI bytes #_data[53:55]
+
+                    # Transmit the packet to the destination system
+                    systems[_target['SYSTEM']].send_system(_tmp_data)
+                    #logger.debug('(%s) Packet routed by bridge: %s to system: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
 
 
 
@@ -398,8 +549,7 @@ class routerOBP(OPENBRIDGE):
                 call_duration = pkt_time - self.STATUS[_stream_id]['START']
                 logger.info('(%s) *CALL END*   STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s, Duration: %s', \
                         self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot, call_duration)
-                if CONFIG['REPORTS']['REPORT']:
-                   self._report.send_bridgeEvent('GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id), call_duration))
+                self._report.bridge_event('END', 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id, call_duration)
                 removed = self.STATUS.pop(_stream_id)
                 logger.debug('(%s) OpenBridge sourced call stream end, remove terminated Stream ID: %s', self._system, int_id(_stream_id))
                 if not removed:
@@ -415,8 +565,8 @@ class routerHBP(HBSYSTEM):
         # In TX_EMB_LC, 2-5 are burst B-E
         self.STATUS = {
             1: {
-                'RX_START':     time(),
-                'TX_START':     time(),
+                'RX_START':     now(),
+                'TX_START':     now(),
                 'RX_SEQ':       '\x00',
                 'RX_RFS':       '\x00',
                 'TX_RFS':       '\x00',
@@ -426,8 +576,8 @@ class routerHBP(HBSYSTEM):
                 'TX_STREAM_ID': '\x00',
                 'RX_TGID':      '\x00\x00\x00',
                 'TX_TGID':      '\x00\x00\x00',
-                'RX_TIME':      time(),
-                'TX_TIME':      time(),
+                'RX_TIME':      now(),
+                'TX_TIME':      now(),
                 'RX_TYPE':      hb_const.HBPF_SLT_VTERM,
                 'TX_TYPE':      hb_const.HBPF_SLT_VTERM,
                 'RX_LC':        '\x00',
@@ -441,8 +591,8 @@ class routerHBP(HBSYSTEM):
                     }
                 },
             2: {
-                'RX_START':     time(),
-                'TX_START':     time(),
+                'RX_START':     now(),
+                'TX_START':     now(),
                 'RX_SEQ':       '\x00',
                 'RX_RFS':       '\x00',
                 'TX_RFS':       '\x00',
@@ -452,8 +602,8 @@ class routerHBP(HBSYSTEM):
                 'TX_STREAM_ID': '\x00',
                 'RX_TGID':      '\x00\x00\x00',
                 'TX_TGID':      '\x00\x00\x00',
-                'RX_TIME':      time(),
-                'TX_TIME':      time(),
+                'RX_TIME':      now(),
+                'TX_TIME':      now(),
                 'RX_TYPE':      hb_const.HBPF_SLT_VTERM,
                 'TX_TYPE':      hb_const.HBPF_SLT_VTERM,
                 'RX_LC':        '\x00',
@@ -468,10 +618,51 @@ class routerHBP(HBSYSTEM):
                 }
             }
 
-    def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data):
-        pkt_time = time()
+    # A frame another worker bridged to this system (see hb_shard). That worker only
+    # knows the calls it routed here itself, so contention is handled again, the
+    # same way, against everything this system is carrying. The other worker
+    # keeps the TX_TYPE of the stream and times it out.
+    def send_from_worker(self, _packet):
+        if _packet[:4] != 'DMRD':
+            self.send_system(_packet)
+            return
+        _frame = DMRD(_packet)
+        _rf_src, _dst_id, _slot, _stream_id = _frame.rf_src, _frame.dst_id, _frame.slot, _frame.stream_id
+        _status = self.STATUS[_slot]
+        pkt_time = now()
+
+        if ((_dst_id != _status['RX_TGID']) and ((pkt_time - _status['RX_TIME']) < self._config['GROUP_HANGTIME'])) \
+                or ((_dst_id != _status['TX_TGID']) and ((pkt_time - _status['TX_TIME']) < self._config['GROUP_HANGTIME'])) \
+                or ((_dst_id == _status['RX_TGID']) and ((pkt_time - _status['RX_TIME']) < hb_const.STREAM_TO)) \
+                or ((_dst_id == _status['TX_TGID']) and (_rf_src != _status['TX_RFS']) and ((pkt_time - _status['TX_TIME']) < hb_const.STREAM_TO)):
+            if _frame.frame_type == hb_const.HBPF_DATA_SYNC and _frame.dtype_vseq == hb_const.HBPF_SLT_VHEAD:
+                logger.info('(%s) Call from another worker not routed, system busy: STREAM ID: %s, SUB: %s, TS: %s, TGID: %s', self._system, int_id(_stream_id), int_id(_rf_src), _slot, int_id(_dst_id))
+            self._metrics.contention_drops += 1
+            return
+
+        if (_stream_id != _status['TX_STREAM_ID']) or (_status['TX_RFS'] != _rf_src) or (_status['TX_TGID'] != _dst_id):
+            _status['TX_START'] = pkt_time
+            _status['TX_TGID'] = _dst_id
+            _status['TX_STREAM_ID'] = _stream_id
+            _status['TX_RFS'] = _rf_src
+            _status['TX_PEER'] = _frame.peer_id
+        _status['TX_TIME'] = pkt_time
+        self.send_system(_packet)
+
+    def dmrd_received(self, _frame):
+        _peer_id    = _frame.peer_id
+        _rf_src     = _frame.rf_src
+        _dst_id     = _frame.dst_id
+        _seq        = _frame.seq
+        _slot       = _frame.slot
+        _call_type  = _frame.call_type
+        _frame_type = _frame.frame_type
+        _dtype_vseq = _frame.dtype_vseq
+        _stream_id  = _frame.stream_id
+        _data       = _frame.data
+        _bits       = _frame.bits
+        pkt_time = now()
         dmrpkt = _data[20:53]
-        _bits = int_id(_data[15])
 
         if _call_type == 'group':
 
@@ -485,8 +676,7 @@ class routerHBP(HBSYSTEM):
                 self.STATUS[_slot]['RX_START'] = pkt_time
                 logger.info('(%s) *CALL START* STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                         self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
-                if CONFIG['REPORTS']['REPORT']:
-                    self._report.send_bridgeEvent('GROUP VOICE,START,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)))
+                self._report.bridge_event('START', 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
 
                 # If we can, use the LC from the voice header as to keep all options intact
                 if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
@@ -498,149 +688,148 @@ class routerHBP(HBSYSTEM):
                 else:
                     self.STATUS[_slot]['RX_LC'] = const.LC_OPT + _dst_id + _rf_src
 
-            for _bridge in BRIDGES:
-                for _system in BRIDGES[_bridge]:
-
-                    if (_system['SYSTEM'] == self._system and _system['TGID'] == _dst_id and _system['TS'] == _slot and _system['ACTIVE'] == True):
-
-                        for _target in BRIDGES[_bridge]:
-                            if _target['SYSTEM'] != self._system:
-                                if _target['ACTIVE']:
-                                    _target_status = systems[_target['SYSTEM']].STATUS
-                                    _target_system = self._CONFIG['SYSTEMS'][_target['SYSTEM']]
-
-                                    if _target_system['MODE'] == 'OPENBRIDGE':
-                                        # Is this a new call stream on the target?
-                                        if (_stream_id not in _target_status):
-                                            # This is a new call stream on the target
-                                            _target_status[_stream_id] = {
-                                                'START':     pkt_time,
-                                                'CONTENTION':False,
-                                                'RFS':       _rf_src,
-                                                'TGID':      _dst_id,
-                                            }
-                                            # Generate LCs (full and EMB) for the TX stream
-                                            dst_lc = ''.join([self.STATUS[_slot]['RX_LC'][0:3], _target['TGID'], _rf_src])
-                                            _target_status[_stream_id]['H_LC'] = bptc.encode_header_lc(dst_lc)
-                                            _target_status[_stream_id]['T_LC'] = bptc.encode_terminator_lc(dst_lc)
-                                            _target_status[_stream_id]['EMB_LC'] = bptc.encode_emblc(dst_lc)
+            for _bridge, _system, _targets in ROUTES.get((self._system, _dst_id, _slot), ()):
+                for _target in _targets:
+                    _target_status = systems[_target['SYSTEM']].STATUS
+                    _target_system = self._CONFIG['SYSTEMS'][_target['SYSTEM']]
+
+                    if _target_system['MODE'] == 'OPENBRIDGE':
+                        # Is this a new call stream on the target?
+                        if (_stream_id not in _target_status):
+                            # This is a new call stream on the target
+                            _target_status[_stream_id] = {
+                                'START':     pkt_time,
+                                'CONTENTION':False,
+                                'RFS':       _rf_src,
+                                'TGID':      _dst_id,
+                            }
+                            # Generate LCs (full and EMB) for the TX stream
+                            dst_lc = ''.join([self.STATUS[_slot]['RX_LC'][0:3], _target['TGID'], _rf_src])
+                            _h_lc, _t_lc, _emb_lc = LC_CACHE.encode(dst_lc)
+                            _target_status[_stream_id]['H_LC'] = _h_lc
+                            _target_status[_stream_id]['T_LC'] = _t_lc
+                            _target_status[_stream_id]['EMB_LC'] = _emb_lc
                                             
-                                            logger.info('(%s) Conference Bridge: %s, Call Bridged to OBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
-                                            if CONFIG['REPORTS']['REPORT']:
-                                                systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID'])))
-
-                                        # Record the time of this packet so we can later identify a stale stream
-                                        _target_status[_stream_id]['LAST'] = pkt_time
-                                        # Clear the TS bit -- all OpenBridge streams are effectively on TS1
-                                        _tmp_bits = _bits & ~(1 << 7)
-
-                                        # Assemble transmit HBP packet header
-                                        _tmp_data = _data[:8] + _target['TGID'] + _data[11:15] + chr(_tmp_bits) + _data[16:20]
-
-                                        # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
-                                        # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
-                                        # if _dst_id != rule['DST_GROUP']:
-                                        dmrbits = bitarray(endian='big')
-                                        dmrbits.frombytes(dmrpkt)
-                                        # Create a voice header packet (FULL LC)
-                                        if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
-                                            dmrbits = _target_status[_stream_id]['H_LC'][0:98] + dmrbits[98:166] + _target_status[_stream_id]['H_LC'][98:197]
-                                        # Create a voice terminator packet (FULL LC)
-                                        elif _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VTERM:
-                                            dmrbits = _target_status[_stream_id]['T_LC'][0:98] + dmrbits[98:166] + _target_status[_stream_id]['T_LC'][98:197]
-                                            if CONFIG['REPORTS']['REPORT']:
-                                                call_duration = pkt_time - _target_status[_stream_id]['START']
-                                                systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID']), call_duration))
-                                        # Create a Burst B-E packet (Embedded LC)
-                                        elif _dtype_vseq in [1,2,3,4]:
-                                            dmrbits = dmrbits[0:116] + _target_status[_stream_id]['EMB_LC'][_dtype_vseq] + dmrbits[148:264]
-                                        dmrpkt = dmrbits.tobytes()
-                                        _tmp_data = _tmp_data + dmrpkt #+ _data[53:55]
-
-                                    else:
-                                        # BEGIN STANDARD CONTENTION HANDLING
-                                        #
-                                        # The rules for each of the 4 "ifs" below are listed here for readability. The Frame To Send is:
-                                        #   From a different group than last RX from this HBSystem, but it has been less than Group Hangtime
-                                        #   From a different group than last TX to this HBSystem, but it has been less than Group Hangtime
-                                        #   From the same group as the last RX from this HBSystem, but from a different subscriber, and it has been less than stream timeout
-                                        #   From the same group as the last TX to this HBSystem, but from a different subscriber, and it has been less than stream timeout
-                                        # The "continue" at the end of each means the next iteration of the for loop that tests for matching rules
-                                        #
-                                        if ((_target['TGID'] != _target_status[_target['TS']]['RX_TGID']) and ((pkt_time - _target_status[_target['TS']]['RX_TIME']) < _target_system['GROUP_HANGTIME'])):
-                                            if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD and self.STATUS[_slot]['RX_STREAM_ID'] != _seq:
-                                                logger.info('(%s) Call not routed to TGID %s, target active or in group hangtime: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['RX_TGID']))
-                                            continue
-                                        if ((_target['TGID'] != _target_status[_target['TS']]['TX_TGID']) and ((pkt_time - _target_status[_target['TS']]['TX_TIME']) < _target_system['GROUP_HANGTIME'])):
-                                            if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD and self.STATUS[_slot]['RX_STREAM_ID'] != _seq:
-                                                logger.info('(%s) Call not routed to TGID%s, target in group hangtime: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['TX_TGID']))
-                                            continue
-                                        if (_target['TGID'] == _target_status[_target['TS']]['RX_TGID']) and ((pkt_time - _target_status[_target['TS']]['RX_TIME']) < hb_const.STREAM_TO):
-                                            if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD and self.STATUS[_slot]['RX_STREAM_ID'] != _seq:
-                                                logger.info('(%s) Call not routed to TGID%s, matching call already active on target: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['RX_TGID']))
-                                            continue
-                                        if (_target['TGID'] == _target_status[_target['TS']]['TX_TGID']) and (_rf_src != _target_status[_target['TS']]['TX_RFS']) and ((pkt_time - _target_status[_target['TS']]['TX_TIME']) < hb_const.STREAM_TO):
-                                            if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD and self.STATUS[_slot]['RX_STREAM_ID'] != _seq:
-                                                logger.info('(%s) Call not routed for subscriber %s, call route in progress on target: HBSystem: %s, TS: %s, TGID: %s, SUB: %s', self._system, int_id(_rf_src), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['TX_TGID']), int_id(_target_status[_target['TS']]['TX_RFS']))
-                                            continue
-
-                                        # Is this a new call stream? 
-                                        if (_stream_id != self.STATUS[_slot]['RX_STREAM_ID']) or (_target_status[_target['TS']]['TX_RFS'] != _rf_src) or (_target_status[_target['TS']]['TX_TGID'] != _target['TGID']):
-                                             # Record the DST TGID and Stream ID
-                                             _target_status[_target['TS']]['TX_START'] = pkt_time
-                                             if CONFIG['SYSTEMS'][_target['SYSTEM']]['MODE'] == 'XLXPEER':
-                                                  # Munge the destination TGID for XLXs
-                                                  _target['TGID'] = hex_str_3(int(CONFIG['SYSTEMS'][_target['SYSTEM']]['XLXMODULE']))
-                                             _target_status[_target['TS']]['TX_TGID'] = _target['TGID']
-                                             _target_status[_target['TS']]['TX_STREAM_ID'] = _stream_id
-                                             _target_status[_target['TS']]['TX_RFS'] = _rf_src
-                                             _target_status[_target['TS']]['TX_PEER'] = _peer_id
-                                             # Generate LCs (full and EMB) for the TX stream
-                                             dst_lc = self.STATUS[_slot]['RX_LC'][0:3] + _target['TGID'] + _rf_src
-                                             _target_status[_target['TS']]['TX_H_LC'] = bptc.encode_header_lc(dst_lc)
-                                             _target_status[_target['TS']]['TX_T_LC'] = bptc.encode_terminator_lc(dst_lc)
-                                             _target_status[_target['TS']]['TX_EMB_LC'] = bptc.encode_emblc(dst_lc)
-                                             logger.debug('(%s) Generating TX FULL and EMB LCs for HomeBrew destination: System: %s, TS: %s, TGID: %s', self._system, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
-                                             logger.info('(%s) Conference Bridge: %s, Call Bridged to HBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
-                                             if CONFIG['REPORTS']['REPORT']:
-                                                systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID'])))
-
-                                        # Set other values for the contention handler to test next time there is a frame to forward
-                                        _target_status[_target['TS']]['TX_TIME'] = pkt_time
-                                        _target_status[_target['TS']]['TX_TYPE'] = _dtype_vseq
-
-                                        # Handle any necessary re-writes for the destination
-                                        if _system['TS'] != _target['TS']:
-                                            _tmp_bits = _bits ^ 1 << 7
-                                        else:
-                                            _tmp_bits = _bits
-
-                                        # Assemble transmit HBP packet header
-                                        _tmp_data = _data[:8] + _target['TGID'] + _data[11:15] + chr(_tmp_bits) + _data[16:20]
-
-                                        # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
-                                        # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
-                                        # if _dst_id != rule['DST_GROUP']:
-                                        dmrbits = bitarray(endian='big')
-                                        dmrbits.frombytes(dmrpkt)
-                                        # Create a voice header packet (FULL LC)
-                                        if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
-                                            dmrbits = _target_status[_target['TS']]['TX_H_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_H_LC'][98:197]
-                                        # Create a voice terminator packet (FULL LC)
-                                        elif _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VTERM:
-                                            dmrbits = _target_status[_target['TS']]['TX_T_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_T_LC'][98:197]
-                                            if CONFIG['REPORTS']['REPORT']:
-                                                call_duration = pkt_time - _target_status[_target['TS']]['TX_START']
-                                                systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID']), call_duration))
-                                        # Create a Burst B-E packet (Embedded LC)
-                                        elif _dtype_vseq in [1,2,3,4]:
-                                            dmrbits = dmrbits[0:116] + _target_status[_target['TS']]['TX_EMB_LC'][_dtype_vseq] + dmrbits[148:264]
-                                        dmrpkt = dmrbits.tobytes()
-                                        _tmp_data = _tmp_data + dmrpkt + _data[53:55]
-
-                                    # Transmit the packet to the destination system
-                                    systems[_target['SYSTEM']].send_system(_tmp_data)
-                                    #logger.debug('(%s) Packet routed by bridge: %s to system: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
+                            logger.info('(%s) Conference Bridge: %s, Call Bridged to OBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
+                            systems[_target['SYSTEM']]._report.bridge_event('START', 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'])
+
+                        # Record the time of this packet so we can later identify a stale stream
+                        _target_status[_stream_id]['LAST'] = pkt_time
+                        # Clear the TS bit -- all OpenBridge streams are effectively on TS1
+                        _tmp_bits = _bits & ~(1 << 7)
+
+                        # Assemble transmit HBP packet header
+                        _tmp_data = _data[:8] + _target['TGID'] + _data[11:15] + chr(_tmp_bits) + _data[16:20]
+
+                        # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
+                        # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
+                        # if _dst_id != rule['DST_GROUP']:
+                        dmrbits = bitarray(endian='big')
+                        dmrbits.frombytes(dmrpkt)
+                        # Create a voice header packet (FULL LC)
+                        if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
+                            dmrbits = _target_status[_stream_id]['H_LC'][0:98] + dmrbits[98:166] + _target_status[_stream_id]['H_LC'][98:197]
+                        # Create a voice terminator packet (FULL LC)
+                        elif _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VTERM:
+                            dmrbits = _target_status[_stream_id]['T_LC'][0:98] + dmrbits[98:166] + _target_status[_stream_id]['T_LC'][98:197]
+                            call_duration = pkt_time - _target_status[_stream_id]['START']
+                            systems[_target['SYSTEM']]._report.bridge_event('END', 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'], call_duration)
+                        # Create a Burst B-E packet (Embedded LC)
+                        elif _dtype_vseq in [1,2,3,4]:
+                            dmrbits = dmrbits[0:116] + _target_status[_stream_id]['EMB_LC'][_dtype_vseq] + dmrbits[148:264]
+                        dmrpkt = dmrbits.tobytes()
+                        _tmp_data = _tmp_data + dmrpkt #+ _data[53:55]
+
+                    else:
+                        # BEGIN STANDARD CONTENTION HANDLING
+                        #
+                        # The rules for each of the 4 "ifs" below are listed here for readability. The Frame To Send is:
+                        #   From a different group than last RX from this HBSystem, but it has been less than Group Hangtime
+                        #   From a different group than last TX to this HBSystem, but it has been less than Group Hangtime
+                        #   From the same group as the last RX from this HBSystem, but from a different subscriber, and it has been less than stream timeout
+                        #   From the same group as the last TX to this HBSystem, but from a different subscriber, and it has been less than stream timeout
+                        # The "continue" at the end of each means the next iteration of the for loop that tests for matching rules
+                        #
+                        if ((_target['TGID'] != _target_status[_target['TS']]['RX_TGID']) and ((pkt_time - _target_status[_target['TS']]['RX_TIME']) < _target_system['GROUP_HANGTIME'])):
+                            if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD and self.STATUS[_slot]['RX_STREAM_ID'] != _seq:
+                                logger.info('(%s) Call not routed to TGID %s, target active or in group hangtime: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['RX_TGID']))
+                            self._metrics.contention_drops += 1
+                            continue
+                        if ((_target['TGID'] != _target_status[_target['TS']]['TX_TGID']) and ((pkt_time - _target_status[_target['TS']]['TX_TIME']) < _target_system['GROUP_HANGTIME'])):
+                            if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD and self.STATUS[_slot]['RX_STREAM_ID'] != _seq:
+                                logger.info('(%s) Call not routed to TGID%s, target in group hangtime: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['TX_TGID']))
+                            self._metrics.contention_drops += 1
+                            continue
+                        if (_target['TGID'] == _target_status[_target['TS']]['RX_TGID']) and ((pkt_time - _target_status[_target['TS']]['RX_TIME']) < hb_const.STREAM_TO):
+                            if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD and self.STATUS[_slot]['RX_STREAM_ID'] != _seq:
+                                logger.info('(%s) Call not routed to TGID%s, matching call already active on target: HBSystem: %s, TS: %s, TGID: %s', self._system, int_id(_target['TGID']), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['RX_TGID']))
+                            self._metrics.contention_drops += 1
+                            continue
+                        if (_target['TGID'] == _target_status[_target['TS']]['TX_TGID']) and (_rf_src != _target_status[_target['TS']]['TX_RFS']) and ((pkt_time - _target_status[_target['TS']]['TX_TIME']) < hb_const.STREAM_TO):
+                            if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD and self.STATUS[_slot]['RX_STREAM_ID'] != _seq:
+                                logger.info('(%s) Call not routed for subscriber %s, call route in progress on target: HBSystem: %s, TS: %s, TGID: %s, SUB: %s', self._system, int_id(_rf_src), _target['SYSTEM'], _target['TS'], int_id(_target_status[_target['TS']]['TX_TGID']), int_id(_target_status[_target['TS']]['TX_RFS']))
+                            self._metrics.contention_drops += 1
+                            continue
+
+                        # Is this a new call stream? 
+                        if (_stream_id != self.STATUS[_slot]['RX_STREAM_ID']) or (_target_status[_target['TS']]['TX_RFS'] != _rf_src) or (_target_status[_target['TS']]['TX_TGID'] != _target['TGID']):
+                             # Record the DST TGID and Stream ID
+                             _target_status[_target['TS']]['TX_START'] = pkt_time
+                             if CONFIG['SYSTEMS'][_target['SYSTEM']]['MODE'] == 'XLXPEER':
+                                  # Munge the destination TGID for XLXs (and re-index the bridge, the entry has a new TGID)
+                                  _xlx_tgid = hex_str_3(int(CONFIG['SYSTEMS'][_target['SYSTEM']]['XLXMODULE']))
+                                  if _target['TGID'] != _xlx_tgid:
+                                      _target['TGID'] = _xlx_tgid
+                                      route_bridge(_bridge)
+                             _target_status[_target['TS']]['TX_TGID'] = _target['TGID']
+                             _target_status[_target['TS']]['TX_STREAM_ID'] = _stream_id
+                             _target_status[_target['TS']]['TX_RFS'] = _rf_src
+                             _target_status[_target['TS']]['TX_PEER'] = _peer_id
+                             # Generate LCs (full and EMB) for the TX stream
+                             dst_lc = self.STATUS[_slot]['RX_LC'][0:3] + _target['TGID'] + _rf_src
+                             _h_lc, _t_lc, _emb_lc = LC_CACHE.encode(dst_lc)
+                             _target_status[_target['TS']]['TX_H_LC'] = _h_lc
+                             _target_status[_target['TS']]['TX_T_LC'] = _t_lc
+                             _target_status[_target['TS']]['TX_EMB_LC'] = _emb_lc
+                             logger.debug('(%s) Generating TX FULL and EMB LCs for HomeBrew destination: System: %s, TS: %s, TGID: %s', self._system, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
+                             logger.info('(%s) Conference Bridge: %s, Call Bridged to HBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
+                             systems[_target['SYSTEM']]._report.bridge_event('START', 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'])
+
+                        # Set other values for the contention handler to test next time there is a frame to forward
+                        _target_status[_target['TS']]['TX_TIME'] = pkt_time
+                        _target_status[_target['TS']]['TX_TYPE'] = _dtype_vseq
+
+                        # Handle any necessary re-writes for the destination
+                        if _system['TS'] != _target['TS']:
+                            _tmp_bits = _bits ^ 1 << 7
+                        else:
+                            _tmp_bits = _bits
+
+                        # Assemble transmit HBP packet header
+                        _tmp_data = _data[:8] + _target['TGID'] + _data[11:15] + chr(_tmp_bits) + _data[16:20]
+
+                        # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
+                        # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
+                        # if _dst_id != rule['DST_GROUP']:
+                        dmrbits = bitarray(endian='big')
+                        dmrbits.frombytes(dmrpkt)
+                        # Create a voice header packet (FULL LC)
+                        if _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VHEAD:
+                            dmrbits = _target_status[_target['TS']]['TX_H_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_H_LC'][98:197]
+                        # Create a voice terminator packet (FULL LC)
+                        elif _frame_type == hb_const.HBPF_DATA_SYNC and _dtype_vseq == hb_const.HBPF_SLT_VTERM:
+                            dmrbits = _target_status[_target['TS']]['TX_T_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_T_LC'][98:197]
+                            call_duration = pkt_time - _target_status[_target['TS']]['TX_START']
+                            systems[_target['SYSTEM']]._report.bridge_event('END', 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'], call_duration)
+                        # Create a Burst B-E packet (Embedded LC)
+                        elif _dtype_vseq in [1,2,3,4]:
+                            dmrbits = dmrbits[0:116] + _target_status[_target['TS']]['TX_EMB_LC'][_dtype_vseq] + dmrbits[148:264]
+                        dmrpkt = dmrbits.tobytes()
+                        _tmp_data = _tmp_data + dmrpkt + _data[53:55]
+
+                    # Transmit the packet to the destination system
+                    systems[_target['SYSTEM']].send_system(_tmp_data)
+                    #logger.debug('(%s) Packet routed by bridge: %s to system: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
 
 
 
@@ -649,60 +838,17 @@ class routerHBP(HBSYSTEM):
                 call_duration = pkt_time - self.STATUS[_slot]['RX_START']
                 logger.info('(%s) *CALL END*   STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s, Duration: %s', \
                         self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot, call_duration)
-                if CONFIG['REPORTS']['REPORT']:
-                   self._report.send_bridgeEvent('GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id), call_duration))
+                self._report.bridge_event('END', 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id, call_duration)
 
                 #
                 # Begin in-band signalling for call end. This has nothign to do with routing traffic directly.
                 #
 
-                # Iterate the rules dictionary
-
-                for _bridge in BRIDGES:
-                    for _system in BRIDGES[_bridge]:
-                        if _system['SYSTEM'] == self._system:
-
-                            # TGID matches a rule source, reset its timer
-                            if _slot == _system['TS'] and _dst_id == _system['TGID'] and ((_system['TO_TYPE'] == 'ON' and (_system['ACTIVE'] == True)) or (_system['TO_TYPE'] == 'OFF' and _system['ACTIVE'] == False)):
-                                _system['TIMER'] = pkt_time + _system['TIMEOUT']
-                                logger.info('(%s) Transmission match for Bridge: %s. Reset timeout to %s', self._system, _bridge, _system['TIMER'])
-
-                            # TGID matches an ACTIVATION trigger
-                            if (_dst_id in _system['ON'] or _dst_id in _system['RESET']) and _slot == _system['TS']:
-                                # Set the matching rule as ACTIVE
-                                if _dst_id in _system['ON']:
-                                    if _system['ACTIVE'] == False:
-                                        _system['ACTIVE'] = True
-                                        _system['TIMER'] = pkt_time + _system['TIMEOUT']
-                                        logger.info('(%s) Bridge: %s, connection changed to state: %s', self._system, _bridge, _system['ACTIVE'])
-                                        # Cancel the timer if we've enabled an "OFF" type timeout
-                                        if _system['TO_TYPE'] == 'OFF':
-                                            _system['TIMER'] = pkt_time
-                                            logger.info('(%s) Bridge: %s set to "OFF" with an on timer rule: timeout timer cancelled', self._system, _bridge)
-                                # Reset the timer for the rule
-                                if _system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON':
-                                    _system['TIMER'] = pkt_time + _system['TIMEOUT']
-                                    logger.info('(%s) Bridge: %s, timeout timer reset to: %s', self._system, _bridge, _system['TIMER'] - pkt_time)
-
-                            # TGID matches an DE-ACTIVATION trigger
-                            if (_dst_id in _system['OFF']  or _dst_id in _system['RESET']) and _slot == _system['TS']:
-                                # Set the matching rule as ACTIVE
-                                if _dst_id in _system['OFF']:
-                                    if _system['ACTIVE'] == True:
-                                        _system['ACTIVE'] = False
-                                        logger.info('(%s) Bridge: %s, connection changed to state: %s', self._system, _bridge, _system['ACTIVE'])
-                                        # Cancel the timer if we've enabled an "ON" type timeout
-                                        if _system['TO_TYPE'] == 'ON':
-                                            _system['TIMER'] = pkt_time
-                                            logger.info('(%s) Bridge: %s set to ON with and "OFF" timer rule: timeout timer cancelled', self._system, _bridge)
-                                # Reset the timer for the rule
-                                if _system['ACTIVE'] == False and _system['TO_TYPE'] == 'OFF':
-                                    _system['TIMER'] = pkt_time + _system['TIMEOUT']
-                                    logger.info('(%s) Bridge: %s, timeout timer reset to: %s', self._system, _bridge, _system['TIMER'] - pkt_time)
-                                # Cancel the timer if we've enabled an "ON" type timeout
-                                if _system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON' and _dst_group in _system['OFF']:
-                                    _system['TIMER'] = pkt_time
-                                    logger.info('(%s) Bridge: %s set to ON with and "OFF" timer rule: timeout timer cancelled', self._system, _bridge)
+                # With more than one worker, only worker 0 keeps the bridge rules
+                if shard and shard.worker != 0:
+                    shard.send_signal(self._system, _slot, _dst_id, pkt_time)
+                else:
+                    bridge_signal(self._system, _slot, _dst_id, pkt_time)
 
             #
             # END IN-BAND SIGNALLING
@@ -722,13 +868,42 @@ class routerHBP(HBSYSTEM):
 # Socket-based reporting section
 #
 class confbridgeReportFactory(reportFactory):
+    def __init__(self, config):
+        reportFactory.__init__(self, config)
+        # Copies of each bridge's entries as last reported. The ON, OFF and RESET
+        # lists in them are shared, but those are only changed when the rules are read.
+        self._bridges = {}
+        # The last BRIDGE_SND, and a copy of the BRIDGES it was made from
+        self._snapshot = (None, None)
+
+    # BRIDGE_SND, only encoded again when BRIDGES has changed, which is seldom:
+    # when a call switches a rule on or off, or a rule timer runs out
+    def bridge_message(self):
+        if BRIDGES != self._snapshot[0]:
+            _copy = dict((_bridge, [dict(_entry) for _entry in _entries]) for _bridge, _entries in BRIDGES.iteritems())
+            self._snapshot = (_copy, REPORT_OPCODES['BRIDGE_SND']+self.encode(BRIDGES, hb_wire.encode_bridges))
+        return self._snapshot[1]
+
+    def send_snapshot(self, _client):
+        reportFactory.send_snapshot(self, _client)
+        _client.sendString(self.bridge_message())
 
     def send_bridge(self):
-        serialized = pickle.dumps(BRIDGES, protocol=pickle.HIGHEST_PROTOCOL)
-        self.send_clients(REPORT_OPCODES['BRIDGE_SND']+serialized)
-
-    def send_bridgeEvent(self, _data):
-        self.send_clients(REPORT_OPCODES['BRDG_EVENT']+_data)
+        if not self.clients:
+            return
+        if not self._config['REPORTS']['REPORT_DELTAS']:
+            self.send_clients(self.bridge_message(), True)
+            return
+        _changes = {}
+        for _bridge, _entries in BRIDGES.items():
+            if _entries != self._bridges.get(_bridge):
+                self._bridges[_bridge] = [dict(_entry) for _entry in _entries]
+                _changes[_bridge] = _entries
+        for _bridge in [_bridge for _bridge in self._bridges if _bridge not in BRIDGES]:
+            del self._bridges[_bridge]
+            _changes[_bridge] = None
+        if _changes:
+            self.send_clients(REPORT_OPCODES['BRIDGE_UPD']+self.encode(_changes, hb_wire.encode_bridges), True)
 
 
 #************************************************
@@ -749,6 +924,9 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('-c', '--config', action='store', dest='CONFIG_FILE', help='/full/path/to/config.file (usually hblink.cfg)')
     parser.add_argument('-l', '--logging', action='store', dest='LOG_LEVEL', help='Override config file logging level.')
+    parser.add_argument('-w', '--workers', action='store', dest='WORKERS', type=int, default=1, help='Spread the systems over this many worker processes.')
+    parser.add_argument('--worker', action='store', dest='WORKER', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--ipc', action='store', dest='IPC_DIR', help=argparse.SUPPRESS)
     cli_args = parser.parse_args()
 
     # Ensure we have a path for the config file, if one wasn't specified, then use the default (top of file)
@@ -765,8 +943,13 @@ if __name__ == '__main__':
     logger.info('\n\nCopyright (c) 2013, 2014, 2015, 2016, 2018\n\tThe Founding Members of the K0USY Group. All rights reserved.\n')
     logger.debug('Logging system started, anything from here on gets logged')
 
-    # Set up the signal handler
+    # Set up the signal handler. Only the first signal counts: with --workers, a
+    # Ctrl-C reaches each worker from the terminal and again from the supervisor.
+    _stopping = [False]
     def sig_handler(_signal, _frame):
+        if _stopping[0]:
+            return
+        _stopping[0] = True
         logger.info('SHUTDOWN: CONFBRIDGE IS TERMINATING WITH SIGNAL %s', str(_signal))
         hblink_handler(_signal, _frame)
         logger.info('SHUTDOWN: ALL SYSTEM HANDLERS EXECUTED - STOPPING REACTOR')
@@ -776,14 +959,21 @@ if __name__ == '__main__':
     for sig in [signal.SIGINT, signal.SIGTERM]:
         signal.signal(sig, sig_handler)
     
-    # Create the name-number mapping dictionaries
-    peer_ids, subscriber_ids, talkgroup_ids = mk_aliases(CONFIG)
+    # With --workers, this process only supervises the workers that run the systems
+    if cli_args.WORKERS > 1 and cli_args.WORKER is None:
+        sys.exit(hb_shard.supervise(cli_args.WORKERS))
+    shard = hb_shard.shard(CONFIG, cli_args.WORKERS, cli_args.WORKER, cli_args.IPC_DIR) if cli_args.WORKER is not None else None
 
     # Build the routing rules file
     BRIDGES = make_bridges('hb_confbridge_rules')
+    build_routes()
 
     # INITIALIZE THE REPORTING LOOP
-    report_server = config_reports(CONFIG, confbridgeReportFactory)
+    # Only one worker runs the reporting server, the others pass their events to it
+    if shard is None or shard.worker == 0:
+        report_server = config_reports(CONFIG, confbridgeReportFactory)
+    else:
+        report_server = hb_shard.remoteReport(shard)
 
     # HBlink instance creation
     logger.info('HBlink \'hb_confbridge.py\' -- SYSTEM STARTING...')
@@ -793,17 +983,34 @@ if __name__ == '__main__':
                 systems[system] = routerOBP(system, CONFIG, report_server)
             else:
                 systems[system] = routerHBP(system, CONFIG, report_server)
-            reactor.listenUDP(CONFIG['SYSTEMS'][system]['PORT'], systems[system], interface=CONFIG['SYSTEMS'][system]['IP'])
+            if shard is None or shard.owns(system):
+                listen_udp(reactor, CONFIG['SYSTEMS'][system]['PORT'], systems[system], CONFIG['SYSTEMS'][system]['IP'], CONFIG['GLOBAL']['RECV_BATCH'])
+            else:
+                shard.remote(systems[system])
             logger.debug('%s instance created: %s, %s', CONFIG['SYSTEMS'][system]['MODE'], system, systems[system])
+    if shard:
+        shard.signal_received = bridge_signal
+        shard.rules_received = rules_received
+        shard.listen(systems, report_server)
+    config_metrics(CONFIG, systems, report_server, shard)
+    hb_metrics.gauge('hblink_lc_cache_hits_total', 'Streams bridged with LC encodings already made', lambda: [(None, LC_CACHE.hits)], 'counter')
+    hb_metrics.gauge('hblink_lc_cache_misses_total', 'Streams bridged with an LC that had to be encoded', lambda: [(None, LC_CACHE.misses)], 'counter')
+    hb_metrics.gauge('hblink_lc_cache_size', 'LCs with their encodings kept', lambda: [(None, len(LC_CACHE))])
+
+    # Create the name-number mapping dictionaries, now that the systems are listening
+    # (with --workers, only worker 0 downloads the files, see hb_aliases)
+    peer_ids, subscriber_ids, talkgroup_ids = mk_aliases_later(CONFIG, shard is None or shard.worker == 0)
 
     def loopingErrHandle(failure):
         logger.error('STOPPING REACTOR TO AVOID MEMORY LEAK: Unhandled error in timed loop.\n %s', failure)
         reactor.stop()
 
-    # Initialize the rule timer -- this if for user activated stuff
-    rule_timer_task = task.LoopingCall(rule_timer_loop)
-    rule_timer = rule_timer_task.start(60)
-    rule_timer.addErrback(loopingErrHandle)
+    # Initialize the rule timer -- this if for user activated stuff. With more
+    # than one worker, worker 0 keeps the rules and the others follow it.
+    if shard is None or shard.worker == 0:
+        rule_timer_task = task.LoopingCall(rule_timer_loop)
+        rule_timer = rule_timer_task.start(60)
+        rule_timer.addErrback(loopingErrHandle)
 
     # Initialize the stream trimmer
     stream_trimmer_task = task.LoopingCall(stream_trimmer_loop)
@@ -811,4 +1018,5 @@ if __name__ == '__main__':
     stream_trimmer.addErrback(loopingErrHandle)
     
 
+    hb_clock.install(reactor)
     reactor.run()
@@ -30,6 +30,7 @@ import ConfigParser
 import sys
 import hb_const as const
 
+from hb_acl import acl_compile
 from socket import gethostbyname 
 
 # Does anybody read this stuff? There's a PEP somewhere that says I should do this.
@@ -63,9 +64,11 @@ def process_acls(_config):
 # Create an access control list that is programatically useable from human readable:
 # ORIGINAL:  'DENY:1-5,3120101,3120124'
 # PROCESSED: (False, set([(1, 5), (3120124, 3120124), (3120101, 3120101)]))
+# COMPILED:  (False, (1, 3120101, 3120124), (5, 3120101, 3120124))
+# The compiled form is what gets stored in the config, see hb_acl.py
 def acl_build(_acl, _max):
     if not _acl:
-        return(True, set((const.ID_MIN, _max)))
+        return acl_compile(True, [(const.ID_MIN, _max)])
 
     acl = set()
     sections = _acl.split(':')
@@ -94,7 +97,7 @@ def acl_build(_acl, _max):
             else:
                  sys.exit('ACL CREATION ERROR, VALUE OUT OF RANGE ({} - {}) IN SINGLE ID ENTRY: {}'.format(const.ID_MIN, _max, entry))
 
-    return (action, acl)
+    return acl_compile(action, acl)
 
 def build_config(_config_file):
     config = ConfigParser.ConfigParser()
@@ -120,7 +123,10 @@ def build_config(_config_file):
                     'REG_ACL': config.get(section, 'REG_ACL'),
                     'SUB_ACL': config.get(section, 'SUB_ACL'),
                     'TG1_ACL': config.get(section, 'TGID_TS1_ACL'),
-                    'TG2_ACL': config.get(section, 'TGID_TS2_ACL')
+                    'TG2_ACL': config.get(section, 'TGID_TS2_ACL'),
+                    'RECV_BATCH': config.getint(section, 'RECV_BATCH') if config.has_option(section, 'RECV_BATCH') else const.RECV_BATCH,
+                    'PEER_SNAPSHOT_DIR': config.get(section, 'PEER_SNAPSHOT_DIR') if config.has_option(section, 'PEER_SNAPSHOT_DIR') else const.PEER_SNAPSHOT_DIR,
+                    'PEER_SNAPSHOT_TTL': config.getint(section, 'PEER_SNAPSHOT_TTL') if config.has_option(section, 'PEER_SNAPSHOT_TTL') else const.PEER_SNAPSHOT_TTL
                 })
 
             elif section == 'REPORTS':
@@ -128,8 +134,18 @@ def build_config(_config_file):
                     'REPORT': config.getboolean(section, 'REPORT'),
                     'REPORT_INTERVAL': config.getint(section, 'REPORT_INTERVAL'),
                     'REPORT_PORT': config.getint(section, 'REPORT_PORT'),
-                    'REPORT_CLIENTS': config.get(section, 'REPORT_CLIENTS').split(',')
+                    'REPORT_CLIENTS': config.get(section, 'REPORT_CLIENTS').split(','),
+                    'REPORT_DELTAS': config.getboolean(section, 'REPORT_DELTAS') if config.has_option(section, 'REPORT_DELTAS') else const.REPORT_DELTAS,
+                    'REPORT_FORMAT': config.get(section, 'REPORT_FORMAT') if config.has_option(section, 'REPORT_FORMAT') else const.REPORT_FORMAT,
+                    'REPORT_LATENCY': config.getboolean(section, 'REPORT_LATENCY') if config.has_option(section, 'REPORT_LATENCY') else const.REPORT_LATENCY,
+                    'CDR_FILE': config.get(section, 'CDR_FILE') if config.has_option(section, 'CDR_FILE') else const.CDR_FILE,
+                    'CDR_MAX_BYTES': config.getint(section, 'CDR_MAX_BYTES') if config.has_option(section, 'CDR_MAX_BYTES') else const.CDR_MAX_BYTES,
+                    'CDR_ROTATE': config.getint(section, 'CDR_ROTATE') if config.has_option(section, 'CDR_ROTATE') else const.CDR_ROTATE,
+                    'METRICS_PORT': config.getint(section, 'METRICS_PORT') if config.has_option(section, 'METRICS_PORT') else const.METRICS_PORT,
+                    'METRICS_IP': config.get(section, 'METRICS_IP') if config.has_option(section, 'METRICS_IP') else const.METRICS_IP
                 })
+                if CONFIG['REPORTS']['REPORT_FORMAT'] not in ('pickle', 'wire'):
+                    sys.exit('REPORT_FORMAT must be pickle or wire, not \'{}\''.format(CONFIG['REPORTS']['REPORT_FORMAT']))
 
             elif section == 'LOGGER':
                 CONFIG['LOGGER'].update({
@@ -257,7 +273,9 @@ def build_config(_config_file):
                         'REG_ACL': config.get(section, 'REG_ACL'),
                         'SUB_ACL': config.get(section, 'SUB_ACL'),
                         'TG1_ACL': config.get(section, 'TGID_TS1_ACL'),
-                        'TG2_ACL': config.get(section, 'TGID_TS2_ACL')
+                        'TG2_ACL': config.get(section, 'TGID_TS2_ACL'),
+                        'LOGIN_RATE': config.getfloat(section, 'LOGIN_RATE') if config.has_option(section, 'LOGIN_RATE') else const.LOGIN_RATE,
+                        'LOGIN_IP_RATE': config.getfloat(section, 'LOGIN_IP_RATE') if config.has_option(section, 'LOGIN_IP_RATE') else const.LOGIN_IP_RATE
                     }})
                     CONFIG['SYSTEMS'][section].update({'PEERS': {}})
                     
@@ -275,7 +293,14 @@ def build_config(_config_file):
                         'USE_ACL': config.getboolean(section, 'USE_ACL'),
                         'SUB_ACL': config.get(section, 'SUB_ACL'),
                         'TG1_ACL': config.get(section, 'TGID_ACL'),
-                        'TG2_ACL': 'PERMIT:ALL'
+                        'TG2_ACL': 'PERMIT:ALL',
+                        'DROP_LOG_SIZE': config.getint(section, 'DROP_LOG_SIZE') if config.has_option(section, 'DROP_LOG_SIZE') else const.ACL_DROP_LOG_SIZE
+                    }})
+                    CONFIG['SYSTEMS'][section].update({'ACL_DROPS': {
+                        'GLOBAL_SUB': 0,                # Frames dropped by each ACL
+                        'GLOBAL_TG1': 0,
+                        'SYSTEM_SUB': 0,
+                        'SYSTEM_TG1': 0,
                     }})
                     
     
@@ -293,7 +318,7 @@ if __name__ == '__main__':
     import os
     import argparse
     from pprint import pprint
-    from dmr_utils.utils import int_id
+    from hb_acl import acl_check
     
     # Change the current directory to the location of the application
     os.chdir(os.path.dirname(os.path.realpath(sys.argv[0])))
@@ -310,12 +335,5 @@ if __name__ == '__main__':
     
     CONFIG = build_config(cli_args.CONFIG_FILE)
     pprint(CONFIG)
-    
-    def acl_check(_id, _acl):
-        id = int_id(_id)
-        for entry in _acl[1]:
-            if entry[0] <= id <= entry[1]:
-                return _acl[0]
-        return not _acl[0]
         
     print acl_check('\x00\x01\x37', CONFIG['GLOBAL']['TG1_ACL'])
@@ -41,6 +41,74 @@ ID_MAX = 16776415
 # Timers
 STREAM_TO = .360
 
+# Most call streams per system to remember an ACL verdict for
+ACL_CACHE_SIZE = 1024
+
+# Most link controls to keep the encodings of (see hb_lc)
+LC_CACHE_SIZE = 4096
+
+# Most peers a worker puts in one message when it passes a MASTER's peer table
+# to worker 0 (see hb_shard), and the largest message the workers read (with
+# every RPTC field filled, 100 peers come to under 48K)
+SHARD_PEERS_PER_MESSAGE = 100
+SHARD_MAX_MESSAGE = 65536
+
+# Default number of ACL dropped streams an OpenBridge remembers, so each is only logged once
+ACL_DROP_LOG_SIZE = 1024
+
+# Login admission for MASTER systems (see hb_login): login packets let through
+# per second (and at once) for the whole system and for one IP address, the most
+# waiting in the queue and the most handled in one go before voice gets a turn
+LOGIN_RATE = 500
+LOGIN_BURST = 100
+LOGIN_IP_RATE = 1
+LOGIN_IP_BURST = 5
+LOGIN_QUEUE_SIZE = 10000
+LOGIN_BATCH = 20
+
+# Datagrams read per recvmmsg() call by the system listeners, 0 (or 1) for one at a time
+RECV_BATCH = 0
+
+# Peer snapshots for a warm restart (see hb_snapshot): off unless a directory is
+# given, and peers not heard from for longer than this many seconds aren't restored
+PEER_SNAPSHOT_DIR = ''
+PEER_SNAPSHOT_TTL = 60
+
+# Whether reporting clients are sent only what changed at each REPORT_INTERVAL
+# (CONFIG_UPD, BRIDGE_UPD) rather than everything; off for the clients that
+# don't know those yet
+REPORT_DELTAS = False
+
+# For a reporting client that isn't reading fast enough: the most events held for
+# it (older ones are dropped), and how many dropped before it is disconnected
+REPORT_QUEUE_SIZE = 1000
+REPORT_DROP_LIMIT = 10000
+
+# Bridge events are sent to reporting clients in batches: after this many seconds,
+# or sooner once there are this many of them
+REPORT_EVENT_DELAY = 0.01
+REPORT_EVENT_BATCH = 100
+
+# How reports are encoded: pickle, or wire for the compact format in hb_wire
+REPORT_FORMAT = 'pickle'
+
+# Prometheus metrics (see hb_metrics): the HTTP port they are served on, 0 for
+# none, and the address it listens on. Frames are counted per talkgroup for this
+# many talkgroups in each system, any others are counted together.
+METRICS_PORT = 0
+METRICS_IP = '127.0.0.1'
+METRICS_MAX_TALKGROUPS = 1000
+
+# Whether DMRD frame latency is measured and sent to reporting clients (see hb_latency)
+REPORT_LATENCY = False
+
+# Call detail records (see hb_cdr): the file, '' for none, the size and age (in
+# seconds) at which it is rotated, and how often records are written to it
+CDR_FILE = ''
+CDR_MAX_BYTES = 100 * 1024 * 1024
+CDR_ROTATE = 24 * 60 * 60
+CDR_FLUSH = 1.0
+
 # HomeBrew Protocol Frame Types
 HBPF_VOICE      = 0x0
 HBPF_VOICE_SYNC = 0x1
@@ -48,6 +116,20 @@ HBPF_DATA_SYNC  = 0x2
 HBPF_SLT_VHEAD  = 0x1
 HBPF_SLT_VTERM  = 0x2
 
+# Peer connection states, as seen by a MASTER
+PEER_RPTL_RECEIVED  = 1
+PEER_CHALLENGE_SENT = 2
+PEER_WAITING_CONFIG = 3
+PEER_CONNECTED      = 4
+
+# ...and the names reporting clients know them by
+PEER_STATES = {
+    PEER_RPTL_RECEIVED:  'RPTL-RECEIVED',
+    PEER_CHALLENGE_SENT: 'CHALLENGE_SENT',
+    PEER_WAITING_CONFIG: 'WAITING_CONFIG',
+    PEER_CONNECTED:      'YES',
+}
+
 # Higheset peer ID permitted by HBP
 PEER_MAX = 4294967295
 
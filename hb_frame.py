@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Decoder for the 20 byte header of a DMRD (DMR data) frame. This is shared by the
+HBP (master and peer) and OpenBridge receive paths, and is the first thing every
+voice and data frame goes through, so it is kept as cheap as possible: one
+struct call for the header and one table lookup for the flags byte.
+
+DMRD header layout (all IDs big-endian):
+     0 -  3  'DMRD'
+     4       sequence number
+     5 -  7  RF source (subscriber) ID
+     8 - 10  destination ID (TGID or subscriber)
+    11 - 14  peer ID (network ID for OpenBridge)
+    15       flags: slot, call type, frame type and dtype/vseq
+    16 - 19  stream ID
+    20 - 52  DMR payload (33 bytes)
+    53 - 54  BER and RSSI (HBP only)
+'''
+
+from __future__ import print_function
+
+from struct import Struct
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# The 'DMRD' tag itself is skipped, the caller has already looked at it
+DMRD_HEADER = Struct('>4xc3s3s4sB4s')
+_unpack_header = DMRD_HEADER.unpack_from
+
+# Decode the flags byte:
+#   0x80     slot: 0 = TS1, 1 = TS2
+#   0x40     call type: 0 = group, 1 = unit
+#   0x30     frame type: 0 = voice, 1 = voice sync, 2 = data sync
+#   0x0F     data type (data sync frames): 1 = voice header, 2 = voice terminator
+#            voice sequence (voice frames): 0 = burst A ... 5 = burst F
+# There are only 256 possible values, so they are decoded once, here, rather than
+# for every frame. Each entry is (slot, call_type, frame_type, dtype_vseq)
+def _decode_bits(_bits):
+    if _bits & 0x40:
+        call_type = 'unit'
+    elif (_bits & 0x23) == 0x23:
+        call_type = 'vcsbk'
+    else:
+        call_type = 'group'
+    return (2 if (_bits & 0x80) else 1, call_type, (_bits & 0x30) >> 4, _bits & 0xF)
+
+BITS = tuple(_decode_bits(_bits) for _bits in range(256))
+
+
+# A decoded DMRD frame. IDs are left as they are in the packet (strings), that's
+# how the rest of HBlink keys and compares them. The untouched packet is kept in
+# data for anything that needs to forward or re-write it.
+class DMRD(object):
+    __slots__ = ('peer_id', 'seq', 'rf_src', 'dst_id', 'bits', 'slot', 'call_type', 'frame_type', 'dtype_vseq', 'stream_id', 'data')
+
+    def __init__(self, _data):
+        self.seq, self.rf_src, self.dst_id, self.peer_id, _bits, self.stream_id = _unpack_header(_data)
+        self.bits = _bits
+        self.slot, self.call_type, self.frame_type, self.dtype_vseq = BITS[_bits]
+        self.data = _data
+
+    def __repr__(self):
+        return '<DMRD peer: {} sub: {} dst: {} slot: {} {} type: {} dtype/vseq: {} stream: {}>'.format(
+            self.peer_id.encode('hex'), self.rf_src.encode('hex'), self.dst_id.encode('hex'), self.slot,
+            self.call_type, self.frame_type, self.dtype_vseq, self.stream_id.encode('hex'))
+
+
+# A MASTER sends each DMRD frame to its peers with each peer's own ID at 11 - 14.
+# Slicing the frame and joining the pieces back together for every peer makes
+# four new objects per frame per peer. A txBuffer is a system's bytearray that the
+# frame is copied into once; each peer's ID is then written over it in place,
+# through view (a memoryview), before it is sent to that peer. A send has
+# finished with the datagram by the time write() returns, so one buffer per
+# system is enough.
+class txBuffer(object):
+    __slots__ = ('buf', 'view')
+
+    def __init__(self):
+        self._resize(0)
+
+    def _resize(self, _size):
+        self.buf = bytearray(_size)
+        self.view = memoryview(self.buf)
+
+    # Copy _packet into the buffer, and return the buffer. It's re-used by the next
+    # call, so it has to have been sent (or copied) by then.
+    def load(self, _packet):
+        try:
+            self.view[:] = _packet
+        except ValueError:
+            # Not the length of the last one
+            self._resize(len(_packet))
+            self.view[:] = _packet
+        return self.buf
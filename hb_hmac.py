@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+HMAC-SHA1 for OpenBridge, with the key worked in only once. hmac.new() pads and
+hashes the key into fresh inner and outer SHA1 states every time it is called;
+here both states are built when the system starts (RFC 2104) and each packet
+starts from a copy of them. The digests are identical to hmac.new(key, data,
+sha1).digest().
+'''
+
+from __future__ import print_function
+
+from hashlib import sha1
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+_BLOCK_SIZE = sha1().block_size
+_TRANS_IPAD = ''.join(chr(x ^ 0x36) for x in range(256))
+_TRANS_OPAD = ''.join(chr(x ^ 0x5C) for x in range(256))
+
+
+class hmacSHA1(object):
+    def __init__(self, _key):
+        if len(_key) > _BLOCK_SIZE:
+            _key = sha1(_key).digest()
+        _key = _key.ljust(_BLOCK_SIZE, '\x00')
+        self._inner = sha1(_key.translate(_TRANS_IPAD))
+        self._outer = sha1(_key.translate(_TRANS_OPAD))
+
+    def digest(self, _data):
+        _inner = self._inner.copy()
+        _inner.update(_data)
+        _outer = self._outer.copy()
+        _outer.update(_inner.digest())
+        return _outer.digest()
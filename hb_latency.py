@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Latency histograms for DMRD frames (REPORT_LATENCY in [REPORTS]): for each
+system and frame type (voice, voice sync, data sync), how long frames took from
+ingress until the system had finished with them -- repeated to the peers,
+routed over the bridges and sent to every target.
+
+"Ingress" is the start of the reactor's pass over the sockets that brought the
+frame in (the hb_clock time, which is read once per pass), so the time a frame
+spends waiting behind the others that came in on the same pass is counted too.
+That is where reactor lag shows up first.
+
+The buckets are powers of two: bucket 0 is under a microsecond, bucket n is
+from 2**(n-1) up to 2**n microseconds. Each system has one list of counts
+(frame type * BUCKETS + bucket), made when the system is, so recording a frame
+is one increment of a list that is already there. Counts only ever go up; a
+client wanting the latency over an interval takes the difference between two
+reports.
+
+Systems only have the histograms when REPORT_LATENCY is set; otherwise their
+datagramReceived is left as it is and they cost nothing.
+'''
+
+from __future__ import print_function
+
+from time import time
+
+from hb_clock import now
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# Enough for any microsecond count bit_length() can give, so there is nothing to clamp
+BUCKETS = 64
+
+# The frame types (bits 4 and 5 of byte 15 of a DMRD packet), by their value
+FRAME_TYPES = ('VOICE', 'VOICE_SYNC', 'DATA_SYNC', 'UNUSED')
+
+# Where each frame type's counts start, for every value of the byte it's in
+_TYPE_AT = dict((chr(i), ((i >> 4) & 0x3) * BUCKETS) for i in range(256))
+
+# The counts of the systems in this process, and the latest from other workers
+_systems = {}
+_remote = {}
+
+# Record the latency of every DMRD frame _received (a system's datagramReceived)
+# handles, as the histograms of system _name. Returns the datagramReceived to use.
+# (Should the wall clock be set back in between, the time is counted as if it
+# were forward: bit_length() ignores the sign.)
+def instrument(_name, _received):
+    _counts = _systems.setdefault(_name, [0] * (len(FRAME_TYPES) * BUCKETS))
+    def received(_data, _sockaddr):
+        _start = now()
+        _received(_data, _sockaddr)
+        # (Short ones, dropped by the system, aren't counted)
+        if _data[:4] == 'DMRD' and len(_data) > 15:
+            _counts[_TYPE_AT[_data[15]] + int((time() - _start) * 1000000).bit_length()] += 1
+    return received
+
+# A system this process doesn't run after all (a stand-in for one on another
+# worker, see hb_shard), whose histograms come from that worker
+def forget(_name):
+    _systems.pop(_name, None)
+
+# The histograms of the systems in this process: {system: {frame type: counts}},
+# the counts up to the last bucket used, for the frame types seen, and the
+# systems that have seen any
+def histograms():
+    _report = {}
+    for _name, _counts in _systems.iteritems():
+        _types = {}
+        for i, _type in enumerate(FRAME_TYPES):
+            _hist = _counts[i * BUCKETS:(i + 1) * BUCKETS]
+            while _hist and not _hist[-1]:
+                _hist.pop()
+            if _hist:
+                _types[_type] = _hist
+        if _types:
+            _report[_name] = _types
+    return _report
+
+# Histograms sent by another worker (which owns the systems in them)
+def merge(_histograms):
+    _remote.update((_name, _types) for _name, _types in _histograms.iteritems() if _types)
+
+# Ours and the other workers', as sent to reporting clients
+def report():
+    _report = dict(_remote)
+    _report.update(histograms())
+    return _report
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Encoded link control for the streams a call is bridged to. Each target of a
+call needs the full (voice header and terminator) and embedded BPTC encodings
+of the 9 byte LC it is sent with -- options, destination and source -- and
+dmr_utils works those out bit by bit in Python. The LC only changes with the
+talkgroup and the subscriber, so the same encodings are wanted for every
+target on the same talkgroup, and again each time the subscriber keys up.
+
+lcCache keeps the encodings of the most recently used LCs, for all the routers
+to share. They are bitarrays the routers only ever slice, never change.
+'''
+
+from __future__ import print_function
+
+from collections import OrderedDict
+
+from dmr_utils import bptc
+
+import hb_const as const
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# The (header, terminator, embedded) encodings of the last _size LCs used. When
+# full, the least recently used is forgotten -- worst case it is encoded again.
+class lcCache(object):
+    def __init__(self, _size=const.LC_CACHE_SIZE):
+        self._size = _size
+        self._lcs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._lcs)
+
+    def encode(self, _lc):
+        try:
+            _encoded = self._lcs.pop(_lc)
+            self.hits += 1
+        except KeyError:
+            _encoded = (bptc.encode_header_lc(_lc), bptc.encode_terminator_lc(_lc), bptc.encode_emblc(_lc))
+            self.misses += 1
+            if len(self._lcs) >= self._size:
+                self._lcs.popitem(last=False)
+        self._lcs[_lc] = _encoded
+        return _encoded
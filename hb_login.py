@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Admission control for logins to a MASTER. When a master restarts, every peer it
+had tries to log in again within a few seconds, and each login (RPTL) and
+challenge answer (RPTK) is work done on the same reactor as the voice traffic.
+
+Logins go into a queue and are let out at a bounded rate by a token bucket for
+the whole system. A second, smaller bucket per source IP stops any one address
+from filling the queue. Anything a bucket or the queue has no room for is
+dropped: peers re-send their login every few seconds until they get an answer,
+so a dropped login just waits for its next try.
+'''
+
+from __future__ import print_function
+
+from collections import OrderedDict
+
+import hb_const as const
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# _rate tokens a second, holding at most _burst of them; starts full
+class tokenBucket(object):
+    __slots__ = ('rate', 'burst', 'tokens', 'stamp')
+
+    def __init__(self, _rate, _burst, _now):
+        self.rate = float(_rate)
+        self.burst = float(_burst)
+        self.tokens = self.burst
+        self.stamp = _now
+
+    def _refill(self, _now):
+        if _now > self.stamp:
+            self.tokens = min(self.burst, self.tokens + (_now - self.stamp) * self.rate)
+            self.stamp = _now
+
+    def take(self, _now):
+        self._refill(_now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    # Seconds until there's a token to take
+    def wait(self, _now):
+        self._refill(_now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    # Refilled completely, i.e. no different to a new bucket
+    def full(self, _now):
+        self._refill(_now)
+        return self.tokens >= self.burst
+
+
+# The queue of logins waiting for the system's bucket. Each entry is keyed so
+# that a peer re-sending the same login while it waits replaces its place in the
+# queue instead of taking another. Entries offered with _first (the answers to
+# login challenges, which finish a login that has already started) are let out
+# before the rest.
+class loginQueue(object):
+    def __init__(self, _rate=const.LOGIN_RATE, _burst=const.LOGIN_BURST, _ip_rate=const.LOGIN_IP_RATE,
+                 _ip_burst=const.LOGIN_IP_BURST, _size=const.LOGIN_QUEUE_SIZE, _now=0):
+        self._bucket = tokenBucket(_rate, _burst, _now)
+        self._ip_rate = _ip_rate
+        self._ip_burst = _ip_burst
+        self._ips = {}
+        self._size = _size
+        self._first = OrderedDict()
+        self._queue = OrderedDict()
+
+        # Counters: logins that went into the queue, came out of it and were
+        # turned away (bucket for their address empty, or the queue full)
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._first) + len(self._queue)
+
+    # Offer a login from _ip. Returns True if it was queued (or replaced one
+    # already queued under _key), False if it was rejected.
+    def offer(self, _key, _ip, _item, _now, _first=False):
+        _queue = self._first if _first else self._queue
+        if _key in _queue:
+            _queue[_key] = _item
+            return True
+        _bucket = self._ips.get(_ip)
+        if _bucket is None:
+            _bucket = self._ips[_ip] = tokenBucket(self._ip_rate, self._ip_burst, _now)
+        if len(self) >= self._size or not _bucket.take(_now):
+            self.rejected += 1
+            return False
+        _queue[_key] = _item
+        self.queued += 1
+        return True
+
+    # Let out, oldest first, as many queued logins as the system's bucket allows,
+    # but no more than _most at a time
+    def admit(self, _now, _most=const.LOGIN_BATCH):
+        _admitted = []
+        while (self._first or self._queue) and len(_admitted) < _most and self._bucket.take(_now):
+            _admitted.append((self._first or self._queue).popitem(last=False)[1])
+        self.admitted += len(_admitted)
+        return _admitted
+
+    # Seconds until admit() can let another login out
+    def wait(self, _now):
+        return self._bucket.wait(_now)
+
+    # Forget the per-address buckets that have refilled; they're no different
+    # to the new one an address would get
+    def prune(self, _now):
+        for _ip in [_ip for _ip, _bucket in self._ips.iteritems() if _bucket.full(_now)]:
+            del self._ips[_ip]
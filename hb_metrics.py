@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Counters for each system -- frames and bytes received and sent, frames dropped
+by the ACLs, by contention on a bridge target and for a bad HMAC, and frames
+received per slot and talkgroup -- served as text, in the Prometheus format,
+on a local HTTP port (METRICS_PORT in [REPORTS]).
+
+The systems add to their counters directly (systemMetrics has a slot for each),
+so counting costs an attribute increment, and a dictionary one for each frame
+received (see systemMetrics.received()). Anything else
+worth watching, like the number of peers, is read when the page is asked for
+(see gauge()).
+'''
+
+from __future__ import print_function
+
+from twisted.internet import reactor
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+
+import hb_const as const
+
+# The module needs logging, but handlers, etc. are controlled by the parent
+import logging
+logger = logging.getLogger(__name__)
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+# The counters, their help text, and the slot each is kept in
+COUNTERS = (
+    ('hblink_rx_frames_total',           'DMRD frames received',                                                'rx_frames'),
+    ('hblink_rx_bytes_total',            'Bytes of DMRD frames received',                                       'rx_bytes'),
+    ('hblink_tx_frames_total',           'DMRD frames sent',                                                    'tx_frames'),
+    ('hblink_tx_bytes_total',            'Bytes of DMRD frames sent',                                           'tx_bytes'),
+    ('hblink_acl_drops_total',           'DMRD frames dropped by an ACL',                                       'acl_drops'),
+    ('hblink_contention_drops_total',    'DMRD frames received that were not routed to a busy bridge target',   'contention_drops'),
+    ('hblink_hmac_failures_total',       'OpenBridge packets dropped for a bad HMAC',                           'hmac_failures'),
+)
+
+class systemMetrics(object):
+    __slots__ = ('rx_bytes', 'tx_frames', 'tx_bytes', 'acl_drops', 'contention_drops', 'hmac_failures', 'talkgroups')
+
+    def __init__(self):
+        self.rx_bytes = 0
+        self.tx_frames = 0
+        self.tx_bytes = 0
+        self.acl_drops = 0
+        self.contention_drops = 0
+        self.hmac_failures = 0
+        # (slot, talkgroup ID as in the packet) to frames received
+        self.talkgroups = {}
+
+    # A DMRD frame of _length bytes received on _slot for _tgid. The frames are
+    # only counted by talkgroup, rx_frames adds them up.
+    def received(self, _slot, _tgid, _length):
+        self.rx_bytes += _length
+        _key = (_slot, _tgid)
+        try:
+            self.talkgroups[_key] += 1
+        except KeyError:
+            if len(self.talkgroups) >= const.METRICS_MAX_TALKGROUPS:
+                # Any more are counted as talkgroup "other"
+                _key = (_slot, None)
+            self.talkgroups[_key] = self.talkgroups.get(_key, 0) + 1
+
+    @property
+    def rx_frames(self):
+        return sum(self.talkgroups.itervalues())
+
+_systems = {}
+_gauges = []
+
+# The counters for system _name
+def system(_name):
+    if _name not in _systems:
+        _systems[_name] = systemMetrics()
+    return _systems[_name]
+
+# Stop reporting system _name (e.g. one run by another worker)
+def forget(_name):
+    _systems.pop(_name, None)
+
+# A value read when the metrics are asked for: _fn returns a list of (labels,
+# value), labels being a dictionary
+def gauge(_name, _help, _fn, _type='gauge'):
+    _gauges.append((_name, _help, _type, _fn))
+
+def _labels(_labels):
+    return '{' + ','.join('{}="{}"'.format(_key, str(_value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                          for _key, _value in sorted(_labels.items())) + '}'
+
+def _tgid(_tgid):
+    return 'other' if _tgid is None else int(_tgid.encode('hex'), 16)
+
+# All of it, in the Prometheus text format
+def render():
+    _lines = []
+    _names = sorted(_systems)
+    for _name, _help, _slot in COUNTERS:
+        _lines.append('# HELP {} {}'.format(_name, _help))
+        _lines.append('# TYPE {} counter'.format(_name))
+        for _system in _names:
+            _lines.append('{}{} {}'.format(_name, _labels({'system': _system}), getattr(_systems[_system], _slot)))
+
+    _lines.append('# HELP hblink_rx_talkgroup_frames_total DMRD frames received, by slot and talkgroup')
+    _lines.append('# TYPE hblink_rx_talkgroup_frames_total counter')
+    for _system in _names:
+        for (_slot, _tg), _count in sorted(_systems[_system].talkgroups.items()):
+            _lines.append('hblink_rx_talkgroup_frames_total{} {}'.format(_labels({'system': _system, 'slot': _slot, 'talkgroup': _tgid(_tg)}), _count))
+
+    for _name, _help, _type, _fn in _gauges:
+        _lines.append('# HELP {} {}'.format(_name, _help))
+        _lines.append('# TYPE {} {}'.format(_name, _type))
+        for _labels_of, _value in _fn():
+            _lines.append('{}{} {}'.format(_name, _labels(_labels_of) if _labels_of else '', _value))
+    return '\n'.join(_lines) + '\n'
+
+class metricsResource(Resource):
+    isLeaf = True
+
+    def render_GET(self, request):
+        request.setHeader('Content-Type', 'text/plain; version=0.0.4')
+        return render()
+
+# Serve the metrics on _port of _interface, from the reactor
+def listen(_port, _interface):
+    logger.info('Metrics available at http://%s:%s/metrics', _interface, _port)
+    return reactor.listenTCP(_port, Site(metricsResource()), interface=_interface)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Batched transmit of one DMRD frame to every peer of a MASTER, used when REPEAT
+is on. Instead of building a new string and calling sendto() for each peer, the
+frame is copied once into a preallocated buffer and handed to the kernel with a
+single sendmmsg() call. Each peer's message is gathered from three pieces: the
+shared header up to the peer ID, that peer's own 4 byte ID, and the shared rest
+of the frame, so no per-peer copy of the packet is ever made.
+
+Receiving works the other way round: batchPort is a Twisted UDP port that, each
+time the socket is readable, drains up to a batch of datagrams with one
+recvmmsg() call into preallocated buffers, then hands them to the protocol's
+datagramReceived() one after another.
+
+sendmmsg() and recvmmsg() are Linux only (and IPv4 only here). AVAILABLE and
+RECV_AVAILABLE are False anywhere they can't be used, and HBlink keeps sending
+and receiving one packet at a time.
+'''
+
+from __future__ import print_function
+
+import os
+import socket
+from ctypes import CDLL, Structure, POINTER, c_void_p, c_size_t, c_int, c_uint, c_uint16, c_uint32, c_char, \
+                   sizeof, addressof, cast, memmove, string_at, create_string_buffer, get_errno
+from ctypes.util import find_library
+from errno import EINTR, EAGAIN, EWOULDBLOCK, ECONNREFUSED
+from struct import Struct, unpack
+
+from twisted.internet import udp
+from twisted.python import log
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# Largest packet the fan-out buffer holds, anything bigger goes the slow way
+MAX_PACKET = 512
+
+# recvmmsg() flags: don't block, and (in msg_flags) the datagram didn't fit
+MSG_DONTWAIT = 0x40
+MSG_TRUNC = 0x20
+
+# Receive buffer per datagram. Nothing HBlink is sent comes close (the largest,
+# a repeater's RPTC configuration, is 302 bytes); bigger datagrams are dropped
+RECV_SLOT = 1024
+
+# Most sender addresses a batchPort keeps ready-made (host, port) tuples for
+ADDR_CACHE_SIZE = 4096
+
+# Where the peer ID sits in a DMRD frame
+_ID_START = 11
+_ID_END = 15
+
+
+class iovec(Structure):
+    _fields_ = [('iov_base', c_void_p), ('iov_len', c_size_t)]
+
+class msghdr(Structure):
+    _fields_ = [('msg_name', c_void_p), ('msg_namelen', c_uint32),
+                ('msg_iov', POINTER(iovec)), ('msg_iovlen', c_size_t),
+                ('msg_control', c_void_p), ('msg_controllen', c_size_t),
+                ('msg_flags', c_int)]
+
+class mmsghdr(Structure):
+    _fields_ = [('msg_hdr', msghdr), ('msg_len', c_uint)]
+
+class sockaddr_in(Structure):
+    _fields_ = [('sin_family', c_uint16), ('sin_port', c_uint16),
+                ('sin_addr', c_uint32), ('sin_zero', c_char * 8)]
+
+_MMSGHDR_SIZE = sizeof(mmsghdr)
+_SOCKADDR_SIZE = sizeof(sockaddr_in)
+_MSG_FLAGS = mmsghdr.msg_hdr.offset + msghdr.msg_flags.offset
+_MSG_LEN = mmsghdr.msg_len.offset
+
+try:
+    _libc = CDLL(find_library('c'), use_errno=True)
+    _sendmmsg = _libc.sendmmsg
+    _sendmmsg.argtypes = [c_int, c_void_p, c_uint, c_int]
+    _sendmmsg.restype = c_int
+    AVAILABLE = hasattr(socket, 'AF_INET')
+except (OSError, AttributeError, TypeError):
+    AVAILABLE = False
+
+try:
+    _recvmmsg = _libc.recvmmsg
+    _recvmmsg.argtypes = [c_int, c_void_p, c_uint, c_int, c_void_p]
+    _recvmmsg.restype = c_int
+    RECV_AVAILABLE = hasattr(socket, 'AF_INET')
+except (NameError, AttributeError, TypeError):
+    RECV_AVAILABLE = False
+
+
+# Fan-out of frames to the peers of one MASTER system. The message vector (one
+# entry per peer, in a fixed order) is built from the peer table the first time
+# it's needed and kept until invalidate() is called, which the MASTER does any
+# time a peer is added, removed or changes address.
+#
+# _fileno is the (IPv4, UDP) socket to send on and _write is the transport's
+# write(), used for anything the batch can't send.
+class fanOut(object):
+    def __init__(self, _fileno, _write):
+        self._fd = _fileno
+        self._write = _write
+        self._buf = create_string_buffer(MAX_PACKET)
+        self._len = 0
+        self._stale = True
+        self._order = []
+        self._index = {}
+        self._sockaddrs = []
+
+        # Counters for the maintenance loop: frames sent, messages in them and
+        # the sendmmsg() calls that carried them
+        self.frames = 0
+        self.messages = 0
+        self.calls = 0
+
+    def invalidate(self):
+        self._stale = True
+
+    # Syscalls a sendto() per peer would have taken, minus the ones we made
+    def saved(self):
+        return self.messages - self.calls
+
+    def _build(self, _peers):
+        _order = list(_peers)
+        _count = len(_order)
+        self._msgs = (mmsghdr * _count)()
+        self._iovs = (iovec * (3 * _count))()
+        self._names = (sockaddr_in * _count)()
+        self._ids = create_string_buffer(''.join(_order), 4 * _count)
+        _buf = addressof(self._buf)
+        _ids = addressof(self._ids)
+        self._sockaddrs = []
+        for i, _peer in enumerate(_order):
+            _sockaddr = _peers[_peer].sockaddr
+            self._sockaddrs.append(_sockaddr)
+            _name = self._names[i]
+            _name.sin_family = socket.AF_INET
+            _name.sin_port = socket.htons(_sockaddr[1])
+            _name.sin_addr = unpack('=I', socket.inet_aton(_sockaddr[0]))[0]
+            self._iovs[3*i].iov_base = _buf
+            self._iovs[3*i].iov_len = _ID_START
+            self._iovs[3*i+1].iov_base = _ids + 4*i
+            self._iovs[3*i+1].iov_len = 4
+            self._iovs[3*i+2].iov_base = _buf + _ID_END
+            _hdr = self._msgs[i].msg_hdr
+            _hdr.msg_name = addressof(_name)
+            _hdr.msg_namelen = sizeof(sockaddr_in)
+            _hdr.msg_iov = cast(addressof(self._iovs) + 3*i*sizeof(iovec), POINTER(iovec))
+            _hdr.msg_iovlen = 3
+        self._order = _order
+        self._index = dict((_peer, i) for i, _peer in enumerate(_order))
+        self._len = 0
+        self._stale = False
+
+    # Send frames [_start, _end) of the vector, anything the kernel didn't take is
+    # sent with the transport instead
+    def _flush(self, _data, _start, _end):
+        _msgs = addressof(self._msgs)
+        while _start < _end:
+            _sent = _sendmmsg(self._fd, _msgs + _start * sizeof(mmsghdr), _end - _start, 0)
+            self.calls += 1
+            if _sent <= 0:
+                if _sent < 0 and get_errno() == EINTR:
+                    continue
+                break
+            self.messages += _sent
+            _start += _sent
+        for i in range(_start, _end):
+            self._write(''.join([_data[:_ID_START], self._order[i], _data[_ID_END:]]), self._sockaddrs[i])
+
+    # Send _data to every peer in _peers except _source, re-writing the peer ID
+    # for each one. Returns False if the frame couldn't be batched, in which case
+    # nothing has been sent.
+    def send(self, _peers, _data, _source):
+        _len = len(_data)
+        if _len < _ID_END or _len > MAX_PACKET:
+            return False
+        if self._stale:
+            self._build(_peers)
+        memmove(self._buf, _data, _len)
+        if _len != self._len:
+            for i in range(len(self._order)):
+                self._iovs[3*i+2].iov_len = _len - _ID_END
+            self._len = _len
+        _skip = self._index.get(_source, len(self._order))
+        self._flush(_data, 0, _skip)
+        self._flush(_data, _skip + 1, len(self._order))
+        self.frames += 1
+        return True
+
+
+# A UDP port (IPv4) that reads datagrams in batches of up to _batch with
+# recvmmsg(). Each datagram is still passed to the protocol on its own, with a
+# (host, port) address just like Twisted's own port gives, so the protocol can't
+# tell the difference.
+class batchPort(udp.Port):
+    def __init__(self, _port, _protocol, _interface='', _batch=32, _reactor=None):
+        udp.Port.__init__(self, _port, _protocol, _interface, reactor=_reactor)
+        self._batch = _batch
+        self._bufs = create_string_buffer(_batch * RECV_SLOT)
+        self._msgs = (mmsghdr * _batch)()
+        self._iovs = (iovec * _batch)()
+        self._names = (sockaddr_in * _batch)()
+        _bufs = addressof(self._bufs)
+        for i in range(_batch):
+            self._iovs[i].iov_base = _bufs + i * RECV_SLOT
+            self._iovs[i].iov_len = RECV_SLOT
+            _hdr = self._msgs[i].msg_hdr
+            _hdr.msg_name = addressof(self._names[i])
+            _hdr.msg_namelen = sizeof(sockaddr_in)
+            _hdr.msg_iov = cast(addressof(self._iovs) + i*sizeof(iovec), POINTER(iovec))
+            _hdr.msg_iovlen = 1
+        self._addrs = {}
+        # Unpackers for the msg_flags and msg_len of, and the sockaddr keys of,
+        # a batch of each possible size
+        _hdr = '{}xi{}xI{}x'.format(_MSG_FLAGS, _MSG_LEN - _MSG_FLAGS - sizeof(c_int), _MMSGHDR_SIZE - _MSG_LEN - sizeof(c_uint))
+        _key = '2x6s{}x'.format(_SOCKADDR_SIZE - 8)
+        self._unpack = [None] + [(Struct('=' + _hdr * i).unpack, Struct('=' + _key * i).unpack) for i in range(1, _batch + 1)]
+
+        # Counters: datagrams received, the recvmmsg() calls they took and the
+        # ones too big for a slot, which are dropped
+        self.datagrams = 0
+        self.calls = 0
+        self.truncated = 0
+
+    def doRead(self):
+        _fd = self.socket.fileno()
+        _msgs = addressof(self._msgs)
+        _names = addressof(self._names)
+        _bufs = addressof(self._bufs)
+        _addrs = self._addrs
+        _received = self.protocol.datagramReceived
+        read = 0
+        while read < self.maxThroughput:
+            _count = _recvmmsg(_fd, _msgs, self._batch, MSG_DONTWAIT, None)
+            if _count < 0:
+                _errno = get_errno()
+                if _errno == EINTR:
+                    continue
+                if _errno in (EAGAIN, EWOULDBLOCK):
+                    return
+                if _errno == ECONNREFUSED:
+                    if self._connectedAddr:
+                        self.protocol.connectionRefused()
+                    return
+                raise socket.error(_errno, os.strerror(_errno))
+            self.calls += 1
+            self.datagrams += _count
+            # Going through the ctypes structures (or calling into ctypes at all)
+            # per datagram costs more than the syscalls saved, so the headers,
+            # addresses and data are each copied out in one go and picked apart
+            # with one unpack for the whole batch
+            _hdrs, _keys = self._unpack[_count]
+            _info = _hdrs(string_at(_msgs, _count * _MMSGHDR_SIZE))
+            _keys = _keys(string_at(_names, _count * _SOCKADDR_SIZE))
+            _blob = string_at(_bufs, _count * RECV_SLOT)
+            for i in range(_count):
+                _flags = _info[2*i]
+                _len = _info[2*i+1]
+                read += _len
+                if _flags & MSG_TRUNC:
+                    self.truncated += 1
+                    continue
+                # _key is sin_port and sin_addr, as they came in the packet
+                _key = _keys[i]
+                _addr = _addrs.get(_key)
+                if _addr is None:
+                    if len(_addrs) >= ADDR_CACHE_SIZE:
+                        _addrs.clear()
+                    _addr = _addrs[_key] = (socket.inet_ntoa(_key[2:]), unpack('>H', _key[:2])[0])
+                try:
+                    _received(_blob[i * RECV_SLOT:i * RECV_SLOT + _len], _addr)
+                except:
+                    log.err()
+            # A short batch means the socket has been drained
+            if _count < self._batch:
+                return
+
+
+# Listen on a UDP port, batched if _batch is more than 1 and it can be, the same
+# way reactor.listenUDP() would otherwise
+def listen_udp(_reactor, _port, _protocol, _interface='', _batch=0):
+    if _batch > 1 and RECV_AVAILABLE and ':' not in _interface:
+        _listener = batchPort(_port, _protocol, _interface, _batch, _reactor)
+        _listener.startListening()
+        return _listener
+    return _reactor.listenUDP(_port, _protocol, interface=_interface)
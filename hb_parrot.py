@@ -26,7 +26,9 @@ from __future__ import print_function
 # Python modules we need
 import sys
 from bitarray import bitarray
-from time import time, sleep
+from time import sleep
+from hb_clock import now
+import hb_clock
 from importlib import import_module
 
 # Twisted is pretty important, so I keep it separate
@@ -35,7 +37,7 @@ from twisted.protocols.basic import NetstringReceiver
 from twisted.internet import reactor, task
 
 # Things we import from the main hblink module
-from hblink import HBSYSTEM, systems, hblink_handler, reportFactory, REPORT_OPCODES, config_reports, mk_aliases
+from hblink import HBSYSTEM, systems, hblink_handler, reportFactory, REPORT_OPCODES, config_reports, config_metrics, mk_aliases_later
 from dmr_utils.utils import hex_str_3, int_id, get_alias
 from dmr_utils import decode, bptc, const
 import hb_config
@@ -68,7 +70,7 @@ class parrot(HBSYSTEM):
         # In TX_EMB_LC, 2-5 are burst B-E
         self.STATUS = {
             1: {
-                'RX_START':     time(),
+                'RX_START':     now(),
                 'RX_SEQ':       '\x00',
                 'RX_RFS':       '\x00',
                 'TX_RFS':       '\x00',
@@ -76,8 +78,8 @@ class parrot(HBSYSTEM):
                 'TX_STREAM_ID': '\x00',
                 'RX_TGID':      '\x00\x00\x00',
                 'TX_TGID':      '\x00\x00\x00',
-                'RX_TIME':      time(),
-                'TX_TIME':      time(),
+                'RX_TIME':      now(),
+                'TX_TIME':      now(),
                 'RX_TYPE':      hb_const.HBPF_SLT_VTERM,
                 'RX_LC':        '\x00',
                 'TX_H_LC':      '\x00',
@@ -90,7 +92,7 @@ class parrot(HBSYSTEM):
                 }
                 },
             2: {
-                'RX_START':     time(),
+                'RX_START':     now(),
                 'RX_SEQ':       '\x00',
                 'RX_RFS':       '\x00',
                 'TX_RFS':       '\x00',
@@ -98,8 +100,8 @@ class parrot(HBSYSTEM):
                 'TX_STREAM_ID': '\x00',
                 'RX_TGID':      '\x00\x00\x00',
                 'TX_TGID':      '\x00\x00\x00',
-                'RX_TIME':      time(),
-                'TX_TIME':      time(),
+                'RX_TIME':      now(),
+                'TX_TIME':      now(),
                 'RX_TYPE':      hb_const.HBPF_SLT_VTERM,
                 'RX_LC':        '\x00',
                 'TX_H_LC':      '\x00',
@@ -114,10 +116,20 @@ class parrot(HBSYSTEM):
         }
         self.CALL_DATA = []
 
-    def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data):
-        pkt_time = time()
+    def dmrd_received(self, _frame):
+        _peer_id    = _frame.peer_id
+        _rf_src     = _frame.rf_src
+        _dst_id     = _frame.dst_id
+        _seq        = _frame.seq
+        _slot       = _frame.slot
+        _call_type  = _frame.call_type
+        _frame_type = _frame.frame_type
+        _dtype_vseq = _frame.dtype_vseq
+        _stream_id  = _frame.stream_id
+        _data       = _frame.data
+        _bits       = _frame.bits
+        pkt_time = now()
         dmrpkt = _data[20:53]
-        _bits = int_id(_data[15])
         if _call_type == 'group':
 
             # Is this is a new call stream?
@@ -164,7 +176,6 @@ if __name__ == '__main__':
     import sys
     import os
     import signal
-    from dmr_utils.utils import try_download, mk_id_dict
     
     # Change the current directory to the location of the application
     os.chdir(os.path.dirname(os.path.realpath(sys.argv[0])))
@@ -200,19 +211,6 @@ if __name__ == '__main__':
     for sig in [signal.SIGTERM, signal.SIGINT]:
         signal.signal(sig, sig_handler)
     
-    # ID ALIAS CREATION
-    # Download
-    if CONFIG['ALIASES']['TRY_DOWNLOAD'] == True:
-        # Try updating peer aliases file
-        result = try_download(CONFIG['ALIASES']['PATH'], CONFIG['ALIASES']['PEER_FILE'], CONFIG['ALIASES']['PEER_URL'], CONFIG['ALIASES']['STALE_TIME'])
-        logger.info(result)
-        # Try updating subscriber aliases file
-        result = try_download(CONFIG['ALIASES']['PATH'], CONFIG['ALIASES']['SUBSCRIBER_FILE'], CONFIG['ALIASES']['SUBSCRIBER_URL'], CONFIG['ALIASES']['STALE_TIME'])
-        logger.info(result)
-        
-    # Create the name-number mapping dictionaries
-    peer_ids, subscriber_ids, talkgroup_ids = mk_aliases(CONFIG)
-        
     # INITIALIZE THE REPORTING LOOP
     report_server = config_reports(CONFIG, reportFactory)    
     
@@ -227,5 +225,11 @@ if __name__ == '__main__':
                 systems[system] = parrot(system, CONFIG, report_server)
             reactor.listenUDP(CONFIG['SYSTEMS'][system]['PORT'], systems[system], interface=CONFIG['SYSTEMS'][system]['IP'])
             logger.debug('%s instance created: %s, %s', CONFIG['SYSTEMS'][system]['MODE'], system, systems[system])
+    config_metrics(CONFIG, systems, report_server, None)
+
+    # ID ALIAS CREATION (hb_aliases downloads the files if TRY_DOWNLOAD is set),
+    # now that the systems are listening
+    peer_ids, subscriber_ids, talkgroup_ids = mk_aliases_later(CONFIG)
 
+    hb_clock.install(reactor)
     reactor.run()
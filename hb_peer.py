@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+The record a MASTER keeps for each peer (repeater or hotspot) logged into it.
+These used to be dictionaries, but there can be thousands of them and they are
+looked at for every packet a peer sends, so they are small fixed-slot objects
+now. Reporting clients still get the dictionaries they always have, built by
+export() when the configuration is sent to them, and only what has changed
+since it was last sent when they take updates (see exportTracker).
+'''
+
+from __future__ import print_function
+
+import cPickle as pickle
+from binascii import b2a_hex as ahex
+from operator import attrgetter
+from random import randint
+
+import hb_const as const
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# Attribute name to the key it has always had in the reporting dictionary
+EXPORT = (
+    ('CONNECTED',       'connected'),
+    ('PINGS_RECEIVED',  'pings_received'),
+    ('LAST_PING',       'last_ping'),
+    ('SOCKADDR',        'sockaddr'),
+    ('IP',              'ip'),
+    ('PORT',            'port'),
+    ('SALT',            'salt'),
+    ('RADIO_ID',        'radio_id'),
+    ('CALLSIGN',        'callsign'),
+    ('RX_FREQ',         'rx_freq'),
+    ('TX_FREQ',         'tx_freq'),
+    ('TX_POWER',        'tx_power'),
+    ('COLORCODE',       'colorcode'),
+    ('LATITUDE',        'latitude'),
+    ('LONGITUDE',       'longitude'),
+    ('HEIGHT',          'height'),
+    ('LOCATION',        'location'),
+    ('DESCRIPTION',     'description'),
+    ('SLOTS',           'slots'),
+    ('URL',             'url'),
+    ('SOFTWARE_ID',     'software_id'),
+    ('PACKAGE_ID',      'package_id'),
+)
+
+
+# Everything about a peer, in the order state() and from_state() use
+STATE = ('peer_id', 'connection') + tuple(_attr for _key, _attr in EXPORT)
+_get_state = attrgetter(*STATE)
+
+# The reporting key for each item of a peer's state (the peer ID, being the key
+# of the peer itself, hasn't one)
+_STATE_KEYS = (None, 'CONNECTION') + tuple(_key for _key, _attr in EXPORT)
+
+
+class Peer(object):
+    __slots__ = STATE
+
+    # A new peer, as created when it sends RPTL
+    def __init__(self, _peer_id, _sockaddr, _now):
+        self.peer_id = _peer_id
+        self.connection = const.PEER_RPTL_RECEIVED
+        self.connected = _now
+        self.pings_received = 0
+        self.last_ping = _now
+        self.sockaddr = _sockaddr
+        self.ip = _sockaddr[0]
+        self.port = _sockaddr[1]
+        self.salt = randint(0,0xFFFFFFFF)
+        self.radio_id = str(int(ahex(_peer_id), 16))
+        self.callsign = ''
+        self.rx_freq = ''
+        self.tx_freq = ''
+        self.tx_power = ''
+        self.colorcode = ''
+        self.latitude = ''
+        self.longitude = ''
+        self.height = ''
+        self.location = ''
+        self.description = ''
+        self.slots = ''
+        self.url = ''
+        self.software_id = ''
+        self.package_id = ''
+
+    # Take the repeater configuration from an RPTC packet
+    def configure(self, _data):
+        self.callsign = _data[8:16]
+        self.rx_freq = _data[16:25]
+        self.tx_freq =  _data[25:34]
+        self.tx_power = _data[34:36]
+        self.colorcode = _data[36:38]
+        self.latitude = _data[38:46]
+        self.longitude = _data[46:55]
+        self.height = _data[55:58]
+        self.location = _data[58:78]
+        self.description = _data[78:97]
+        self.slots = _data[97:98]
+        self.url = _data[98:222]
+        self.software_id = _data[222:262]
+        self.package_id = _data[262:302]
+
+    def export(self):
+        _export = dict((_key, getattr(self, _attr)) for _key, _attr in EXPORT)
+        _export['CONNECTION'] = const.PEER_STATES[self.connection]
+        return _export
+
+    # The peer as a tuple of plain values (for hb_snapshot), and back
+    def state(self):
+        return _get_state(self)
+
+    @classmethod
+    def from_state(cls, _state):
+        _peer = cls.__new__(cls)
+        # In STATE order
+        (_peer.peer_id, _peer.connection, _peer.connected, _peer.pings_received, _peer.last_ping,
+         _peer.sockaddr, _peer.ip, _peer.port, _peer.salt, _peer.radio_id, _peer.callsign,
+         _peer.rx_freq, _peer.tx_freq, _peer.tx_power, _peer.colorcode, _peer.latitude,
+         _peer.longitude, _peer.height, _peer.location, _peer.description, _peer.slots,
+         _peer.url, _peer.software_id, _peer.package_id) = _state
+        return _peer
+
+    def __repr__(self):
+        return '<Peer {} ({}) {}:{} {}>'.format(self.radio_id, self.callsign, self.ip, self.port, const.PEER_STATES[self.connection])
+
+
+# The SYSTEMS part of the configuration the way reporting clients expect it, with
+# each MASTER's peers exported as dictionaries. Everything else is passed as-is.
+def export_systems(_systems):
+    _export = {}
+    for _name, _system in _systems.items():
+        if 'PEERS' in _system:
+            _system = dict(_system)
+            _system['PEERS'] = dict((_peer_id, _peer.export()) for _peer_id, _peer in _system['PEERS'].items())
+        _export[_name] = _system
+    return _export
+
+# There are only a few systems, and some of what's in them (the STATS of a PEER)
+# changes in place, so they are compared pickled
+def _pickle_system(_system):
+    return pickle.dumps(_system, pickle.HIGHEST_PROTOCOL)
+
+# What changed in a peer between two of its state() tuples, as reporting keys
+# and values; everything when there's no old state
+def peer_changes(_old, _new):
+    _changes = {}
+    for _i in range(1, len(STATE)):
+        if _old is None or _old[_i] != _new[_i]:
+            _changes[_STATE_KEYS[_i]] = _new[_i]
+    if 'CONNECTION' in _changes:
+        _changes['CONNECTION'] = const.PEER_STATES[_changes['CONNECTION']]
+    return _changes
+
+# Remembers what the reporting clients have been told about SYSTEMS, so that each
+# report only carries what changed since the one before: whole systems (without
+# their peers) that are different, and for each MASTER, the fields that changed
+# in each of its peers, all of a new peer, or None for a peer that has gone.
+class exportTracker(object):
+    def __init__(self):
+        self._systems = {}
+        self._peers = {}
+
+    # The changes since the last call, in the form above, or None if there are none
+    def delta(self, _systems):
+        _changed_systems = {}
+        _changed_peers = {}
+        for _name, _system in _systems.items():
+            _peers = _system.get('PEERS')
+            if _peers is not None:
+                _system = dict(_system)
+                del _system['PEERS']
+            _pickled = _pickle_system(_system)
+            if _pickled != self._systems.get(_name):
+                self._systems[_name] = _pickled
+                _changed_systems[_name] = _system
+
+            if _peers is None:
+                continue
+            _last = self._peers.setdefault(_name, {})
+            _changes = {}
+            for _peer_id, _peer in _peers.items():
+                _state = _peer.state()
+                _old = _last.get(_peer_id)
+                if _state != _old:
+                    _last[_peer_id] = _state
+                    _changes[_peer_id] = peer_changes(_old, _state)
+            # Every current peer is in _last by now, so anything more has gone
+            if len(_last) != len(_peers):
+                for _peer_id in [_peer_id for _peer_id in _last if _peer_id not in _peers]:
+                    del _last[_peer_id]
+                    _changes[_peer_id] = None
+            if _changes:
+                _changed_peers[_name] = _changes
+
+        if _changed_systems or _changed_peers:
+            return {'SYSTEMS': _changed_systems, 'PEERS': _changed_peers}
+        return None
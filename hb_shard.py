@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Spreads the systems of an HBlink application over several worker processes, so
+that routing isn't limited to one core. Started with "--workers N", the program
+becomes a supervisor: it starts N copies of itself, one per worker, and waits.
+
+Every worker loads the whole configuration and creates an object for every
+system, but only listens for the systems assigned to it. The others stay as
+local stand-ins whose send_system() passes the packet, over a Unix datagram
+socket, to the worker that owns the system, which sends it on through the
+system's send_from_worker(). That is where hb_confbridge checks it against the
+calls the system is already carrying, so contention is settled by the one
+worker that sees all of them.
+
+Worker 0 keeps the bridge rules. In-band (ON/OFF) signalling seen by the other
+workers is passed to it, it runs the rule timers, and it tells the other
+workers every time a bridge is turned on or off.
+
+Worker 0 also runs the reporting server. The other workers pass it their bridge
+events as they happen and, every REPORT_INTERVAL, the peers of their MASTERs,
+the STATS of their PEERs and (with REPORT_LATENCY) their latency histograms, so
+what reporting clients see of systems on other workers is up to one
+REPORT_INTERVAL old.
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+import signal
+import shutil
+import socket
+import subprocess
+import tempfile
+import marshal
+from errno import EINTR, ECHILD, EMSGSIZE
+
+from twisted.internet.protocol import DatagramProtocol
+from twisted.internet import reactor, task
+
+import hb_wire
+import hb_metrics
+import hb_latency
+import hb_const as const
+from hb_peer import Peer
+
+# The module needs logging, but handlers, etc. are controlled by the parent
+import logging
+logger = logging.getLogger(__name__)
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# Message types between workers, the first byte of every datagram
+IPC_SYSTEM = 'S'    # S, length of system name, system name, packet for its send_system()
+IPC_BRIDGE_EVENT = 'B'  # B, bridge event (an hb_wire event record) for the reporting server on worker 0
+IPC_LATENCY = 'L'   # L, the worker's latency histograms (hb_wire LATENCY_SND payload) for worker 0
+IPC_SIGNAL = 'I'    # I, in-band signalling for worker 0 (marshal'ed system, slot, TGID, time)
+IPC_RULES = 'R'     # R, bridges worker 0 turned on or off (marshal'ed {bridge: [ACTIVE of each entry]})
+IPC_PEERS = 'P'     # P, part of a MASTER's peers for worker 0 (marshal'ed system, round, part, parts, [Peer.state()])
+IPC_STATS = 'T'     # T, a PEER's STATS for worker 0 (marshal'ed system, STATS)
+
+
+# The program the workers are started from. Worked out when the program imports
+# this module, before it changes to its own directory, when a relative path in
+# sys.argv[0] still leads to it.
+PROGRAM = os.path.realpath(sys.argv[0]) if sys.argv and sys.argv[0] else None
+
+# Which worker runs each (enabled) system: round robin, in name order, so every
+# worker works it out the same way from the same configuration
+def assign_workers(_config, _workers):
+    _enabled = sorted(_system for _system in _config['SYSTEMS'] if _config['SYSTEMS'][_system]['ENABLED'])
+    return dict((_system, i % _workers) for i, _system in enumerate(_enabled))
+
+def ipc_path(_ipc_dir, _worker):
+    return os.path.join(_ipc_dir, 'worker-{}.sock'.format(_worker))
+
+
+# Run as the supervisor: start _workers copies of this program (the same command
+# line, plus which worker each one is) and wait for them. SIGINT and SIGTERM are
+# passed on to the workers. If a worker stops on its own, the rest are stopped
+# too so the whole thing can be restarted cleanly. Returns an exit status.
+def supervise(_workers, _argv=None):
+    _argv = [PROGRAM] + sys.argv[1:] if _argv is None else _argv
+    _ipc_dir = tempfile.mkdtemp(prefix='hblink-')
+    _running = {}
+    _stopping = [False]
+
+    def stop_workers(_signal):
+        for _pid in _running:
+            try:
+                os.kill(_pid, _signal)
+            except OSError:
+                pass
+
+    def sig_handler(_signal, _frame):
+        logger.info('SUPERVISOR: passing signal %s on to the workers', _signal)
+        _stopping[0] = True
+        stop_workers(_signal)
+
+    for sig in [signal.SIGTERM, signal.SIGINT]:
+        signal.signal(sig, sig_handler)
+
+    for _worker in range(_workers):
+        _child = subprocess.Popen([sys.executable] + _argv + ['--worker', str(_worker), '--ipc', _ipc_dir])
+        _running[_child.pid] = _worker
+        logger.info('SUPERVISOR: worker %s started, PID %s', _worker, _child.pid)
+
+    _status = 0
+    while _running:
+        try:
+            _pid, _exit = os.wait()
+        except OSError as err:
+            if err.errno == EINTR:
+                continue
+            if err.errno == ECHILD:
+                break
+            raise
+        _worker = _running.pop(_pid, None)
+        if _worker is None:
+            continue
+        if not _stopping[0]:
+            logger.error('SUPERVISOR: worker %s (PID %s) exited with status %s, stopping the other workers', _worker, _pid, _exit)
+            _stopping[0] = True
+            _status = 1
+            stop_workers(signal.SIGTERM)
+        else:
+            logger.info('SUPERVISOR: worker %s (PID %s) has stopped', _worker, _pid)
+
+    shutil.rmtree(_ipc_dir, ignore_errors=True)
+    return _status
+
+
+# The worker's end of the IPC: one Unix datagram socket per worker, named for the
+# worker, that receives everything the other workers send it.
+class shard(DatagramProtocol):
+    def __init__(self, _config, _workers, _worker, _ipc_dir):
+        self.workers = _workers
+        self.worker = _worker
+        self._ipc_dir = _ipc_dir
+        self._owner = assign_workers(_config, _workers)
+        self._systems = {}
+        self._report = None
+        # How often the other workers send worker 0 their latency histograms, if they measure it
+        self._latency_interval = _config['REPORTS']['REPORT_INTERVAL'] if _config['REPORTS']['REPORT_LATENCY'] else None
+        # ...and their peers and STATS
+        self._report_interval = _config['REPORTS']['REPORT_INTERVAL']
+        self._round = 0
+        # Peer tables from the other workers, while their parts come in: [round, next part, peer states]
+        self._tables = {}
+        # Set by the application to be told of in-band signalling (on worker 0)
+        # and of bridge rule changes (on the others)
+        self.signal_received = None
+        self.rules_received = None
+        # Whether worker 0 has any use for bridge events: reporting clients, or call detail records
+        self.bridge_events = bool(_config['REPORTS']['REPORT'] or _config['REPORTS']['CDR_FILE'])
+        # Messages we couldn't hand to another worker (not up yet or gone, its queue full, or too big)
+        self.dropped = 0
+
+    def owns(self, _system):
+        return self._owner.get(_system) == self.worker
+
+    # Start listening for the other workers. _systems is the application's table
+    # of system objects, _report the reporting server (on worker 0)
+    def listen(self, _systems, _report):
+        self._systems = _systems
+        self._report = _report
+        reactor.listenUNIXDatagram(ipc_path(self._ipc_dir, self.worker), self, const.SHARD_MAX_MESSAGE)
+        if self.worker != 0:
+            task.LoopingCall(self.send_systems).start(self._report_interval, now=False)
+            if self._latency_interval:
+                task.LoopingCall(self.send_latency).start(self._latency_interval, now=False)
+        logger.info('(SHARD) Worker %s running systems: %s', self.worker, ', '.join(sorted(_system for _system in self._owner if self.owns(_system))))
+
+    # Straight to the socket: Twisted's write() quietly drops a datagram when the
+    # other worker's queue is full (EAGAIN), and raises for one too big
+    # (EMSGSIZE). Both are counted as dropped here, like a worker that isn't up.
+    def send_worker(self, _worker, _message):
+        while True:
+            try:
+                self.transport.socket.sendto(_message, ipc_path(self._ipc_dir, _worker))
+                return
+            except socket.error as err:
+                if err.errno == EINTR:
+                    continue
+                if err.errno == EMSGSIZE:
+                    logger.error('(SHARD) Message of %s bytes too big to send to worker %s', len(_message), _worker)
+                self.dropped += 1
+                return
+
+    # Make _system (an OPENBRIDGE or HBSYSTEM object for a system this worker does
+    # not own) forward whatever it's asked to send to the worker that owns it. The
+    # owner is the one that de-registers it at shutdown.
+    def remote(self, _system):
+        _worker = self._owner[_system._system]
+        _prefix = IPC_SYSTEM + chr(len(_system._system)) + _system._system
+        def send_system(_packet):
+            self.send_worker(_worker, _prefix + _packet)
+        _system.send_system = send_system
+        _system.dereg = lambda: None
+        hb_metrics.forget(_system._system)
+        hb_latency.forget(_system._system)
+
+    def send_latency(self):
+        self.send_worker(0, IPC_LATENCY + hb_wire.encode_latency(hb_latency.histograms()))
+
+    # Pass worker 0 the peers of each MASTER and the STATS of each PEER this worker
+    # runs, for its reports. Peer tables go in parts, each part numbered, so that
+    # worker 0 only takes a table it got all of.
+    def send_systems(self):
+        self._round += 1
+        for _name, _system in self._systems.items():
+            if not self.owns(_name):
+                continue
+            _mode = _system._config['MODE']
+            if _mode == 'MASTER':
+                _states = [_peer.state() for _peer in _system._peers.itervalues()]
+                _size = const.SHARD_PEERS_PER_MESSAGE
+                _parts = max(1, (len(_states) + _size - 1) // _size)
+                for _part in range(_parts):
+                    self.send_worker(0, IPC_PEERS + marshal.dumps((_name, self._round, _part, _parts, _states[_part*_size:(_part+1)*_size])))
+            elif _mode in ('PEER', 'XLXPEER'):
+                self.send_worker(0, IPC_STATS + marshal.dumps((_name, _system._stats)))
+
+    # A part of the peer table of a MASTER on another worker. Once all of them
+    # are in, they replace the peers of the stand-in (which are the PEERS in the
+    # configuration the reports are made from).
+    def peers_received(self, _name, _round, _part, _parts, _states):
+        if _part == 0:
+            self._tables[_name] = [_round, 0, []]
+        _table = self._tables.get(_name)
+        if _table is None or _table[0] != _round or _table[1] != _part:
+            # Missed a part, wait for the next round
+            self._tables.pop(_name, None)
+            return
+        _table[1] += 1
+        _table[2].extend(_states)
+        if _table[1] == _parts:
+            del self._tables[_name]
+            _peers = self._systems[_name]._peers
+            _peers.clear()
+            for _state in _table[2]:
+                _peers[_state[0]] = Peer.from_state(_state)
+
+    # In-band signalling, for worker 0 to act on
+    def send_signal(self, _system, _slot, _tgid, _time):
+        self.send_worker(0, IPC_SIGNAL + marshal.dumps((_system, _slot, _tgid, _time)))
+
+    # From worker 0: _rules is {bridge: [ACTIVE of each entry]} for the bridges
+    # that were turned on or off
+    def send_rules(self, _rules):
+        _message = IPC_RULES + marshal.dumps(_rules)
+        for _worker in range(1, self.workers):
+            self.send_worker(_worker, _message)
+
+    def datagramReceived(self, _message, _sockaddr):
+        _opcode = _message[:1]
+        if _opcode == IPC_SYSTEM:
+            _length = ord(_message[1])
+            _system = _message[2:2+_length]
+            if self.owns(_system):
+                self._systems[_system].send_from_worker(_message[2+_length:])
+            else:
+                logger.error('(SHARD) Worker %s was sent a packet for system %s, which it does not run', self.worker, _system)
+        elif _opcode == IPC_BRIDGE_EVENT:
+            if self._report:
+                self._report.bridge_event(*hb_wire.read_event(_message, 1)[0])
+        elif _opcode == IPC_LATENCY:
+            hb_latency.merge(hb_wire.decode_latency(_message[1:]))
+        elif _opcode == IPC_SIGNAL:
+            if self.signal_received:
+                self.signal_received(*marshal.loads(_message[1:]))
+        elif _opcode == IPC_RULES:
+            if self.rules_received:
+                self.rules_received(marshal.loads(_message[1:]))
+        elif _opcode == IPC_PEERS:
+            _table = marshal.loads(_message[1:])
+            if _table[0] in self._systems and not self.owns(_table[0]):
+                self.peers_received(*_table)
+        elif _opcode == IPC_STATS:
+            _system, _stats = marshal.loads(_message[1:])
+            if _system in self._systems and not self.owns(_system):
+                self._systems[_system]._stats.update(_stats)
+        else:
+            logger.error('(SHARD) Unknown IPC message type: %s', repr(_opcode))
+
+
+# Stands in for the reporting server on workers other than 0, passing bridge
+# events to worker 0. The rest of the reporting server's interface is a no-op.
+class remoteReport(object):
+    def __init__(self, _shard):
+        self._shard = _shard
+        self.clients = []
+
+    def bridge_event(self, _action, _direction, _system, _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration=None):
+        if self._shard.bridge_events:
+            self._shard.send_worker(0, IPC_BRIDGE_EVENT + hb_wire.event_record((_action, _direction, _system, _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration)))
+
+    def send_config(self):
+        pass
+
+    def send_clients(self, _message, _report=False):
+        pass
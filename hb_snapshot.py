@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+Peer table snapshots for a warm restart. When HBlink stops, each MASTER writes
+its peers (address, salt, state and repeater configuration) to a file; when it
+starts again it reads them back, so peers that carry on pinging through the
+restart don't have to log in again.
+
+A snapshot is one marshal'ed tuple per peer (see hb_peer.Peer.state), which is
+quick to write and read even with many thousands of peers. Peers that hadn't
+been heard from for longer than the validity window when the snapshot is read
+are left out, and a snapshot is only ever read once.
+'''
+
+from __future__ import print_function
+
+import marshal
+import os
+
+from hb_peer import Peer, STATE
+
+# The module needs logging, but handlers, etc. are controlled by the parent
+import logging
+logger = logging.getLogger(__name__)
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# Bumped whenever the layout of a peer's state changes; other versions are ignored
+VERSION = 1
+
+def snapshot_path(_dir, _system):
+    return os.path.join(_dir, '{}.peers'.format(_system))
+
+# Write _peers (Peer objects) for _system to _dir. Written to a temporary file
+# first so a reader never sees half a snapshot.
+def save(_dir, _system, _peers):
+    _path = snapshot_path(_dir, _system)
+    _data = marshal.dumps((VERSION, STATE, [_peer.state() for _peer in _peers]))
+    try:
+        with open(_path + '.tmp', 'wb') as _file:
+            _file.write(_data)
+        os.rename(_path + '.tmp', _path)
+    except (IOError, OSError) as err:
+        logger.error('(%s) Could not write peer snapshot %s: %s', _system, _path, err)
+        return False
+    return True
+
+# Read back the snapshot for _system from _dir, and remove it. Returns the Peer
+# objects last heard from within _ttl seconds of _now.
+def load(_dir, _system, _now, _ttl):
+    _path = snapshot_path(_dir, _system)
+    try:
+        with open(_path, 'rb') as _file:
+            _data = _file.read()
+        os.remove(_path)
+    except (IOError, OSError):
+        return []
+    try:
+        _version, _state, _peers = marshal.loads(_data)
+    except (ValueError, EOFError, TypeError):
+        logger.error('(%s) Peer snapshot %s could not be read, ignoring it', _system, _path)
+        return []
+    if _version != VERSION or tuple(_state) != STATE:
+        logger.warning('(%s) Peer snapshot %s is from a different version of HBlink, ignoring it', _system, _path)
+        return []
+    _peers = [Peer.from_state(_peer) for _peer in _peers]
+    return [_peer for _peer in _peers if _now - _peer.last_ping <= _ttl]
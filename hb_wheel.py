@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+A hashed timing wheel, used by MASTER systems to time out peers that stop
+pinging. Every ping (re)schedules the peer's deadline, which just moves it from
+one bucket to another. The maintenance loop then only has to look at the buckets
+whose time has come, instead of checking every peer it has.
+'''
+
+from __future__ import print_function
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+# _tick is the resolution of the wheel in seconds (HBlink uses PING_TIME, how
+# often the maintenance loop runs) and _span the longest deadline, from now, it
+# is normally asked to hold. Deadlines further out still work, they just get
+# looked at once per trip around the wheel.
+#
+# A key is in the bucket for the first tick that is *after* its deadline, so
+# everything in a bucket whose tick has passed has expired.
+class timingWheel(object):
+    def __init__(self, _tick, _span, _now=0):
+        self._tick = float(_tick)
+        self._size = int(_span / self._tick) + 2
+        self._buckets = [set() for _ in range(self._size)]
+        self._deadline = {}
+        self._slot = {}
+        self._next = int(_now // self._tick)
+
+    def __len__(self):
+        return len(self._deadline)
+
+    def __contains__(self, _key):
+        return _key in self._deadline
+
+    def schedule(self, _key, _deadline):
+        _slot = (int(_deadline // self._tick) + 1) % self._size
+        _old = self._slot.get(_key)
+        if _old != _slot:
+            if _old is not None:
+                self._buckets[_old].discard(_key)
+            self._buckets[_slot].add(_key)
+            self._slot[_key] = _slot
+        self._deadline[_key] = _deadline
+
+    def cancel(self, _key):
+        _slot = self._slot.pop(_key, None)
+        if _slot is not None:
+            self._buckets[_slot].discard(_key)
+            del self._deadline[_key]
+
+    # Remove and return every key whose deadline is before _now
+    def expire(self, _now):
+        _expired = []
+        _current = int(_now // self._tick)
+        # Past a full trip round the wheel every bucket has been looked at
+        _first = max(self._next, _current - self._size + 1)
+        for _tick in range(_first, _current + 1):
+            _bucket = self._buckets[_tick % self._size]
+            if not _bucket:
+                continue
+            for _key in list(_bucket):
+                _deadline = self._deadline[_key]
+                if _deadline < _now:
+                    _expired.append(_key)
+                    self.cancel(_key)
+                elif _deadline >= (_tick + self._size - 1) * self._tick:
+                    # Scheduled further out than the wheel spans, it's on a later lap
+                    continue
+                else:
+                    # Right on the edge of this tick, look again on the next one
+                    _bucket.discard(_key)
+                    _slot = (_tick + 1) % self._size
+                    self._buckets[_slot].add(_key)
+                    self._slot[_key] = _slot
+        self._next = _current + 1
+        return _expired
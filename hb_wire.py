@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+#
+###############################################################################
+#   Copyright (C) 2016-2018 Cortney T. Buffington, N0MJS <n0mjs@me.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software Foundation,
+#   Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+###############################################################################
+
+'''
+A compact wire format for the reporting server (REPORT_FORMAT: wire), in place
+of pickle. Only what is listed here is sent -- no passphrases, ACLs or salts --
+and a client needs nothing more than this module (or the description below) to
+read it. Everything is big-endian.
+
+A report (CONFIG_SND or CONFIG_UPD) is:
+
+    B   format VERSION
+    H   number of systems, then for each:
+        name            B length, then the name
+        system          a value (below): a map of the SYSTEM_FIELDS it has,
+                        or nil in a CONFIG_UPD when the system hasn't changed
+        I   number of peer records, then each of them
+
+A peer record is the 4 byte peer ID, an I mask of the PEER_FIELDS that follow,
+and those fields in PEER_FIELDS order: 'd' a double, 'I' and 'H' unsigned
+integers, 's' a string (B length, then the string, trailing blanks removed). In
+a CONFIG_SND every peer has every field; in a CONFIG_UPD only the fields that
+changed, and a mask of 0 means the peer has gone.
+
+The bridges (BRIDGE_SND or BRIDGE_UPD) are B VERSION, H number of bridges,
+then for each its name (as above) and a value: a list of maps of the
+BRIDGE_FIELDS of its entries, or nil in a BRIDGE_UPD when it has gone.
+
+Bridge events (BRDG_EVENTS) are B VERSION, H number of events, then for each:
+B flags (1 for an END, 2 for TX), the system name (as above), then 4s stream
+ID, 4s peer ID, 3s source ID, B slot, 3s talkgroup and d call duration (0 for
+a START).
+
+Latency histograms (LATENCY_SND) are B VERSION and a value: the map described
+in hb_latency, {system: {frame type: list of counts}}.
+
+A value is a one byte tag and what goes with it: N nil, T true, F false, i a q
+integer, d a double, s a string (H length), l a list (H count, values), m a map
+(H count, then a string (H length) key and a value for each).
+'''
+
+from __future__ import print_function
+
+from binascii import b2a_hex as ahex
+from operator import attrgetter
+from struct import Struct
+
+import hb_const as const
+
+__author__     = 'Cortney T. Buffington, N0MJS'
+__copyright__  = 'Copyright (c) 2016-2018 Cortney T. Buffington, N0MJS and the K0USY Group'
+__credits__    = ''
+__license__    = 'GNU GPLv3'
+__maintainer__ = 'Cort Buffington, N0MJS'
+__email__      = 'n0mjs@me.com'
+
+
+VERSION = 1
+
+# The peer fields sent, in the order they are sent (numbers first), and their type
+PEER_FIELDS = (
+    ('CONNECTED',       'd'),
+    ('LAST_PING',       'd'),
+    ('PINGS_RECEIVED',  'I'),
+    ('PORT',            'H'),
+    ('CONNECTION',      's'),
+    ('IP',              's'),
+    ('CALLSIGN',        's'),
+    ('RX_FREQ',         's'),
+    ('TX_FREQ',         's'),
+    ('TX_POWER',        's'),
+    ('COLORCODE',       's'),
+    ('LATITUDE',        's'),
+    ('LONGITUDE',       's'),
+    ('HEIGHT',          's'),
+    ('LOCATION',        's'),
+    ('DESCRIPTION',     's'),
+    ('SLOTS',           's'),
+    ('URL',             's'),
+    ('SOFTWARE_ID',     's'),
+    ('PACKAGE_ID',      's'),
+)
+ALL_PEER_FIELDS = (1 << len(PEER_FIELDS)) - 1
+
+# The system and bridge entry fields sent, when the system (or entry) has them.
+# The IDs are sent as numbers.
+SYSTEM_FIELDS = ('MODE', 'ENABLED', 'REPEAT', 'MAX_PEERS', 'LOOSE', 'IP', 'PORT', 'MASTER_IP', 'MASTER_PORT',
+                 'TARGET_IP', 'TARGET_PORT', 'CALLSIGN', 'RADIO_ID', 'NETWORK_ID', 'GROUP_HANGTIME', 'XLXMODULE',
+                 'STATS', 'ACL_DROPS')
+BRIDGE_FIELDS = ('SYSTEM', 'TS', 'TGID', 'ACTIVE', 'TIMEOUT', 'TO_TYPE', 'ON', 'OFF', 'RESET', 'TIMER')
+
+_B = Struct('>B')
+_H = Struct('>H')
+_I = Struct('>I')
+_q = Struct('>q')
+_d = Struct('>d')
+_RECORD = Struct('>4sI')
+_NUMBERS = Struct('>4sIddIH')
+_STRUCTS = {'d': _d, 'I': _I, 'H': _H}
+_EVENT = Struct('>4s4s3sB3sd')
+_get_strings = attrgetter('ip', 'callsign', 'rx_freq', 'tx_freq', 'tx_power', 'colorcode', 'latitude', 'longitude', 'height',
+                          'location', 'description', 'slots', 'url', 'software_id', 'package_id')
+
+
+#
+# Encoding
+#
+def _short(_s):
+    _s = _s.rstrip(' \x00')
+    return chr(len(_s)) + _s
+
+def value(_v):
+    if _v is None:
+        return 'N'
+    if _v is True:
+        return 'T'
+    if _v is False:
+        return 'F'
+    if isinstance(_v, (int, long)):
+        return 'i' + _q.pack(_v)
+    if isinstance(_v, float):
+        return 'd' + _d.pack(_v)
+    if isinstance(_v, str):
+        return 's' + _H.pack(len(_v)) + _v
+    if isinstance(_v, (list, tuple)):
+        return 'l' + _H.pack(len(_v)) + ''.join([value(_item) for _item in _v])
+    if isinstance(_v, dict):
+        return 'm' + _H.pack(len(_v)) + ''.join([_H.pack(len(_key)) + _key + value(_v[_key]) for _key in sorted(_v)])
+    raise TypeError('cannot send {} in a report'.format(type(_v).__name__))
+
+def _id(_raw):
+    return int(ahex(_raw), 16)
+
+def export_system(_system):
+    _export = dict((_key, _system[_key]) for _key in SYSTEM_FIELDS if _key in _system)
+    for _key in ('RADIO_ID', 'NETWORK_ID'):
+        if _key in _export:
+            _export[_key] = _id(_export[_key])
+    return _export
+
+def export_bridge(_entries):
+    _export = []
+    for _entry in _entries:
+        _entry = dict((_key, _entry[_key]) for _key in BRIDGE_FIELDS if _key in _entry)
+        if 'TGID' in _entry:
+            _entry['TGID'] = _id(_entry['TGID'])
+        for _key in ('ON', 'OFF', 'RESET'):
+            if _key in _entry:
+                _entry[_key] = [_id(_tgid) for _tgid in _entry[_key]]
+        _export.append(_entry)
+    return _export
+
+# Every field of a peer
+def _peer_record(_peer):
+    return _NUMBERS.pack(_peer.peer_id, ALL_PEER_FIELDS, _peer.connected, _peer.last_ping, _peer.pings_received, _peer.port) + \
+        _short(const.PEER_STATES[_peer.connection]) + ''.join([_short(_s) for _s in _get_strings(_peer)])
+
+# The fields in _changes (as hb_peer.peer_changes() gives them), None for a peer that
+# has gone, or '' if none of what changed is sent
+def _change_record(_peer_id, _changes):
+    if _changes is None:
+        return _RECORD.pack(_peer_id, 0)
+    _mask = 0
+    _fields = []
+    for _bit, (_key, _type) in enumerate(PEER_FIELDS):
+        if _key in _changes:
+            _mask |= 1 << _bit
+            _fields.append(_short(_changes[_key]) if _type == 's' else _STRUCTS[_type].pack(_changes[_key]))
+    if not _mask:
+        return ''
+    return _RECORD.pack(_peer_id, _mask) + ''.join(_fields)
+
+def _system_block(_name, _system, _records):
+    return chr(len(_name)) + _name + _system + _I.pack(len(_records)) + ''.join(_records)
+
+# CONFIG_SND: all of SYSTEMS. With _cache (a dict kept between calls), the peer
+# records of the last one are kept by Peer.state(), and only peers whose state
+# has changed since are encoded again.
+def encode_config(_systems, _cache=None):
+    _last = _cache if _cache is not None else {}
+    _seen = {}
+    _blocks = []
+    for _name, _system in sorted(_systems.items()):
+        _records = []
+        for _peer in _system['PEERS'].itervalues() if 'PEERS' in _system else ():
+            _state = _peer.state()
+            _record = _last.get(_state)
+            if _record is None:
+                _record = _peer_record(_peer)
+            _seen[_state] = _record
+            _records.append(_record)
+        _blocks.append(_system_block(_name, value(export_system(_system)), _records))
+    if _cache is not None:
+        _cache.clear()
+        _cache.update(_seen)
+    return _B.pack(VERSION) + _H.pack(len(_blocks)) + ''.join(_blocks)
+
+# CONFIG_UPD: a delta from hb_peer.exportTracker
+def encode_delta(_delta):
+    _blocks = []
+    for _name in sorted(set(_delta['SYSTEMS']) | set(_delta['PEERS'])):
+        _system = _delta['SYSTEMS'].get(_name)
+        _peers = _delta['PEERS'].get(_name, {})
+        _records = [_record for _record in [_change_record(_peer_id, _changes) for _peer_id, _changes in _peers.iteritems()] if _record]
+        if _system is None and not _records:
+            continue
+        _blocks.append(_system_block(_name, value(export_system(_system) if _system is not None else None), _records))
+    return _B.pack(VERSION) + _H.pack(len(_blocks)) + ''.join(_blocks)
+
+# BRIDGE_SND and BRIDGE_UPD: {bridge: its entries, or None if it has gone}
+def encode_bridges(_bridges):
+    _blocks = [chr(len(_name)) + _name + value(export_bridge(_entries) if _entries is not None else None)
+               for _name, _entries in sorted(_bridges.items())]
+    return _B.pack(VERSION) + _H.pack(len(_blocks)) + ''.join(_blocks)
+
+# One bridge event, as given to reportFactory.bridge_event()
+def event_record(_event):
+    _action, _direction, _system, _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration = _event
+    return chr((_action == 'END') | (_direction == 'TX') << 1) + chr(len(_system)) + _system + \
+        _EVENT.pack(_stream_id, _peer_id, _rf_src, _slot, _tgid, _duration or 0.0)
+
+# BRDG_EVENTS: a batch of bridge events
+def encode_events(_events):
+    return _B.pack(VERSION) + _H.pack(len(_events)) + ''.join([event_record(_event) for _event in _events])
+
+# LATENCY_SND: the histograms from hb_latency.report()
+def encode_latency(_histograms):
+    return _B.pack(VERSION) + value(_histograms)
+
+
+#
+# Decoding, for clients
+#
+def _read_value(_data, _at):
+    _tag = _data[_at]
+    _at += 1
+    if _tag == 'N':
+        return None, _at
+    if _tag == 'T':
+        return True, _at
+    if _tag == 'F':
+        return False, _at
+    if _tag == 'i':
+        return _q.unpack_from(_data, _at)[0], _at + 8
+    if _tag == 'd':
+        return _d.unpack_from(_data, _at)[0], _at + 8
+    _count = _H.unpack_from(_data, _at)[0]
+    _at += 2
+    if _tag == 's':
+        return _data[_at:_at+_count], _at + _count
+    if _tag == 'l':
+        _list = []
+        for _i in range(_count):
+            _item, _at = _read_value(_data, _at)
+            _list.append(_item)
+        return _list, _at
+    if _tag == 'm':
+        _map = {}
+        for _i in range(_count):
+            _length = _H.unpack_from(_data, _at)[0]
+            _key = _data[_at+2:_at+2+_length]
+            _map[_key], _at = _read_value(_data, _at + 2 + _length)
+        return _map, _at
+    raise ValueError('unknown value tag {!r}'.format(_tag))
+
+def _read_name(_data, _at):
+    _length = ord(_data[_at])
+    return _data[_at+1:_at+1+_length], _at + 1 + _length
+
+def _check_version(_data):
+    if ord(_data[0]) != VERSION:
+        raise ValueError('report format version {} is not {}'.format(ord(_data[0]), VERSION))
+
+# A CONFIG_SND or CONFIG_UPD payload, as {system: (its fields or None, {peer ID: {field: value} or None})}
+def decode_config(_data):
+    _check_version(_data)
+    _systems = {}
+    _at = 3
+    for _i in range(_H.unpack_from(_data, 1)[0]):
+        _name, _at = _read_name(_data, _at)
+        _system, _at = _read_value(_data, _at)
+        _peers = {}
+        _count = _I.unpack_from(_data, _at)[0]
+        _at += 4
+        for _j in range(_count):
+            _peer_id, _mask = _RECORD.unpack_from(_data, _at)
+            _at += _RECORD.size
+            if not _mask:
+                _peers[_peer_id] = None
+                continue
+            _fields = {}
+            for _bit, (_key, _type) in enumerate(PEER_FIELDS):
+                if _mask & (1 << _bit):
+                    if _type == 's':
+                        _fields[_key], _at = _read_name(_data, _at)
+                    else:
+                        _fields[_key] = _STRUCTS[_type].unpack_from(_data, _at)[0]
+                        _at += _STRUCTS[_type].size
+            _peers[_peer_id] = _fields
+        _systems[_name] = (_system, _peers)
+    return _systems
+
+# A BRIDGE_SND or BRIDGE_UPD payload, as {bridge: its entries or None}
+def decode_bridges(_data):
+    _check_version(_data)
+    _bridges = {}
+    _at = 3
+    for _i in range(_H.unpack_from(_data, 1)[0]):
+        _name, _at = _read_name(_data, _at)
+        _bridges[_name], _at = _read_value(_data, _at)
+    return _bridges
+
+# One bridge event from _data at _at, in the form reportFactory.bridge_event()
+# takes it, and where the next one starts
+def read_event(_data, _at):
+    _flags = ord(_data[_at])
+    _system, _at = _read_name(_data, _at + 1)
+    _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration = _EVENT.unpack_from(_data, _at)
+    _event = ('END' if _flags & 1 else 'START', 'TX' if _flags & 2 else 'RX', _system, _stream_id, _peer_id, _rf_src, _slot, _tgid,
+              _duration if _flags & 1 else None)
+    return _event, _at + _EVENT.size
+
+# A BRDG_EVENTS payload, as a list of events
+def decode_events(_data):
+    _check_version(_data)
+    _events = []
+    _at = 3
+    for _i in range(_H.unpack_from(_data, 1)[0]):
+        _event, _at = read_event(_data, _at)
+        _events.append(_event)
+    return _events
+
+# A LATENCY_SND payload, as hb_latency.report() gave it
+def decode_latency(_data):
+    _check_version(_data)
+    return _read_value(_data, 1)[0]
@@ -32,24 +32,38 @@ from __future__ import print_function
 # Specifig functions from modules we need
 from binascii import b2a_hex as ahex
 from binascii import a2b_hex as bhex
-from random import randint
-from hashlib import sha256, sha1
-from hmac import new as hmac_new, compare_digest
-from time import time
-from bitstring import BitArray
-from importlib import import_module
+from hashlib import sha256
+from hmac import compare_digest
 from collections import deque
+from hb_clock import now, monotonic
+import hb_clock
 
 # Twisted is pretty important, so I keep it separate
 from twisted.internet.protocol import DatagramProtocol, Factory, Protocol
 from twisted.protocols.basic import NetstringReceiver
 from twisted.internet import reactor, task
+from twisted.internet.interfaces import IPushProducer
+from zope.interface import implementer
 
 # Other files we pull from -- this is mostly for readability and segmentation
 import hb_log
 import hb_config
 import hb_const as const
-from dmr_utils.utils import int_id, hex_str_4, try_download, mk_id_dict
+import hb_shard
+import hb_snapshot
+import hb_wire
+import hb_metrics
+import hb_latency
+import hb_cdr
+from hb_acl import acl_check, verdictCache, streamSet
+from hb_frame import DMRD, DMRD_HEADER, txBuffer
+from hb_mmsg import fanOut, listen_udp, AVAILABLE as HAVE_SENDMMSG
+from hb_wheel import timingWheel
+from hb_peer import Peer, export_systems, exportTracker
+from hb_hmac import hmacSHA1
+from hb_login import loginQueue
+from hb_aliases import mk_aliases_later, load as load_aliases
+from dmr_utils.utils import int_id, hex_str_4
 
 # Imports for the reporting server
 import cPickle as pickle
@@ -78,6 +92,8 @@ def config_reports(_config, _factory):
         def reporting_loop(_logger, _server):
             _logger.debug('Periodic reporting loop started')
             _server.send_config()
+            _server.send_latency()
+            _server.log_clients()
 
         logger.info('HBlink TCP reporting server configured')
 
@@ -90,6 +106,27 @@ def config_reports(_config, _factory):
 
     return report_server
 
+# Serve the metrics (see hb_metrics) if a METRICS_PORT is configured. With
+# workers, each serves the systems it runs, on METRICS_PORT + its number.
+def config_metrics(_config, _systems, _report, _shard):
+    _port = _config['REPORTS']['METRICS_PORT']
+    if not _port:
+        return
+    _worker = _shard.worker if _shard else 0
+
+    def peers():
+        return [({'system': _name}, len(_system._peers)) for _name, _system in sorted(_systems.items())
+                if _config['SYSTEMS'][_name]['MODE'] == 'MASTER' and (_shard is None or _shard.owns(_name))]
+    hb_metrics.gauge('hblink_peers', 'Peers logged in to each MASTER', peers)
+
+    if isinstance(_report, reportFactory):
+        hb_metrics.gauge('hblink_report_clients', 'Reporting clients connected', lambda: [(None, len(_report.clients))])
+        hb_metrics.gauge('hblink_report_dropped_total', 'Events dropped for reporting clients not keeping up', lambda: [(None, _report.dropped)], 'counter')
+    if _shard:
+        hb_metrics.gauge('hblink_shard_dropped_total', 'Messages to other workers dropped', lambda: [({'worker': _worker}, _shard.dropped)], 'counter')
+
+    hb_metrics.listen(_port + _worker, _config['REPORTS']['METRICS_IP'])
+
 
 # Shut ourselves down gracefully by disconnecting from the masters and peers.
 def hblink_handler(_signal, _frame):
@@ -97,15 +134,6 @@ def hblink_handler(_signal, _frame):
         logger.info('SHUTDOWN: DE-REGISTER SYSTEM: %s', system)
         systems[system].dereg()
 
-# Check a supplied ID against the ACL provided. Returns action (True|False) based
-# on matching and the action specified.
-def acl_check(_id, _acl):
-    id = int_id(_id)
-    for entry in _acl[1]:
-        if entry[0] <= id <= entry[1]:
-            return _acl[0]
-    return not _acl[0]
-
 
 #************************************************
 #    OPENBRIDGE CLASS
@@ -118,7 +146,13 @@ class OPENBRIDGE(DatagramProtocol):
         self._system = _name
         self._report = _report
         self._config = self._CONFIG['SYSTEMS'][self._system]
-        self._laststrid = deque([], 20)
+        self._laststrid = streamSet(self._config['DROP_LOG_SIZE'])
+        self._acl_drops = self._config['ACL_DROPS']
+        self._metrics = hb_metrics.system(_name)
+        # Key the HMAC once, every packet in both directions is signed/checked with it
+        self._hmac = hmacSHA1(self._config['PASSPHRASE'])
+        if self._CONFIG['REPORTS']['REPORT_LATENCY']:
+            self.datagramReceived = hb_latency.instrument(_name, self.datagramReceived)
 
     def dereg(self):
         logger.info('(%s) is mode OPENBRIDGE. No De-Registration required, continuing shutdown', self._system)
@@ -126,16 +160,23 @@ class OPENBRIDGE(DatagramProtocol):
     def send_system(self, _packet):
         if _packet[:4] == 'DMRD':
             _packet = _packet[:11] + self._config['NETWORK_ID'] + _packet[15:]
-            _packet += hmac_new(self._config['PASSPHRASE'],_packet,sha1).digest()
+            _packet += self._hmac.digest(_packet)
             self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
+            self._metrics.tx_frames += 1
+            self._metrics.tx_bytes += len(_packet)
             # KEEP THE FOLLOWING COMMENTED OUT UNLESS YOU'RE DEBUGGING DEEPLY!!!!
             # logger.debug('(%s) TX Packet to OpenBridge %s:%s -- %s', self._system, self._config['TARGET_IP'], self._config['TARGET_PORT'], ahex(_packet))
         else:
             logger.error('(%s) OpenBridge system was asked to send non DMRD packet', self._system)
 
-    def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data):
+    # A packet another worker routed to this system (see hb_shard)
+    def send_from_worker(self, _packet):
+        self.send_system(_packet)
+
+    # _frame is an hb_frame.DMRD
+    def dmrd_received(self, _frame):
         pass
-        #print(int_id(_peer_id), int_id(_rf_src), int_id(_dst_id), int_id(_seq), _slot, _call_type, _frame_type, repr(_dtype_vseq), int_id(_stream_id))
+        #print(_frame)
 
     def datagramReceived(self, _packet, _sockaddr):
         # Keep This Line Commented Unless HEAVILY Debugging!
@@ -144,59 +185,54 @@ class OPENBRIDGE(DatagramProtocol):
         if _packet[:4] == 'DMRD':    # DMRData -- encapsulated DMR data frame
             _data = _packet[:53]
             _hash = _packet[53:]
-            _ckhs = hmac_new(self._config['PASSPHRASE'],_data,sha1).digest()
+            _ckhs = self._hmac.digest(_data)
 
             if compare_digest(_hash, _ckhs) and _sockaddr == self._config['TARGET_SOCK']:
-                _peer_id = _data[11:15]
-                _seq = _data[4]
-                _rf_src = _data[5:8]
-                _dst_id = _data[8:11]
-                _bits = int_id(_data[15])
-                _slot = 2 if (_bits & 0x80) else 1
-                #_call_type = 'unit' if (_bits & 0x40) else 'group'
-                if _bits & 0x40:
-                    _call_type = 'unit'
-                elif (_bits & 0x23) == 0x23:
-                    _call_type = 'vcsbk'
-                else:
-                    _call_type = 'group'
-                _frame_type = (_bits & 0x30) >> 4
-                _dtype_vseq = (_bits & 0xF) # data, 1=voice header, 2=voice terminator; voice, 0=burst A ... 5=burst F
-                _stream_id = _data[16:20]
-                #logger.debug('(%s) DMRD - Seqence: %s, RF Source: %s, Destination ID: %s', self._system, int_id(_seq), int_id(_rf_src), int_id(_dst_id))
+                _frame = DMRD(_data)
+                _rf_src = _frame.rf_src
+                _dst_id = _frame.dst_id
+                _stream_id = _frame.stream_id
+                _metrics = self._metrics
+                _metrics.received(_frame.slot, _dst_id, len(_packet))
+                #logger.debug('(%s) DMRD - %s', self._system, _frame)
 
                 # Sanity check for OpenBridge -- all calls must be on Slot 1
-                if _slot != 1:
+                if _frame.slot != 1:
                     logger.error('(%s) OpenBridge packet discarded because it was not received on slot 1. SID: %s, TGID %s', self._system, int_id(_rf_src), int_id(_dst_id))
                     return
 
-                # ACL Processing
+                # ACL Processing -- every dropped frame is counted, but only logged once per stream
                 if self._CONFIG['GLOBAL']['USE_ACL']:
                     if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                        if _stream_id not in self._laststrid:
+                        self._acl_drops['GLOBAL_SUB'] += 1
+                        _metrics.acl_drops += 1
+                        if self._laststrid.add(_stream_id):
                             logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                            self._laststrid.append(_stream_id)
                         return
-                    if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                        if _stream_id not in self._laststrid:
+                    if not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
+                        self._acl_drops['GLOBAL_TG1'] += 1
+                        _metrics.acl_drops += 1
+                        if self._laststrid.add(_stream_id):
                             logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid.append(_stream_id)
                         return
                 if self._config['USE_ACL']:
                     if not acl_check(_rf_src, self._config['SUB_ACL']):
-                        if _stream_id not in self._laststrid:
+                        self._acl_drops['SYSTEM_SUB'] += 1
+                        _metrics.acl_drops += 1
+                        if self._laststrid.add(_stream_id):
                             logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                            self._laststrid.append(_stream_id)
                         return
                     if not acl_check(_dst_id, self._config['TG1_ACL']):
-                        if _stream_id not in self._laststrid:
+                        self._acl_drops['SYSTEM_TG1'] += 1
+                        _metrics.acl_drops += 1
+                        if self._laststrid.add(_stream_id):
                             logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid.append(_stream_id)
                         return
 
                 # Userland actions -- typically this is the function you subclass for an application
-                self.dmrd_received(_peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data)
+                self.dmrd_received(_frame)
             else:
+                self._metrics.hmac_failures += 1
                 logger.info('(%s) OpenBridge HMAC failed, packet discarded - OPCODE: %s DATA: %s HMAC LENGTH: %s HMAC: %s', self._system, _packet[:4], repr(_packet[:53]), len(_packet[53:]), repr(_packet[53:])) 
 
 
@@ -211,12 +247,20 @@ class HBSYSTEM(DatagramProtocol):
         self._system = _name
         self._report = _report
         self._config = self._CONFIG['SYSTEMS'][self._system]
-        self._laststrid1 = ''
-        self._laststrid2 = ''
+        self._use_acl = self._CONFIG['GLOBAL']['USE_ACL'] or self._config['USE_ACL']
+        self._acl_cache = verdictCache()
+        self._metrics = hb_metrics.system(_name)
 
         # Define shortcuts and generic function names based on the type of system we are
         if self._config['MODE'] == 'MASTER':
             self._peers = self._CONFIG['SYSTEMS'][self._system]['PEERS']
+            self._sockaddrs = {}
+            self._tx = txBuffer()
+            self._fanout = None
+            self._peer_timeout = self._CONFIG['GLOBAL']['PING_TIME'] * self._CONFIG['GLOBAL']['MAX_MISSED']
+            self._expiry = timingWheel(self._CONFIG['GLOBAL']['PING_TIME'], self._peer_timeout, monotonic())
+            self._logins = loginQueue(self._config['LOGIN_RATE'], const.LOGIN_BURST, self._config['LOGIN_IP_RATE'], const.LOGIN_IP_BURST, const.LOGIN_QUEUE_SIZE, monotonic())
+            self._login_drain = None
             self.send_system = self.send_peers
             self.maintenance_loop = self.master_maintenance_loop
             self.datagramReceived = self.master_datagramReceived
@@ -236,24 +280,36 @@ class HBSYSTEM(DatagramProtocol):
             self.datagramReceived = self.peer_datagramReceived
             self.dereg = self.peer_dereg
 
+        if self._CONFIG['REPORTS']['REPORT_LATENCY']:
+            self.datagramReceived = hb_latency.instrument(_name, self.datagramReceived)
+
     def startProtocol(self):
         # Set up periodic loop for tracking pings from peers. Run every 'PING_TIME' seconds
         self._system_maintenance = task.LoopingCall(self.maintenance_loop)
         self._system_maintenance_loop = self._system_maintenance.start(self._CONFIG['GLOBAL']['PING_TIME'])
 
+        # Repeat to all of our peers with one sendmmsg() per frame where the platform lets us
+        if self._config['MODE'] == 'MASTER' and self._config['REPEAT'] and HAVE_SENDMMSG and ':' not in self._config['IP']:
+            self._fanout = fanOut(self.transport.fileno(), self.transport.write)
+            logger.info('(%s) Batched (sendmmsg) repeat to peers enabled', self._system)
+
+        # Take back the peers we had when we were last stopped
+        if self._config['MODE'] == 'MASTER' and self._CONFIG['GLOBAL']['PEER_SNAPSHOT_DIR']:
+            self.peers_restore()
+
     # Aliased in __init__ to maintenance_loop if system is a master
     def master_maintenance_loop(self):
         logger.debug('(%s) Master maintenance loop started', self._system)
-        remove_list = []
-        for peer in self._peers:
-            _this_peer = self._peers[peer]
-            # Check to see if any of the peers have been quiet (no ping) longer than allowed
-            if _this_peer['LAST_PING']+(self._CONFIG['GLOBAL']['PING_TIME']*self._CONFIG['GLOBAL']['MAX_MISSED']) < time():
-                remove_list.append(peer)
-        for peer in remove_list:
-            logger.info('(%s) Peer %s (%s) has timed out and is being removed', self._system, self._peers[peer]['CALLSIGN'], self._peers[peer]['RADIO_ID'])
+        # Only peers that have been quiet (no ping) longer than allowed come out of the wheel
+        for peer in self._expiry.expire(monotonic()):
+            logger.info('(%s) Peer %s (%s) has timed out and is being removed', self._system, self._peers[peer].callsign, self._peers[peer].radio_id)
             # Remove any timed out peers from the configuration
-            del self._CONFIG['SYSTEMS'][self._system]['PEERS'][peer]
+            self.peer_del(peer)
+        self._logins.prune(monotonic())
+        if self._logins.rejected or len(self._logins):
+            logger.info('(%s) Logins: %s queued, %s admitted, %s rejected, %s waiting', self._system, self._logins.queued, self._logins.admitted, self._logins.rejected, len(self._logins))
+        if self._fanout:
+            logger.debug('(%s) Batched repeat: %s frames sent in %s syscalls, %s syscalls saved', self._system, self._fanout.frames, self._fanout.calls, self._fanout.saved())
 
     # Aliased in __init__ to maintenance_loop if system is a peer
     def peer_maintenance_loop(self):
@@ -276,36 +332,227 @@ class HBSYSTEM(DatagramProtocol):
             self._stats['PINGS_SENT'] += 1
             self._stats['PING_OUTSTANDING'] = True
 
+    # Heard from a peer (login or ping), push its timeout back
+    def peer_heard(self, _peer):
+        _peer.last_ping = now()
+        self._expiry.schedule(_peer.peer_id, monotonic() + self._peer_timeout)
+
+    # All changes to the peer table go through peer_add() and peer_del() so that
+    # the sockaddr index, the timeout wheel and the repeat fan-out stay in step
+    def peer_add(self, _peer):
+        _old = self._sockaddrs.get(_peer.sockaddr)
+        if _old is not None and _old.peer_id != _peer.peer_id:
+            logger.warning('(%s) Peer %s logged in from the same address as peer %s, removing %s', self._system, _peer.radio_id, _old.radio_id, _old.radio_id)
+            self.peer_del(_old.peer_id)
+        _old = self._peers.get(_peer.peer_id)
+        if _old is not None and self._sockaddrs.get(_old.sockaddr) is _old:
+            del self._sockaddrs[_old.sockaddr]
+        self._peers[_peer.peer_id] = _peer
+        self._sockaddrs[_peer.sockaddr] = _peer
+        self.peer_heard(_peer)
+        self.peers_changed()
+
+    def peer_del(self, _peer_id):
+        _peer = self._peers.pop(_peer_id, None)
+        if _peer is not None:
+            if self._sockaddrs.get(_peer.sockaddr) is _peer:
+                del self._sockaddrs[_peer.sockaddr]
+            self._expiry.cancel(_peer_id)
+            self.peers_changed()
+
+    # The peer sending from _sockaddr, if it is _peer_id and has reached _state
+    # (default: logged in and configured), otherwise None. This is the check for
+    # every packet a MASTER gets from a peer.
+    def peer_at(self, _peer_id, _sockaddr, _state=const.PEER_CONNECTED):
+        _peer = self._sockaddrs.get(_sockaddr)
+        if _peer is not None and _peer.peer_id == _peer_id and _peer.connection == _state:
+            return _peer
+        return None
+
+    # Add the peers saved by master_dereg() the last time we stopped (see
+    # hb_snapshot), as they were. Each gets a full timeout to ping us again.
+    def peers_restore(self):
+        _peers = hb_snapshot.load(self._CONFIG['GLOBAL']['PEER_SNAPSHOT_DIR'], self._system, now(), self._CONFIG['GLOBAL']['PEER_SNAPSHOT_TTL'])
+        for _peer in _peers:
+            _last_ping = _peer.last_ping
+            self.peer_add(_peer)
+            _peer.last_ping = _last_ping
+        if _peers:
+            logger.info('(%s) %s peers taken back from the snapshot', self._system, len(_peers))
+
+    # Called whenever a peer is added, removed or moves to a new address so that
+    # anything built from the peer table gets rebuilt
+    def peers_changed(self):
+        if self._fanout:
+            self._fanout.invalidate()
+
+    # A DMRD frame is copied into the transmit buffer (see hb_frame.txBuffer) once,
+    # and then only each peer's ID is written over it before it is sent to that peer
     def send_peers(self, _packet):
-        for _peer in self._peers:
-            self.send_peer(_peer, _packet)
-            #logger.debug('(%s) Packet sent to peer %s', self._system, self._peers[_peer]['RADIO_ID'])
-
+        if _packet[:4] != 'DMRD':
+            for _peer in self._peers:
+                self.send_peer(_peer, _packet)
+            return
+        _buf = self._tx.load(_packet)
+        _view = self._tx.view
+        for _peer, _this_peer in self._peers.iteritems():
+            _view[11:15] = _peer
+            self.transport.write(_buf, _this_peer.sockaddr)
+            #logger.debug('(%s) Packet sent to peer %s', self._system, _this_peer.radio_id)
+        self._metrics.tx_frames += len(self._peers)
+        self._metrics.tx_bytes += len(self._peers) * len(_buf)
+
+    # DMRD frames get the peer's ID, anything else goes as it is
     def send_peer(self, _peer, _packet):
-        #if _packet[:4] == 'DMRD':
-        self.transport.write(''.join([_packet[:11], _peer, _packet[15:]]), self._peers[_peer]['SOCKADDR'])
+        if _packet[:4] == 'DMRD':
+            _packet = ''.join([_packet[:11], _peer, _packet[15:]])
+        self.transport.write(_packet, self._peers[_peer].sockaddr)
         # KEEP THE FOLLOWING COMMENTED OUT UNLESS YOU'RE DEBUGGING DEEPLY!!!!
-        #logger.debug('(%s) TX Packet to %s on port %s: %s', self._peers[_peer]['RADIO_ID'], self._peers[_peer]['IP'], self._peers[_peer]['PORT'], ahex(_packet))
+        #logger.debug('(%s) TX Packet to %s on port %s: %s', self._peers[_peer].radio_id, self._peers[_peer].ip, self._peers[_peer].port, ahex(_packet))
 
     def send_master(self, _packet):
         if _packet[:4] == 'DMRD':
             _packet = _packet[:11] + self._config['RADIO_ID'] + _packet[15:]
+            self._metrics.tx_frames += 1
+            self._metrics.tx_bytes += len(_packet)
         self.transport.write(_packet, self._config['MASTER_SOCKADDR'])
         # KEEP THE FOLLOWING COMMENTED OUT UNLESS YOU'RE DEBUGGING DEEPLY!!!!
         # logger.debug('(%s) TX Packet to %s:%s -- %s', self._system, self._config['MASTER_IP'], self._config['MASTER_PORT'], ahex(_packet))
 
-    def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data):
+    # A packet another worker routed to this system (see hb_shard)
+    def send_from_worker(self, _packet):
+        self.send_system(_packet)
+
+    # _frame is an hb_frame.DMRD
+    def dmrd_received(self, _frame):
         pass
 
+    # Run a DMRD frame through the global and system ACLs. Logs (with _log) why the
+    # call was dropped and returns False at the first ACL that rejects it.
+    def acl_process(self, _log, _frame):
+        _rf_src, _dst_id, _slot, _stream_id = _frame.rf_src, _frame.dst_id, _frame.slot, _frame.stream_id
+        if self._CONFIG['GLOBAL']['USE_ACL']:
+            if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
+                _log('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL ACL', self._system, int_id(_stream_id), int_id(_rf_src))
+                return False
+            if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
+                _log('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                return False
+            if _slot == 2 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG2_ACL']):
+                _log('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                return False
+        if self._config['USE_ACL']:
+            if not acl_check(_rf_src, self._config['SUB_ACL']):
+                _log('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
+                return False
+            if _slot == 1 and not acl_check(_dst_id, self._config['TG1_ACL']):
+                _log('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                return False
+            if _slot == 2 and not acl_check(_dst_id, self._config['TG2_ACL']):
+                _log('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                return False
+        return True
+
+    # The ACL verdict can't change during a call, so only the first frame of each
+    # stream goes through acl_process, the rest re-use its answer from the cache.
+    # The voice terminator ends the stream; the cache times out streams that don't
+    # send one.
+    def acl_stream(self, _log, _frame):
+        _now = monotonic()
+        _key = (_frame.stream_id, _frame.slot)
+        _permit = self._acl_cache.get(_key, _now)
+        if _permit is None:
+            _permit = self.acl_process(_log, _frame)
+            self._acl_cache.put(_key, _permit, _now)
+        if _frame.frame_type == const.HBPF_DATA_SYNC and _frame.dtype_vseq == const.HBPF_SLT_VTERM:
+            self._acl_cache.expire(_key)
+        return _permit
+
     def master_dereg(self):
+        # With snapshots on, the peers are saved rather than told to disconnect,
+        # so they carry on pinging and are taken back when we start again
+        if self._CONFIG['GLOBAL']['PEER_SNAPSHOT_DIR']:
+            if hb_snapshot.save(self._CONFIG['GLOBAL']['PEER_SNAPSHOT_DIR'], self._system, self._peers.values()):
+                logger.info('(%s) %s peers saved for a warm restart, not de-registering them', self._system, len(self._peers))
+                return
         for _peer in self._peers:
             self.send_peer(_peer, 'MSTCL'+_peer)
-            logger.info('(%s) De-Registration sent to Peer: %s (%s)', self._system, self._peers[_peer]['CALLSIGN'], self._peers[_peer]['RADIO_ID'])
+            logger.info('(%s) De-Registration sent to Peer: %s (%s)', self._system, self._peers[_peer].callsign, self._peers[_peer].radio_id)
 
     def peer_dereg(self):
         self.send_master('RPTCL'+self._config['RADIO_ID'])
         logger.info('(%s) De-Registration sent to Master: %s:%s', self._system, self._config['MASTER_SOCKADDR'][0], self._config['MASTER_SOCKADDR'][1])
 
+    # Logins (RPTL) and challenge answers (RPTK) go through the admission queue,
+    # see hb_login. When nothing else is waiting and the system's bucket has a
+    # token, that's straight away; otherwise login_drain() gets to them.
+    def login_offer(self, _data, _sockaddr):
+        _now = monotonic()
+        if self._logins.offer(_data[4:8], _sockaddr[0], (_data, _sockaddr), _now, _data[:4] == 'RPTK') and self._login_drain is None:
+            for _data, _sockaddr in self._logins.admit(_now, 1):
+                self.login_handle(_data, _sockaddr)
+            if self._logins:
+                self._login_drain = reactor.callLater(self._logins.wait(_now), self.login_drain)
+
+    # Let the next lot of queued logins in. Runs as a timed call, so any voice
+    # traffic that's waiting is handled between one lot and the next.
+    def login_drain(self):
+        self._login_drain = None
+        _now = monotonic()
+        for _data, _sockaddr in self._logins.admit(_now):
+            self.login_handle(_data, _sockaddr)
+        if self._logins:
+            self._login_drain = reactor.callLater(self._logins.wait(_now), self.login_drain)
+
+    def login_handle(self, _data, _sockaddr):
+        if _data[:4] == 'RPTL':
+            self.master_login(_data, _sockaddr)
+        else:
+            self.master_challenge(_data, _sockaddr)
+
+    # RPTLogin -- a repeater wants to login
+    def master_login(self, _data, _sockaddr):
+        _peer_id = _data[4:8]
+        # Check to see if we've reached the maximum number of allowed peers
+        if len(self._peers) < self._config['MAX_PEERS']:
+            # Check for valid Radio ID
+            if acl_check(_peer_id, self._CONFIG['GLOBAL']['REG_ACL']) and acl_check(_peer_id, self._config['REG_ACL']):
+                # Build the configuration data strcuture for the peer
+                _this_peer = Peer(_peer_id, _sockaddr, now())
+                self.peer_add(_this_peer)
+                logger.info('(%s) Repeater Logging in with Radio ID: %s, %s:%s', self._system, int_id(_peer_id), _sockaddr[0], _sockaddr[1])
+                _salt_str = hex_str_4(_this_peer.salt)
+                self.send_peer(_peer_id, 'RPTACK'+_salt_str)
+                _this_peer.connection = const.PEER_CHALLENGE_SENT
+                logger.info('(%s) Sent Challenge Response to %s for login: %s', self._system, int_id(_peer_id), _this_peer.salt)
+            else:
+                self.transport.write('MSTNAK'+_peer_id, _sockaddr)
+                logger.warning('(%s) Invalid Login from Radio ID: %s Denied by Registation ACL', self._system, int_id(_peer_id))
+        else:
+            self.transport.write('MSTNAK'+_peer_id, _sockaddr)
+            logger.warning('(%s) Registration denied from Radio ID: %s Maximum number of peers exceeded', self._system, int_id(_peer_id))
+
+    # RPTK -- repeater has answered our login challenge
+    def master_challenge(self, _data, _sockaddr):
+        _peer_id = _data[4:8]
+        _this_peer = self.peer_at(_peer_id, _sockaddr, const.PEER_CHALLENGE_SENT)
+        if _this_peer:
+            self.peer_heard(_this_peer)
+            _sent_hash = _data[8:]
+            _salt_str = hex_str_4(_this_peer.salt)
+            _calc_hash = bhex(sha256(_salt_str+self._config['PASSPHRASE']).hexdigest())
+            if _sent_hash == _calc_hash:
+                _this_peer.connection = const.PEER_WAITING_CONFIG
+                self.send_peer(_peer_id, 'RPTACK'+_peer_id)
+                logger.info('(%s) Peer %s has completed the login exchange successfully', self._system, _this_peer.radio_id)
+            else:
+                logger.info('(%s) Peer %s has FAILED the login exchange successfully', self._system, _this_peer.radio_id)
+                self.transport.write('MSTNAK'+_peer_id, _sockaddr)
+                self.peer_del(_peer_id)
+        else:
+            self.transport.write('MSTNAK'+_peer_id, _sockaddr)
+            logger.warning('(%s) Login challenge from Radio ID that has not logged in: %s', self._system, int_id(_peer_id))
+
     # Aliased in __init__ to datagramReceived if system is a master
     def master_datagramReceived(self, _data, _sockaddr):
         # Keep This Line Commented Unless HEAVILY Debugging!
@@ -315,194 +562,69 @@ class HBSYSTEM(DatagramProtocol):
         _command = _data[:4]
 
         if _command == 'DMRD':    # DMRData -- encapsulated DMR data frame
+            # Only frames from our peers are decoded, and only whole ones
             _peer_id = _data[11:15]
-            if _peer_id in self._peers \
-                        and self._peers[_peer_id]['CONNECTION'] == 'YES' \
-                        and self._peers[_peer_id]['SOCKADDR'] == _sockaddr:
-                _seq = _data[4]
-                _rf_src = _data[5:8]
-                _dst_id = _data[8:11]
-                _bits = int_id(_data[15])
-                _slot = 2 if (_bits & 0x80) else 1
-                #_call_type = 'unit' if (_bits & 0x40) else 'group'
-                if _bits & 0x40:
-                    _call_type = 'unit'
-                elif (_bits & 0x23) == 0x23:
-                    _call_type = 'vcsbk'
-                else:
-                    _call_type = 'group'
-                _frame_type = (_bits & 0x30) >> 4
-                _dtype_vseq = (_bits & 0xF) # data, 1=voice header, 2=voice terminator; voice, 0=burst A ... 5=burst F
-                _stream_id = _data[16:20]
-                #logger.debug('(%s) DMRD - Seqence: %s, RF Source: %s, Destination ID: %s', self._system, int_id(_seq), int_id(_rf_src), int_id(_dst_id))
+            if self.peer_at(_peer_id, _sockaddr) and len(_data) >= DMRD_HEADER.size:
+                _frame = DMRD(_data)
+                #logger.debug('(%s) DMRD - %s', self._system, _frame)
+                _metrics = self._metrics
+                _metrics.received(_frame.slot, _frame.dst_id, len(_data))
                 # ACL Processing
-                if self._CONFIG['GLOBAL']['USE_ACL']:
-                    if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                        if self._laststrid != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                            if _slot == 1:
-                                self._laststrid1 = _stream_id
-                            else:
-                                self._laststrid2 = _stream_id
-                        return
-                    if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                        if self._laststrid1 != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid1 = _stream_id
-                        return
-                    if _slot == 2 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG2_ACL']):
-                        if self._laststrid2 != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid2 = _stream_id
-                        return
-                if self._config['USE_ACL']:
-                    if not acl_check(_rf_src, self._config['SUB_ACL']):
-                        if self._laststrid != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                            if _slot == 1:
-                                self._laststrid1 = _stream_id
-                            else:
-                                self._laststrid2 = _stream_id
-                        return
-                    if _slot == 1 and not acl_check(_dst_id, self._config['TG1_ACL']):
-                        if self._laststrid1 != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid1 = _stream_id
-                        return
-                    if _slot == 2 and not acl_check(_dst_id, self._config['TG2_ACL']):
-                        if self._laststrid2 != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid2 = _stream_id
-                        return
+                if self._use_acl and not self.acl_stream(logger.info, _frame):
+                    _metrics.acl_drops += 1
+                    return
 
                 # The basic purpose of a master is to repeat to the peers
                 if self._config['REPEAT'] == True:
-                    pkt = [_data[:11], '', _data[15:]]
-                    for _peer in self._peers:
-                        if _peer != _peer_id:
-                            pkt[1] = _peer
-                            self.transport.write(''.join(pkt), self._peers[_peer]['SOCKADDR'])
-                            #logger.debug('(%s) Packet on TS%s from %s (%s) for destination ID %s repeated to peer: %s (%s) [Stream ID: %s]', self._system, _slot, self._peers[_peer_id]['CALLSIGN'], int_id(_peer_id), int_id(_dst_id), self._peers[_peer]['CALLSIGN'], int_id(_peer), int_id(_stream_id))
+                    if not (self._fanout and self._fanout.send(self._peers, _data, _peer_id)):
+                        pkt = [_data[:11], '', _data[15:]]
+                        for _peer in self._peers:
+                            if _peer != _peer_id:
+                                pkt[1] = _peer
+                                self.transport.write(''.join(pkt), self._peers[_peer].sockaddr)
+                                #logger.debug('(%s) Packet on TS%s from %s (%s) for destination ID %s repeated to peer: %s (%s) [Stream ID: %s]', self._system, _frame.slot, self._peers[_peer_id].callsign, int_id(_peer_id), int_id(_frame.dst_id), self._peers[_peer].callsign, int_id(_peer), int_id(_frame.stream_id))
+                    _metrics.tx_frames += len(self._peers) - 1
+                    _metrics.tx_bytes += (len(self._peers) - 1) * len(_data)
 
 
                 # Userland actions -- typically this is the function you subclass for an application
-                self.dmrd_received(_peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data)
-
-        elif _command == 'RPTL':    # RPTLogin -- a repeater wants to login
-            _peer_id = _data[4:8]
-            # Check to see if we've reached the maximum number of allowed peers
-            if len(self._peers) < self._config['MAX_PEERS']:
-                # Check for valid Radio ID
-                if acl_check(_peer_id, self._CONFIG['GLOBAL']['REG_ACL']) and acl_check(_peer_id, self._config['REG_ACL']):
-                    # Build the configuration data strcuture for the peer
-                    self._peers.update({_peer_id: {
-                        'CONNECTION': 'RPTL-RECEIVED',
-                        'CONNECTED': time(),
-                        'PINGS_RECEIVED': 0,
-                        'LAST_PING': time(),
-                        'SOCKADDR': _sockaddr,
-                        'IP': _sockaddr[0],
-                        'PORT': _sockaddr[1],
-                        'SALT': randint(0,0xFFFFFFFF),
-                        'RADIO_ID': str(int(ahex(_peer_id), 16)),
-                        'CALLSIGN': '',
-                        'RX_FREQ': '',
-                        'TX_FREQ': '',
-                        'TX_POWER': '',
-                        'COLORCODE': '',
-                        'LATITUDE': '',
-                        'LONGITUDE': '',
-                        'HEIGHT': '',
-                        'LOCATION': '',
-                        'DESCRIPTION': '',
-                        'SLOTS': '',
-                        'URL': '',
-                        'SOFTWARE_ID': '',
-                        'PACKAGE_ID': '',
-                    }})
-                    logger.info('(%s) Repeater Logging in with Radio ID: %s, %s:%s', self._system, int_id(_peer_id), _sockaddr[0], _sockaddr[1])
-                    _salt_str = hex_str_4(self._peers[_peer_id]['SALT'])
-                    self.send_peer(_peer_id, 'RPTACK'+_salt_str)
-                    self._peers[_peer_id]['CONNECTION'] = 'CHALLENGE_SENT'
-                    logger.info('(%s) Sent Challenge Response to %s for login: %s', self._system, int_id(_peer_id), self._peers[_peer_id]['SALT'])
-                else:
-                    self.transport.write('MSTNAK'+_peer_id, _sockaddr)
-                    logger.warning('(%s) Invalid Login from Radio ID: %s Denied by Registation ACL', self._system, int_id(_peer_id))
-            else:
-                self.transport.write('MSTNAK'+_peer_id, _sockaddr)
-                logger.warning('(%s) Registration denied from Radio ID: %s Maximum number of peers exceeded', self._system, int_id(_peer_id))
-
-        elif _command == 'RPTK':    # Repeater has answered our login challenge
-            _peer_id = _data[4:8]
-            if _peer_id in self._peers \
-                        and self._peers[_peer_id]['CONNECTION'] == 'CHALLENGE_SENT' \
-                        and self._peers[_peer_id]['SOCKADDR'] == _sockaddr:
-                _this_peer = self._peers[_peer_id]
-                _this_peer['LAST_PING'] = time()
-                _sent_hash = _data[8:]
-                _salt_str = hex_str_4(_this_peer['SALT'])
-                _calc_hash = bhex(sha256(_salt_str+self._config['PASSPHRASE']).hexdigest())
-                if _sent_hash == _calc_hash:
-                    _this_peer['CONNECTION'] = 'WAITING_CONFIG'
-                    self.send_peer(_peer_id, 'RPTACK'+_peer_id)
-                    logger.info('(%s) Peer %s has completed the login exchange successfully', self._system, _this_peer['RADIO_ID'])
-                else:
-                    logger.info('(%s) Peer %s has FAILED the login exchange successfully', self._system, _this_peer['RADIO_ID'])
-                    self.transport.write('MSTNAK'+_peer_id, _sockaddr)
-                    del self._peers[_peer_id]
-            else:
-                self.transport.write('MSTNAK'+_peer_id, _sockaddr)
-                logger.warning('(%s) Login challenge from Radio ID that has not logged in: %s', self._system, int_id(_peer_id))
+                self.dmrd_received(_frame)
+
+        elif _command == 'RPTL' or _command == 'RPTK':    # RPTLogin, or the answer to our login challenge
+            self.login_offer(_data, _sockaddr)
 
         elif _command == 'RPTC':    # Repeater is sending it's configuraiton OR disconnecting
             if _data[:5] == 'RPTCL':    # Disconnect command
                 _peer_id = _data[5:9]
-                if _peer_id in self._peers \
-                            and self._peers[_peer_id]['CONNECTION'] == 'YES' \
-                            and self._peers[_peer_id]['SOCKADDR'] == _sockaddr:
-                    logger.info('(%s) Peer is closing down: %s (%s)', self._system, self._peers[_peer_id]['CALLSIGN'], int_id(_peer_id))
+                _this_peer = self.peer_at(_peer_id, _sockaddr)
+                if _this_peer:
+                    logger.info('(%s) Peer is closing down: %s (%s)', self._system, _this_peer.callsign, int_id(_peer_id))
                     self.transport.write('MSTNAK'+_peer_id, _sockaddr)
-                    del self._peers[_peer_id]
+                    self.peer_del(_peer_id)
 
             else:
                 _peer_id = _data[4:8]      # Configure Command
-                if _peer_id in self._peers \
-                            and self._peers[_peer_id]['CONNECTION'] == 'WAITING_CONFIG' \
-                            and self._peers[_peer_id]['SOCKADDR'] == _sockaddr:
-                    _this_peer = self._peers[_peer_id]
-                    _this_peer['CONNECTION'] = 'YES'
-                    _this_peer['CONNECTED'] = time()
-                    _this_peer['LAST_PING'] = time()
-                    _this_peer['CALLSIGN'] = _data[8:16]
-                    _this_peer['RX_FREQ'] = _data[16:25]
-                    _this_peer['TX_FREQ'] =  _data[25:34]
-                    _this_peer['TX_POWER'] = _data[34:36]
-                    _this_peer['COLORCODE'] = _data[36:38]
-                    _this_peer['LATITUDE'] = _data[38:46]
-                    _this_peer['LONGITUDE'] = _data[46:55]
-                    _this_peer['HEIGHT'] = _data[55:58]
-                    _this_peer['LOCATION'] = _data[58:78]
-                    _this_peer['DESCRIPTION'] = _data[78:97]
-                    _this_peer['SLOTS'] = _data[97:98]
-                    _this_peer['URL'] = _data[98:222]
-                    _this_peer['SOFTWARE_ID'] = _data[222:262]
-                    _this_peer['PACKAGE_ID'] = _data[262:302]
+                _this_peer = self.peer_at(_peer_id, _sockaddr, const.PEER_WAITING_CONFIG)
+                if _this_peer:
+                    _this_peer.connection = const.PEER_CONNECTED
+                    _this_peer.connected = now()
+                    self.peer_heard(_this_peer)
+                    _this_peer.configure(_data)
 
                     self.send_peer(_peer_id, 'RPTACK'+_peer_id)
-                    logger.info('(%s) Peer %s (%s) has sent repeater configuration', self._system, _this_peer['CALLSIGN'], _this_peer['RADIO_ID'])
+                    logger.info('(%s) Peer %s (%s) has sent repeater configuration', self._system, _this_peer.callsign, _this_peer.radio_id)
                 else:
                     self.transport.write('MSTNAK'+_peer_id, _sockaddr)
                     logger.warning('(%s) Peer info from Radio ID that has not logged in: %s', self._system, int_id(_peer_id))
 
         elif _command == 'RPTP':    # RPTPing -- peer is pinging us
                 _peer_id = _data[7:11]
-                if _peer_id in self._peers \
-                            and self._peers[_peer_id]['CONNECTION'] == "YES" \
-                            and self._peers[_peer_id]['SOCKADDR'] == _sockaddr:
-                    self._peers[_peer_id]['PINGS_RECEIVED'] += 1
-                    self._peers[_peer_id]['LAST_PING'] = time()
+                _this_peer = self.peer_at(_peer_id, _sockaddr)
+                if _this_peer:
+                    _this_peer.pings_received += 1
+                    self.peer_heard(_this_peer)
                     self.send_peer(_peer_id, 'MSTPONG'+_peer_id)
-                    logger.debug('(%s) Received and answered RPTPING from peer %s (%s)', self._system, self._peers[_peer_id]['CALLSIGN'], int_id(_peer_id))
+                    logger.debug('(%s) Received and answered RPTPING from peer %s (%s)', self._system, _this_peer.callsign, int_id(_peer_id))
                 else:
                     self.transport.write('MSTNAK'+_peer_id, _sockaddr)
                     logger.warning('(%s) Ping from Radio ID that is not logged in: %s', self._system, int_id(_peer_id))
@@ -521,74 +643,26 @@ class HBSYSTEM(DatagramProtocol):
             _command = _data[:4]
             if   _command == 'DMRD':    # DMRData -- encapsulated DMR data frame
                 _peer_id = _data[11:15]
-                if self._config['LOOSE'] or _peer_id == self._config['RADIO_ID']: # Validate the Radio_ID unless using loose validation
-                    _seq = _data[4:5]
-                    _rf_src = _data[5:8]
-                    _dst_id = _data[8:11]
-                    _bits = int_id(_data[15])
-                    _slot = 2 if (_bits & 0x80) else 1
-                    #_call_type = 'unit' if (_bits & 0x40) else 'group'
-                    if _bits & 0x40:
-                        _call_type = 'unit'
-                    elif (_bits & 0x23) == 0x23:
-                        _call_type = 'vcsbk'
-                    else:
-                        _call_type = 'group'
-                    _frame_type = (_bits & 0x30) >> 4
-                    _dtype_vseq = (_bits & 0xF) # data, 1=voice header, 2=voice terminator; voice, 0=burst A ... 5=burst F
-                    _stream_id = _data[16:20]
-                    #logger.debug('(%s) DMRD - Sequence: %s, RF Source: %s, Destination ID: %s', self._system, int_id(_seq), int_id(_rf_src), int_id(_dst_id))
+                if (self._config['LOOSE'] or _peer_id == self._config['RADIO_ID']) and len(_data) >= DMRD_HEADER.size: # Validate the Radio_ID unless using loose validation
+                    _frame = DMRD(_data)
+                    #logger.debug('(%s) DMRD - %s', self._system, _frame)
+                    _metrics = self._metrics
+                    _metrics.received(_frame.slot, _frame.dst_id, len(_data))
 
                     # ACL Processing
-                    if self._CONFIG['GLOBAL']['USE_ACL']:
-                        if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                            if self._laststrid != _stream_id:
-                                logger.debug('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                if _slot == 1:
-                                    self._laststrid1 = _stream_id
-                                else:
-                                    self._laststrid2 = _stream_id
-                            return
-                        if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                            if self._laststrid1 != _stream_id:
-                                logger.debug('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self._laststrid1 = _stream_id
-                            return
-                        if _slot == 2 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG2_ACL']):
-                            if self._laststrid2 != _stream_id:
-                                logger.debug('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self._laststrid2 = _stream_id
-                            return
-                    if self._config['USE_ACL']:
-                        if not acl_check(_rf_src, self._config['SUB_ACL']):
-                            if self._laststrid != _stream_id:
-                                logger.debug('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                if _slot == 1:
-                                    self._laststrid1 = _stream_id
-                                else:
-                                    self._laststrid2 = _stream_id
-                            return
-                        if _slot == 1 and not acl_check(_dst_id, self._config['TG1_ACL']):
-                            if self._laststrid1 != _stream_id:
-                                logger.debug('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self._laststrid1 = _stream_id
-                            return
-                        if _slot == 2 and not acl_check(_dst_id, self._config['TG2_ACL']):
-                            if self._laststrid2 != _stream_id:
-                                logger.debug('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self._laststrid2 = _stream_id
-                            return
-
+                    if self._use_acl and not self.acl_stream(logger.debug, _frame):
+                        _metrics.acl_drops += 1
+                        return
 
                     # Userland actions -- typically this is the function you subclass for an application
-                    self.dmrd_received(_peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data)
+                    self.dmrd_received(_frame)
 
             elif _command == 'MSTN':    # Actually MSTNAK -- a NACK from the master
                 _peer_id = _data[6:10]
                 if self._config['LOOSE'] or _peer_id == self._config['RADIO_ID']: # Validate the Radio_ID unless using loose validation
                     logger.warning('(%s) MSTNAK Received. Resetting connection to the Master.', self._system)
                     self._stats['CONNECTION'] = 'NO' # Disconnect ourselves and re-register
-                    self._stats['CONNECTED'] = time()
+                    self._stats['CONNECTED'] = now()
 
             elif _command == 'RPTA':    # Actually RPTACK -- an ACK from the master
                 # Depending on the state, an RPTACK means different things, in each clause, we check and/or set the state
@@ -637,7 +711,7 @@ class HBSYSTEM(DatagramProtocol):
                             logger.info('(%s) Sent options: (%s)', self._system, self._config['OPTIONS'])
                         else:
                             self._stats['CONNECTION'] = 'YES'
-                            self._stats['CONNECTED'] = time()
+                            self._stats['CONNECTED'] = now()
                             logger.info('(%s) Connection to Master Completed', self._system)
                     else:
                         self._stats['CONNECTION'] = 'NO'
@@ -648,7 +722,7 @@ class HBSYSTEM(DatagramProtocol):
                     if self._config['LOOSE'] or _peer_id == self._config['RADIO_ID']: # Validate the Radio_ID unless using loose validation
                         logger.info('(%s) Repeater Options Accepted', self._system)
                         self._stats['CONNECTION'] = 'YES'
-                        self._stats['CONNECTED'] = time()
+                        self._stats['CONNECTED'] = now()
                         logger.info('(%s) Connection to Master Completed with options', self._system)
                     else:
                         self._stats['CONNECTION'] = 'NO'
@@ -674,13 +748,28 @@ class HBSYSTEM(DatagramProtocol):
 #
 # Socket-based reporting section
 #
+# Each client is the producer for its own connection, so Twisted tells it when the
+# client isn't reading fast enough (pauseProducing) and when it has caught up
+# (resumeProducing). In between, nothing more is written to the connection:
+# events wait in a queue of at most REPORT_QUEUE_SIZE, the oldest being dropped
+# after that, and periodic reports are skipped for everything to be sent again
+# once the client catches up. A client that has REPORT_DROP_LIMIT events
+# dropped before it catches up is disconnected.
+@implementer(IPushProducer)
 class report(NetstringReceiver):
     def __init__(self, factory):
         self._factory = factory
+        self._paused = False
+        self._queue = deque()
+        self._resync = False
+        self._stall_dropped = 0
+        self.dropped = 0
 
     def connectionMade(self):
         self._factory.clients.append(self)
         logger.info('HBlink reporting client connected: %s', self.transport.getPeer())
+        self.transport.registerProducer(self, True)
+        self._factory.send_snapshot(self)
 
     def connectionLost(self, reason):
         logger.info('HBlink reporting client disconnected: %s', self.transport.getPeer())
@@ -689,17 +778,89 @@ class report(NetstringReceiver):
     def stringReceived(self, data):
         self.process_message(data)
 
+    def pauseProducing(self):
+        self._paused = True
+
+    def resumeProducing(self):
+        self._paused = False
+        self._stall_dropped = 0
+        if self._resync:
+            self._resync = False
+            self._factory.send_snapshot(self)
+        while self._queue and not self._paused:
+            self.sendString(self._queue.popleft())
+
+    def stopProducing(self):
+        self._queue.clear()
+
+    # Send _message now if the client is keeping up; otherwise queue it, or if it
+    # is a periodic _report, send everything once the client has caught up
+    def send(self, _message, _report=False):
+        if not self._paused:
+            self.sendString(_message)
+        elif _report:
+            self._resync = True
+        else:
+            if len(self._queue) >= const.REPORT_QUEUE_SIZE:
+                self._queue.popleft()
+                self.dropped += 1
+                self._stall_dropped += 1
+                self._factory.dropped += 1
+                if self._stall_dropped >= const.REPORT_DROP_LIMIT:
+                    logger.warning('HBlink reporting client is not keeping up, %s events dropped, disconnecting: %s', self._stall_dropped, self.transport.getPeer())
+                    self._queue.clear()
+                    self.transport.abortConnection()
+                    return
+            self._queue.append(_message)
+
+    # A batch of _messages, also given already framed as netstrings
+    def send_batch(self, _messages, _framed):
+        if not self._paused:
+            self.transport.write(_framed)
+        else:
+            for _message in _messages:
+                self.send(_message)
+
+    def queued(self):
+        return len(self._queue)
+
     def process_message(self, _message):
         opcode = _message[:1]
-        if opcode == REPORT_OPCODES['CONFIG_REQ']:
-            logger.info('HBlink reporting client sent \'CONFIG_REQ\': %s', self.transport.getPeer())
-            self.send_config()
+        if opcode == REPORT_OPCODES['CONFIG_REQ'] or opcode == REPORT_OPCODES['BRIDGE_REQ']:
+            logger.info('HBlink reporting client sent \'%s\': %s', 'CONFIG_REQ' if opcode == REPORT_OPCODES['CONFIG_REQ'] else 'BRIDGE_REQ', self.transport.getPeer())
+            self._factory.send_snapshot(self)
         else:
             logger.error('got unknown opcode')
 
+# A bridge event as the text BRDG_EVENT has always carried
+def csv_event(_event):
+    _action, _direction, _system, _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration = _event
+    _csv = 'GROUP VOICE,{},{},{},{},{},{},{},{}'.format(_action, _direction, _system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_tgid))
+    if _duration is not None:
+        _csv += ',{:.2f}'.format(_duration)
+    return _csv
+
+# With REPORT_DELTAS, clients get everything when they connect or ask for it, and
+# then only what has changed at each REPORT_INTERVAL (CONFIG_UPD); without it,
+# everything at each REPORT_INTERVAL, as it always was. REPORT_FORMAT is pickle,
+# or wire for the hb_wire format.
 class reportFactory(Factory):
     def __init__(self, config):
         self._config = config
+        self._tracker = exportTracker()
+        # Events dropped for clients not keeping up, all told
+        self.dropped = 0
+        # Bridge events waiting to be sent, and the call that will send them
+        self._events = []
+        self._flush = None
+        self._wire = config['REPORTS']['REPORT_FORMAT'] == 'wire'
+        # Peer records in the last CONFIG_SND, by Peer.state() (hb_wire.encode_config)
+        self._records = {}
+        # Call detail records, written from the bridge events
+        self._cdr = None
+        if config['REPORTS']['CDR_FILE']:
+            self._cdr = hb_cdr.cdrWriter(config['REPORTS']['CDR_FILE'], config['REPORTS']['CDR_MAX_BYTES'], config['REPORTS']['CDR_ROTATE'])
+            self._cdr.start()
 
     def buildProtocol(self, addr):
         if (addr.host) in self._config['REPORTS']['REPORT_CLIENTS'] or '*' in self._config['REPORTS']['REPORT_CLIENTS']:
@@ -709,40 +870,86 @@ class reportFactory(Factory):
             logger.error('Invalid report server connection attempt from: %s:%s', addr.host, addr.port)
             return None
 
-    def send_clients(self, _message):
+    # Events are queued for clients not keeping up; a periodic _report is sent
+    # again in full when they catch up
+    def send_clients(self, _message, _report=False):
         for client in self.clients:
-            client.sendString(_message)
-
-    def send_config(self):
-        serialized = pickle.dumps(self._config['SYSTEMS'], protocol=pickle.HIGHEST_PROTOCOL)
-        self.send_clients(REPORT_OPCODES['CONFIG_SND']+serialized)
-
-
-# ID ALIAS CREATION
-# Download
-def mk_aliases(_config):
-    if _config['ALIASES']['TRY_DOWNLOAD'] == True:
-        # Try updating peer aliases file
-        result = try_download(_config['ALIASES']['PATH'], _config['ALIASES']['PEER_FILE'], _config['ALIASES']['PEER_URL'], _config['ALIASES']['STALE_TIME'])
-        logger.info(result)
-        # Try updating subscriber aliases file
-        result = try_download(_config['ALIASES']['PATH'], _config['ALIASES']['SUBSCRIBER_FILE'], _config['ALIASES']['SUBSCRIBER_URL'], _config['ALIASES']['STALE_TIME'])
-        logger.info(result)
+            client.send(_message, _report)
+
+    # A call starting or ending on a system, as an _action (START or END) in a
+    # _direction (RX or TX); the IDs as they are in the packets. Written to the
+    # call detail records whether or not there's REPORTing, and for clients,
+    # held for a moment to be sent along with any others.
+    def bridge_event(self, _action, _direction, _system, _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration=None):
+        if self._cdr:
+            self._cdr.record(_action, _direction, _system, _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration)
+        if not self._config['REPORTS']['REPORT'] or not self.clients:
+            return
+        self._events.append((_action, _direction, _system, _stream_id, _peer_id, _rf_src, _slot, _tgid, _duration))
+        if len(self._events) >= const.REPORT_EVENT_BATCH:
+            self.flush_events()
+        elif self._flush is None:
+            self._flush = reactor.callLater(const.REPORT_EVENT_DELAY, self.flush_events)
+
+    def flush_events(self):
+        if self._flush is not None:
+            if self._flush.active():
+                self._flush.cancel()
+            self._flush = None
+        _events, self._events = self._events, []
+        if not _events or not self.clients:
+            return
+        if self._wire:
+            self.send_clients(REPORT_OPCODES['BRDG_EVENTS']+hb_wire.encode_events(_events))
+        else:
+            # Each still a BRDG_EVENT of its own, but written to each client in one go
+            _messages = [REPORT_OPCODES['BRDG_EVENT']+csv_event(_event) for _event in _events]
+            _framed = ''.join(['{}:{},'.format(len(_message), _message) for _message in _messages])
+            for client in self.clients:
+                client.send_batch(_messages, _framed)
+
+    # Log how far behind any clients are
+    def log_clients(self):
+        for client in self.clients:
+            if client.queued() or client.dropped:
+                logger.info('HBlink reporting client %s: %s events queued, %s dropped', client.transport.getPeer(), client.queued(), client.dropped)
 
-    # Make Dictionaries
-    peer_ids = mk_id_dict(_config['ALIASES']['PATH'], _config['ALIASES']['PEER_FILE'])
-    if peer_ids:
-        logger.info('ID ALIAS MAPPER: peer_ids dictionary is available')
+    def encode(self, _data, _wire):
+        return _wire(_data) if self._wire else pickle.dumps(_data, protocol=pickle.HIGHEST_PROTOCOL)
 
-    subscriber_ids = mk_id_dict(_config['ALIASES']['PATH'], _config['ALIASES']['SUBSCRIBER_FILE'])
-    if subscriber_ids:
-        logger.info('ID ALIAS MAPPER: subscriber_ids dictionary is available')
+    # CONFIG_SND: all of SYSTEMS
+    def config_message(self):
+        if self._wire:
+            return REPORT_OPCODES['CONFIG_SND']+hb_wire.encode_config(self._config['SYSTEMS'], self._records)
+        return REPORT_OPCODES['CONFIG_SND']+pickle.dumps(export_systems(self._config['SYSTEMS']), protocol=pickle.HIGHEST_PROTOCOL)
 
-    talkgroup_ids = mk_id_dict(_config['ALIASES']['PATH'], _config['ALIASES']['TGID_FILE'])
-    if talkgroup_ids:
-        logger.info('ID ALIAS MAPPER: talkgroup_ids dictionary is available')
+    # Everything, to one client
+    def send_snapshot(self, _client):
+        _client.sendString(self.config_message())
 
-    return peer_ids, subscriber_ids, talkgroup_ids
+    # The periodic report, to all clients
+    def send_config(self):
+        if not self.clients:
+            return
+        if not self._config['REPORTS']['REPORT_DELTAS']:
+            self.send_clients(self.config_message(), True)
+            return
+        _delta = self._tracker.delta(self._config['SYSTEMS'])
+        if _delta:
+            self.send_clients(REPORT_OPCODES['CONFIG_UPD']+self.encode(_delta, hb_wire.encode_delta), True)
+
+    def send_latency(self):
+        if self.clients and self._config['REPORTS']['REPORT_LATENCY']:
+            self.send_clients(REPORT_OPCODES['LATENCY_SND']+self.encode(hb_latency.report(), hb_wire.encode_latency))
+
+
+# ID ALIAS CREATION, all at once (the applications use mk_aliases_later, which
+# does the same in a child process)
+def mk_aliases(_config):
+    _messages, _dicts = load_aliases(_config['ALIASES'])
+    for _message in _messages:
+        logger.info(_message)
+    return tuple(_dicts)
 
 #************************************************
 #      MAIN PROGRAM LOOP STARTS HERE
@@ -763,6 +970,9 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('-c', '--config', action='store', dest='CONFIG_FILE', help='/full/path/to/config.file (usually hblink.cfg)')
     parser.add_argument('-l', '--logging', action='store', dest='LOG_LEVEL', help='Override config file logging level.')
+    parser.add_argument('-w', '--workers', action='store', dest='WORKERS', type=int, default=1, help='Spread the systems over this many worker processes.')
+    parser.add_argument('--worker', action='store', dest='WORKER', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--ipc', action='store', dest='IPC_DIR', help=argparse.SUPPRESS)
     cli_args = parser.parse_args()
 
     # Ensure we have a path for the config file, if one wasn't specified, then use the execution directory
@@ -779,8 +989,13 @@ if __name__ == '__main__':
     logger.info('\n\nCopyright (c) 2013, 2014, 2015, 2016, 2018\n\tThe Founding Members of the K0USY Group. All rights reserved.\n')
     logger.debug('Logging system started, anything from here on gets logged')
     
-    # Set up the signal handler
+    # Set up the signal handler. Only the first signal counts: with --workers, a
+    # Ctrl-C reaches each worker from the terminal and again from the supervisor.
+    _stopping = [False]
     def sig_handler(_signal, _frame):
+        if _stopping[0]:
+            return
+        _stopping[0] = True
         logger.info('SHUTDOWN: HBLINK IS TERMINATING WITH SIGNAL %s', str(_signal))
         hblink_handler(_signal, _frame)
         logger.info('SHUTDOWN: ALL SYSTEM HANDLERS EXECUTED - STOPPING REACTOR')
@@ -790,10 +1005,17 @@ if __name__ == '__main__':
     for sig in [signal.SIGTERM, signal.SIGINT]:
         signal.signal(sig, sig_handler)
 
-    peer_ids, subscriber_ids, talkgroup_ids = mk_aliases(CONFIG)
+    # With --workers, this process only supervises the workers that run the systems
+    if cli_args.WORKERS > 1 and cli_args.WORKER is None:
+        sys.exit(hb_shard.supervise(cli_args.WORKERS))
+    shard = hb_shard.shard(CONFIG, cli_args.WORKERS, cli_args.WORKER, cli_args.IPC_DIR) if cli_args.WORKER is not None else None
 
     # INITIALIZE THE REPORTING LOOP
-    report_server = config_reports(CONFIG, reportFactory)    
+    # Only one worker runs the reporting server, the others pass their events to it
+    if shard is None or shard.worker == 0:
+        report_server = config_reports(CONFIG, reportFactory)
+    else:
+        report_server = hb_shard.remoteReport(shard)
 
     # HBlink instance creation
     logger.info('HBlink \'HBlink.py\' -- SYSTEM STARTING...')
@@ -803,7 +1025,17 @@ if __name__ == '__main__':
                 systems[system] = OPENBRIDGE(system, CONFIG, report_server)
             else:
                 systems[system] = HBSYSTEM(system, CONFIG, report_server)
-            reactor.listenUDP(CONFIG['SYSTEMS'][system]['PORT'], systems[system], interface=CONFIG['SYSTEMS'][system]['IP'])
+            if shard is None or shard.owns(system):
+                listen_udp(reactor, CONFIG['SYSTEMS'][system]['PORT'], systems[system], CONFIG['SYSTEMS'][system]['IP'], CONFIG['GLOBAL']['RECV_BATCH'])
+            else:
+                shard.remote(systems[system])
             logger.debug('%s instance created: %s, %s', CONFIG['SYSTEMS'][system]['MODE'], system, systems[system])
- 
+    if shard:
+        shard.listen(systems, report_server)
+    config_metrics(CONFIG, systems, report_server, shard)
+
+    # The systems are listening, the aliases can take as long as they take
+    peer_ids, subscriber_ids, talkgroup_ids = mk_aliases_later(CONFIG, shard is None or shard.worker == 0)
+
+    hb_clock.install(reactor)
     reactor.run()
@@ -17,6 +17,20 @@
 ###############################################################################
 
 # Opcodes for the network-based reporting protocol
+#
+# Each message is a netstring of the opcode and a pickle (or, with REPORT_FORMAT
+# wire, the same in the format described in hb_wire):
+#   CONFIG_SND - the whole of SYSTEMS, with each MASTER's PEERS as dictionaries
+#   BRIDGE_SND - the whole of BRIDGES
+#   CONFIG_UPD - what changed in SYSTEMS since the last report:
+#       {'SYSTEMS': {system: the system without its PEERS},
+#        'PEERS': {system: {peer id: the changed fields of the peer, or None if it has gone}}}
+#   BRIDGE_UPD - the bridges that changed since the last report: {bridge: its entries, or None if it has gone}
+#   BRDG_EVENTS - with REPORT_FORMAT wire, a batch of bridge events (with pickle,
+#       each is a BRDG_EVENT of its own, as before)
+#   LATENCY_SND - with REPORT_LATENCY, at each interval: the frame latency
+#       histograms, {system: {frame type: counts}} (see hb_latency)
+# CONFIG_REQ or BRIDGE_REQ from a client gets it CONFIG_SND (and BRIDGE_SND)
 
 REPORT_OPCODES = {
     'CONFIG_REQ': '\x00',
@@ -27,4 +41,6 @@ REPORT_OPCODES = {
     'BRIDGE_UPD': '\x05',
     'LINK_EVENT': '\x06',
     'BRDG_EVENT': '\x07',
+    'BRDG_EVENTS': '\x08',
+    'LATENCY_SND': '\x09',
     }
\ No newline at end of file